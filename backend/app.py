@@ -7,6 +7,8 @@ from routes.cad import cad_bp
 from routes.goals import goals_bp
 from routes.transaction import transaction_bp
 from routes.coach import coach_bp
+from routes import transaction as transaction_routes
+from services.transaction_snapshot import start_compactor
 
 app = Flask(__name__)
 app.secret_key = "local-dev-secret"   # safe for local
@@ -20,6 +22,11 @@ app.register_blueprint(transaction_bp, url_prefix="/api")
 app.register_blueprint(goals_bp, url_prefix="/api")
 app.register_blueprint(coach_bp, url_prefix="/api")
 
+# Periodically rewrite the memory-mapped transactions snapshot (0 disables)
+SNAPSHOT_INTERVAL = float(os.getenv("TRANSACTION_SNAPSHOT_INTERVAL", "300"))
+if SNAPSHOT_INTERVAL > 0 and os.getenv("TRANSACTION_BACKEND", "csv") == "csv":
+    start_compactor(transaction_routes.CSV_PATH, lambda: transaction_routes.CATEGORY_MAP, SNAPSHOT_INTERVAL)
+
 @app.route("/")
 def hello():
     return ("hello world")
@@ -0,0 +1,171 @@
+"""Benchmark concurrent transaction appends: naive ``open(..., "a")`` vs the locked append log.
+
+Writers are spread over several processes (like gunicorn workers) with a few
+threads each, while a reader process keeps refreshing a ``TransactionStore``
+and counts malformed rows it observes. Prints one JSON object per mode::
+
+    python -m benchmarks.append_log --writers 1 2 4 8 --rows 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import threading
+import time
+
+from services.storage.append_log import AppendLog
+from services.storage.base import FIELDNAMES
+from services.transaction_store import TransactionStore
+
+
+def _row(writer_id: int, seq: int) -> dict:
+    # merchant encodes writer/seq so torn or interleaved rows are detectable
+    return {
+        "merchant": f"w{writer_id}-{seq}-" + "x" * 40,
+        "category_id": "13005000",
+        "amount": f"{seq}.25",
+        "date": "2025-11-01",
+        "user_id": f"user{writer_id}",
+    }
+
+
+def _naive_append(path: str, row: dict) -> None:
+    file_exists = os.path.isfile(path)
+    with open(path, "a", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        if not file_exists or os.stat(path).st_size == 0:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def _encode(row: dict) -> str:
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=FIELDNAMES).writerow(row)
+    return buffer.getvalue()
+
+
+def _header() -> str:
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=FIELDNAMES).writeheader()
+    return buffer.getvalue()
+
+
+def _worker(path: str, mode: str, writer_ids: list, rows: int, start: mp.Event) -> None:
+    log = AppendLog(path, header=_header()) if mode == "log" else None
+
+    def write_rows(writer_id: int) -> None:
+        for seq in range(rows):
+            row = _row(writer_id, seq)
+            if log is None:
+                _naive_append(path, row)
+            else:
+                log.append(_encode(row))
+
+    threads = [threading.Thread(target=write_rows, args=(wid,)) for wid in writer_ids]
+    start.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _is_valid(merchant: str, amount: float, user_id: str) -> bool:
+    parts = merchant.split("-")
+    return (
+        len(parts) == 3
+        and parts[0][1:].isdigit()
+        and user_id == f"user{parts[0][1:]}"
+        and parts[1].isdigit()
+        and amount == float(f"{parts[1]}.25")
+    )
+
+
+def _reader(path: str, stop: mp.Event, result: mp.Queue) -> None:
+    torn = 0
+    polls = 0
+    store = None
+    while not stop.is_set():
+        if os.path.exists(path) and os.path.getsize(path):
+            store = store or TransactionStore(path)
+            store.refresh()
+            polls += 1
+        time.sleep(0.005)
+    if store is not None:
+        store.refresh()
+        for _, merchant, _, amount, _, user_id in store.iter_rows():
+            if not _is_valid(merchant, amount, user_id):
+                torn += 1
+    result.put({"reader_polls": polls, "torn_rows_seen_by_reader": torn})
+
+
+def _check_file(path: str, expected: int) -> dict:
+    with open(path, newline="") as csvfile:
+        lines = csvfile.read().splitlines()
+    headers = sum(1 for line in lines if line.startswith("merchant,"))
+    reader = csv.DictReader(io.StringIO("\n".join(lines)))
+    bad = 0
+    good = 0
+    for row in reader:
+        try:
+            ok = _is_valid(row["merchant"], float(row["amount"]), row["user_id"] or "")
+        except Exception:
+            ok = False
+        good += ok
+        bad += not ok
+    return {"expected_rows": expected, "valid_rows": good, "corrupt_rows": bad, "header_lines": headers}
+
+
+def run(mode: str, writers: int, processes: int, rows: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transactions.csv")
+        ctx = mp.get_context("fork" if hasattr(os, "fork") else "spawn")
+        start, stop = ctx.Event(), ctx.Event()
+        result = ctx.Queue()
+        procs = min(processes, writers)
+        groups = [list(range(i, writers, procs)) for i in range(procs)]
+        workers = [ctx.Process(target=_worker, args=(path, mode, ids, rows, start)) for ids in groups]
+        reader = ctx.Process(target=_reader, args=(path, stop, result))
+        for proc in workers:
+            proc.start()
+        reader.start()
+        began = time.perf_counter()
+        start.set()
+        for proc in workers:
+            proc.join()
+        elapsed = time.perf_counter() - began
+        stop.set()
+        reader_stats = result.get()
+        reader.join()
+        total = writers * rows
+        return {
+            "mode": mode,
+            "writers": writers,
+            "processes": procs,
+            "rows": total,
+            "seconds": round(elapsed, 4),
+            "rows_per_sec": round(total / elapsed, 1) if elapsed else None,
+            **_check_file(path, total),
+            **reader_stats,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--processes", type=int, default=4, help="Writer processes (threads are spread across them)")
+    parser.add_argument("--rows", type=int, default=500, help="Rows appended by each writer")
+    parser.add_argument("--modes", nargs="+", default=["naive", "log"], choices=["naive", "log"])
+    args = parser.parse_args()
+    for writers in args.writers:
+        for mode in args.modes:
+            print(json.dumps(run(mode, writers, args.processes, args.rows)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark ``services.carbon_engine``: scalar per-row calls vs the batch APIs.
+
+The scalar path (``compute_co2_grams`` + ``classify_transaction`` per row)
+is timed on ``--sample`` rows and extrapolated to the full size. The batch
+path (``score_transactions``) runs on every row. Prints one JSON object per
+method and size::
+
+    python -m benchmarks.carbon_engine --rows 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services import carbon_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--sample", type=int, default=20_000, help="Rows timed for the scalar path before extrapolating")
+    parser.add_argument("--seed", type=int, default=18)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    known = np.array(carbon_engine.categories().ids)
+    for rows in args.rows:
+        ids = rng.choice(known, size=rows)
+        amounts = np.round(rng.gamma(2.0, 30.0, size=rows), 2)
+
+        sample = min(args.sample, rows)
+        began = time.perf_counter()
+        for amount, cid in zip(amounts[:sample].tolist(), ids[:sample].tolist()):
+            carbon_engine.compute_co2_grams(amount, cid)
+            carbon_engine.classify_transaction(cid)
+        scalar_seconds = (time.perf_counter() - began) * rows / sample
+
+        began = time.perf_counter()
+        carbon_engine.score_transactions(amounts, ids)
+        batch_seconds = time.perf_counter() - began
+
+        print(json.dumps({"method": "scalar", "rows": rows, "seconds": round(scalar_seconds, 4),
+                          "extrapolated": sample < rows}))
+        print(json.dumps({"method": "score_transactions", "rows": rows, "seconds": round(batch_seconds, 4),
+                          "speedup": round(scalar_seconds / batch_seconds, 1) if batch_seconds else None}))
+
+
+if __name__ == "__main__":
+    main()
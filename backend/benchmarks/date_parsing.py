@@ -0,0 +1,94 @@
+"""Benchmark date normalization: per-row ``strptime`` vs the shared ``services.dates`` layer.
+
+Writes a transactions CSV with ``--rows`` rows (dates spread over a few years
+in all supported formats), reads its date column once, then times:
+
+- ``strptime``: the old per-row ``_parse_date`` loop (up to three formats per row)
+- ``parse_day``: the memoized scalar parser called per row
+- ``parse_days``: the vectorized column parser
+- ``store``: a full ``TransactionStore`` load of the file (CSV parse included)
+
+Prints one JSON object per method::
+
+    python -m benchmarks.date_parsing --rows 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from services import dates
+from services.storage.base import FIELDNAMES
+from services.transaction_store import TransactionStore
+
+_FORMATS = ("%Y-%m-%d", "%Y-%m-%d", "%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y")
+
+
+def _legacy_parse_date(value):
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except Exception:
+            continue
+    return None
+
+
+def _write_csv(path: str, rows: int, seed: int) -> None:
+    rng = random.Random(seed)
+    start = date(2023, 1, 1)
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(FIELDNAMES)
+        for i in range(rows):
+            day = start + timedelta(days=rng.randrange(3 * 365))
+            writer.writerow([f"merchant{i % 500}", "13005000", "12.50", day.strftime(rng.choice(_FORMATS)), f"user{i % 1000}"])
+
+
+def _timed(label: str, rows: int, fn) -> dict:
+    began = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - began
+    return {"method": label, "rows": rows, "seconds": round(elapsed, 4), "rows_per_sec": round(rows / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transactions.csv")
+        _write_csv(path, args.rows, args.seed)
+        with open(path, newline="") as fh:
+            values = [row["date"] for row in csv.DictReader(fh)]
+
+        def scalar():
+            dates.parse_day.cache_clear()
+            for value in values:
+                dates.parse_day(value)
+
+        def vectorized():
+            dates.parse_day.cache_clear()
+            dates.parse_days(values, len(values))
+
+        def legacy():
+            for value in values:
+                _legacy_parse_date(value)
+
+        for label, fn in (("strptime", legacy), ("parse_day", scalar), ("parse_days", vectorized),
+                          ("store", lambda: TransactionStore(path))):
+            print(json.dumps(_timed(label, len(values), fn)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Offline leaderboard rebuild time by worker count.
+
+Writes a synthetic ``transactions.csv`` of ``--rows`` rows (10M by default,
+about 450 MB) to a temporary directory once. It then times
+``parallel_aggregate.aggregate_file`` with 1 worker, which parses the whole
+body in-process, and with each ``--workers`` count. Prints one JSON object
+per worker count, with the speedup over 1 worker and the cores available::
+
+    python -m benchmarks.parallel_aggregate --rows 10000000 --workers 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from services import parallel_aggregate
+
+_CATEGORIES = ["GROC", "TRANS", "FUEL", "REST", "UTIL", "SHOP", "TRAVEL", "FUN"]
+
+
+def write_csv(path: str, rows: int, users: int, seed: int, chunk: int = 500_000) -> None:
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as fh:
+        fh.write("merchant,category_id,amount,date,user_id\n")
+        for start in range(0, rows, chunk):
+            n = min(chunk, rows - start)
+            merchants = rng.integers(0, 500, n)
+            categories = rng.integers(0, len(_CATEGORIES), n)
+            amounts = np.round(rng.gamma(2.0, 20.0, n), 2)
+            days = rng.integers(0, 730, n) + np.datetime64("2024-01-01")
+            user_ids = rng.integers(0, users, n)
+            fh.writelines(
+                f"Merchant {m},{_CATEGORIES[c]},{a},{d},user{u}\n"
+                for m, c, a, d, u in zip(merchants.tolist(), categories.tolist(), amounts.tolist(),
+                                         days.astype(str).tolist(), user_ids.tolist())
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--seed", type=int, default=14)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transactions.csv")
+        write_csv(path, args.rows, args.users, args.seed)
+
+        baseline = None
+        for workers in [1] + args.workers:
+            began = time.perf_counter()
+            aggregates = parallel_aggregate.aggregate_file(path, workers)
+            seconds = time.perf_counter() - began
+            baseline = baseline or seconds
+            print(json.dumps({
+                "workers": workers,
+                "cores": os.cpu_count(),
+                "rows": aggregates.tx_count,
+                "users": len(aggregates.users),
+                "mb": round(os.path.getsize(path) / 1e6, 1),
+                "seconds": round(seconds, 3),
+                "speedup": round(baseline / seconds, 2),
+            }), flush=True)
+            del aggregates
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark leaderboard ranking: per-user ``percentile_of_value`` vs ``percentiles_of_values``.
+
+The per-user loop is O(n^2), so at large sizes it is timed on ``--sample``
+users and extrapolated to all of them (``extrapolated: true``). Prints one JSON
+object per method and size::
+
+    python -m benchmarks.percentiles --users 1000 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.calculate_percentile import percentile_of_value, percentiles_of_values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--sample", type=int, default=2_000, help="Users timed for the per-user loop before extrapolating")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for users in args.users:
+        # rounded CO2 totals, so ties are common like in real data
+        totals = np.round(rng.gamma(2.0, 40.0, size=users), 1).tolist()
+
+        began = time.perf_counter()
+        batch = percentiles_of_values(totals, totals)
+        batch_seconds = time.perf_counter() - began
+
+        sample = totals[: min(args.sample, users)]
+        began = time.perf_counter()
+        looped = [percentile_of_value(value, totals) for value in sample]
+        loop_seconds = (time.perf_counter() - began) * users / len(sample)
+
+        assert np.array_equal(batch[: len(sample)], looped)
+        print(json.dumps({"method": "percentile_of_value", "users": users, "seconds": round(loop_seconds, 4),
+                          "extrapolated": len(sample) < users}))
+        print(json.dumps({"method": "percentiles_of_values", "users": users, "seconds": round(batch_seconds, 4),
+                          "speedup": round(loop_seconds / batch_seconds, 1) if batch_seconds else None}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Accuracy and cost of KLL percentile sketches vs exact percentiles.
+
+For each population size, shard count and target rank error, per-user CO2
+totals are split into shards. Each shard is sketched on its own, the sketches
+are merged, and percentiles of ``--probes`` random users are compared against
+the exact ``percentiles_of_values`` answer. Errors are in percentile points,
+next to the promised bound. Prints one JSON object per configuration::
+
+    python -m benchmarks.quantile_sketch --users 100000 1000000 --shards 1 8 --errors 0.01 0.005
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.calculate_percentile import percentiles_of_values
+from services.quantile_sketch import KLLSketch, k_for_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--errors", type=float, nargs="+", default=[0.01, 0.005])
+    parser.add_argument("--probes", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for users in args.users:
+        totals = np.round(rng.gamma(2.0, 40.0, size=users), 2)
+        probes = rng.choice(totals, size=min(args.probes, users), replace=False)
+        began = time.perf_counter()
+        exact = percentiles_of_values(probes, totals)
+        exact_seconds = time.perf_counter() - began
+
+        for shards in args.shards:
+            for error in args.errors:
+                k = k_for_error(error)
+                began = time.perf_counter()
+                merged = KLLSketch(k, seed=0)
+                for shard in range(shards):
+                    merged.merge(KLLSketch.from_values(totals[shard::shards].tolist(), k, seed=shard + 1))
+                build_seconds = time.perf_counter() - began
+                approx = percentiles_of_values(probes, merged)
+                diff = np.abs(exact - approx)
+                print(json.dumps({
+                    "users": users,
+                    "shards": shards,
+                    "k": k,
+                    "retained": merged.retained,
+                    "bound_pct_points": round(100 * merged.rank_error, 4),
+                    "max_error_pct_points": round(float(diff.max()), 4),
+                    "p99_error_pct_points": round(float(np.percentile(diff, 99)), 4),
+                    "mean_error_pct_points": round(float(diff.mean()), 4),
+                    "sketch_build_seconds": round(build_seconds, 4),
+                    "exact_rank_seconds": round(exact_seconds, 4),
+                }))
+
+
+if __name__ == "__main__":
+    main()
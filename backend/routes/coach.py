@@ -3,9 +3,9 @@ from __future__ import annotations
 from flask import Blueprint, jsonify, request
 
 try:
-    from backend.services.eco_coach import generate_coaching_payload  # type: ignore
+    from backend.services.eco_coach import PAYLOAD_CACHE, cached_coaching_payload  # type: ignore
 except Exception:  # pragma: no cover
-    from services.eco_coach import generate_coaching_payload  # type: ignore
+    from services.eco_coach import PAYLOAD_CACHE, cached_coaching_payload  # type: ignore
 
 coach_bp = Blueprint("coach_bp", __name__)
 
@@ -19,10 +19,16 @@ def api_coaching_suggestions():
         weeks = 4
     if weeks <= 0:
         weeks = 4
-    payload = generate_coaching_payload(user_id=user_id, weeks=min(weeks, 8))
+    payload = cached_coaching_payload(user_id=user_id, weeks=min(weeks, 8))
     return jsonify(payload)
 
 
+@coach_bp.route("/coaching/cache", methods=["GET"])
+def api_coaching_cache_stats():
+    """Hit/miss counters and occupancy of the coaching payload cache."""
+    return jsonify(PAYLOAD_CACHE.stats())
+
+
 @coach_bp.route("/coaching/suggestions/ack", methods=["POST"])
 def api_coaching_ack():
     body = request.get_json(silent=True) or {}
@@ -1,8 +1,15 @@
 # Compute 7 day CO2 and simple eco score
-from flask import Blueprint, session, jsonify
+from flask import Blueprint, session, jsonify, request
 from datetime import datetime, timedelta
-import os
-import csv
+
+import numpy as np
+
+try:
+    from backend.routes import transaction as transaction_routes  # type: ignore
+    from backend.services.calculate_percentile import percentiles_of_values  # type: ignore
+except Exception:
+    from routes import transaction as transaction_routes  # type: ignore
+    from services.calculate_percentile import percentiles_of_values  # type: ignore
 
 scoring_bp = Blueprint("scoring", __name__)
 
@@ -37,80 +44,73 @@ def get_scores():
     return jsonify(dummyScores)
 
 
-# New endpoint: compute an overall eco score for the user based on transactions
-# This uses category CO2 per dollar to compute total CO2 impact for all transactions
-# and then computes the percentile of that total among category totals (shared algorithm).
-@scoring_bp.route("/score", methods=["GET"])
-def get_overall_score():
-    # locate transaction CSV and category mapping via the transaction route module if available
-    try:
-        from backend.routes.transaction import CSV_PATH, CATEGORY_MAP
-    except Exception:
-        try:
-            from routes.transaction import CSV_PATH, CATEGORY_MAP
-        except Exception:
-            CSV_PATH = os.path.join(os.path.dirname(__file__), '../data/transactions.csv')
-            CATEGORY_MAP = {}
-
-    # import percentile helper with fallback
-    try:
-        from backend.services.calculate_percentile import percentile_of_value  # type: ignore
-    except Exception:
-        try:
-            from services.calculate_percentile import percentile_of_value  # type: ignore
-        except Exception:
-            def percentile_of_value(val, arr):
-                if not arr:
-                    return 0.0
-                count_below = sum(1 for x in arr if x < val)
-                count_equal = sum(1 for x in arr if x == val)
-                return (count_below + 0.5 * count_equal) / len(arr) * 100.0
-
-    # aggregate category totals and compute user's total CO2 and spend
-    try:
-        category_co2_rates = []
-        user_total_co2 = 0.0
-        user_total_spend = 0.0
+_category_rates_cache = (None, None)
+
 
-        # build list of category CO2 per dollar values for reference
-        for cid, info in CATEGORY_MAP.items():
+def _category_rates():
+    """CO2-per-dollar of every category, sorted once per loaded category map."""
+
+    global _category_rates_cache
+    version = transaction_routes._category_map_version()
+    cached_version, rates = _category_rates_cache
+    if cached_version != version:
+        values = []
+        for info in transaction_routes.CATEGORY_MAP.values():
             try:
-                val = float(info.get('co2e', 0.0) or 0.0)
+                values.append(float(info.get('co2e', 0.0) or 0.0))
             except Exception:
-                val = 0.0
-            category_co2_rates.append(val)
-
-        with open(CSV_PATH, newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                try:
-                    amt = float(row.get('amount', 0) or 0)
-                except Exception:
-                    amt = 0.0
-                cid = (row.get('category_id') or '').strip()
-                co2_per_dollar = CATEGORY_MAP.get(cid, {}).get('co2e', 0.0)
-                total_co2 = amt * (co2_per_dollar or 0.0)
-                user_total_co2 += total_co2
-                user_total_spend += amt
+                values.append(0.0)
+        rates = np.sort(np.asarray(values, dtype=float))
+        _category_rates_cache = (version, rates)
+    return rates
+
+
+# Overall eco score: total CO2 (category CO2 per dollar x spend) over total
+# spend, ranked among the category rates. ``user_id`` scores one user;
+# without it every user's transactions are blended together.
+@scoring_bp.route("/score", methods=["GET"])
+def get_overall_score():
+    etag = transaction_routes.data_etag()
+    cached = transaction_routes.not_modified(etag)
+    if cached is not None:
+        return cached
+
+    try:
+        category_map = transaction_routes.CATEGORY_MAP
+        backend = transaction_routes._backend()
+        user_id = request.args.get("user_id")
+        if user_id:
+            agg = backend.user_aggregates(user_id, with_days=False).get(user_id)
+            spend_by_category = agg.category_spend if agg is not None else {}
+            user_total_spend = agg.total_spend if agg is not None else 0.0
+        else:
+            spend_by_category = {cid: spend for cid, (spend, _count) in backend.category_totals().items()}
+            user_total_spend = backend.total_spend()
+        user_total_co2 = sum(
+            spend * (category_map.get(cid, {}).get('co2e', 0.0) or 0.0) for cid, spend in spend_by_category.items()
+        )
 
         # compute user's average CO2 per dollar (guard zero spend)
         avg_co2_per_dollar = (user_total_co2 / user_total_spend) if user_total_spend > 0 else 0.0
 
-        # if we have category rates, compute percentile of user's avg rate among them
-        if category_co2_rates:
-            p = percentile_of_value(avg_co2_per_dollar, category_co2_rates)
-            # p is the percentile rank (0-100) of the user's avg CO2 rate among category rates
+        # percentile rank (0-100) of the average CO2 rate among the category rates
+        category_co2_rates = _category_rates()
+        if category_co2_rates.size:
+            p = percentiles_of_values([avg_co2_per_dollar], category_co2_rates, presorted=True)[0]
             percentile = max(0.0, min(100.0, float(p)))
         else:
             percentile = 50.0
 
         # Return percentile directly and keep `score` equal to percentile for compatibility.
-        return jsonify({
+        body = {
             "score": round(float(percentile), 2),
             "percentile": round(float(percentile), 2),
             "total_co2e": round(float(user_total_co2), 2),
             "avg_co2_per_dollar": round(float(avg_co2_per_dollar), 6),
             "total_spend": round(float(user_total_spend), 2)
-        })
+        }
+        if user_id:
+            body["user_id"] = user_id
+        return transaction_routes.with_etag(jsonify(body), etag)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
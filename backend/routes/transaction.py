@@ -1,22 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import csv
+import hashlib
 import os
 import math
+import io
 import json
-from collections import defaultdict
-from datetime import datetime, timedelta
+from urllib.parse import urlencode
 
 transaction_bp = Blueprint("transaction_bp", __name__)
 CSV_PATH = os.path.join(os.path.dirname(__file__), "../data/transactions.csv")
 CATEGORY_CSV_PATH = os.path.join(os.path.dirname(__file__), "../data/decarbon_categories.csv")
 USER_PROFILE_PATH = os.path.join(os.path.dirname(__file__), "../data/user_profiles.json")
+MAX_TRANSACTIONS_PAGE = 1000
+MAX_BULK_ROWS = 50000
 
 # Try to import the percentile helper from services; fall back to a local implementation if unavailable.
 try:
-    from backend.services.calculate_percentile import percentile_of_value  # type: ignore
+    from backend.services.calculate_percentile import percentile_of_value, percentiles_of_values  # type: ignore
 except Exception:
     try:
-        from services.calculate_percentile import percentile_of_value  # type: ignore
+        from services.calculate_percentile import percentile_of_value, percentiles_of_values  # type: ignore
     except Exception:
         def percentile_of_value(importingData, raw_data):
             try:
@@ -36,61 +39,44 @@ except Exception:
             percentile = (count_below + 0.5 * count_equal) / raw_array.size * 100.0
             return float(percentile)
 
+        def percentiles_of_values(values, raw_data):
+            return [percentile_of_value(value, raw_data) for value in values]
+
+try:
+    from backend.services.storage import get_backend  # type: ignore
+    from backend.services.dates import NO_DAY, parse_day, today  # type: ignore
+    from backend.services.leaderboard import materialized_leaderboard  # type: ignore
+    from backend.services.rolling_windows import parse_window  # type: ignore
+    from backend.services.category_registry import env_label, get_registry  # type: ignore
+    from backend.services.category_tree import CategoryTree  # type: ignore
+    from backend.services.eco_coach import invalidate_user as invalidate_coaching  # type: ignore
+except Exception:
+    from services.storage import get_backend  # type: ignore
+    from services.dates import NO_DAY, parse_day, today  # type: ignore
+    from services.leaderboard import materialized_leaderboard  # type: ignore
+    from services.rolling_windows import parse_window  # type: ignore
+    from services.category_registry import env_label, get_registry  # type: ignore
+    from services.category_tree import CategoryTree  # type: ignore
+    from services.eco_coach import invalidate_user as invalidate_coaching  # type: ignore
+
 try:
     from backend.services.merchant_classifier import predict_category as ml_predict
+    from backend.services.merchant_classifier import predict_categories as ml_predict_batch
 except Exception:
     try:
         from services.merchant_classifier import predict_category as ml_predict
+        from services.merchant_classifier import predict_categories as ml_predict_batch
     except Exception:  # pragma: no cover - fallback for missing dependency
         def ml_predict(_merchant):
             return []
 
+        def ml_predict_batch(merchants):
+            return [[] for _ in merchants]
 
-def _load_category_map():
-    """Load category metadata and attach env scores."""
-    cat_map = {}
-    try:
-        with open(CATEGORY_CSV_PATH, newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                cid = (row.get("category_id") or "").strip()
-                if not cid:
-                    continue
-                co2_raw = (row.get("co2e_per_dollar") or "").strip()
-                try:
-                    co2 = float(co2_raw) if co2_raw != "" else 0.0
-                except Exception:
-                    co2 = 0.0
-
-                hier = row.get("hierarchy") or ""
-                name = hier.replace('"', "").split(",")[-1].strip() if hier else (row.get("group") or "").strip()
-                cat_map[cid] = {"name": name or cid, "co2e": co2}
-    except FileNotFoundError:
-        return {}
-    except Exception:
-        return {}
-
-    co2_values = [v["co2e"] for v in cat_map.values()]
-    if not co2_values:
-        return cat_map
-
-    min_co2 = min(co2_values)
-    max_co2 = max(co2_values)
 
-    def score_for(co2):
-        try:
-            if max_co2 == min_co2:
-                return 5
-            frac = (co2 - min_co2) / (max_co2 - min_co2)
-            score = 1 + int(frac * 9)
-            return max(1, min(score, 10))
-        except Exception:
-            return 5
-
-    for cid, info in cat_map.items():
-        info["env_score"] = score_for(info.get("co2e", 0.0))
-
-    return cat_map
+def _load_category_map():
+    """Category metadata with env scores, from the shared category registry."""
+    return get_registry(CATEGORY_CSV_PATH).current().mapping
 
 
 CATEGORY_MAP = _load_category_map()
@@ -116,6 +102,64 @@ def _load_user_profiles():
 
 USER_PROFILES = _load_user_profiles()
 
+# the registry snapshot ``CATEGORY_MAP`` was last taken from; a newer one means the file was reloaded
+_category_snapshot_seen = get_registry(CATEGORY_CSV_PATH).current()
+_category_digest = (None, "")
+
+
+@transaction_bp.before_app_request
+def _refresh_category_map():
+    """Pick up a reloaded category table; ``CATEGORY_MAP`` is left alone until the file changes."""
+
+    global CATEGORY_MAP, _category_snapshot_seen
+    categories = get_registry(CATEGORY_CSV_PATH).current()
+    if categories is not _category_snapshot_seen:
+        _category_snapshot_seen = categories
+        CATEGORY_MAP = categories.mapping
+
+
+def _category_map_version():
+    """Content hash of ``CATEGORY_MAP``: the same in every worker that loaded the same table."""
+
+    global _category_digest
+    mapping, digest = _category_digest
+    if mapping is not CATEGORY_MAP:
+        mapping = CATEGORY_MAP
+        encoded = json.dumps(mapping, sort_keys=True, default=str).encode()
+        digest = hashlib.blake2b(encoded, digest_size=8).hexdigest()
+        _category_digest = (mapping, digest)
+    return digest
+
+
+def data_etag():
+    """ETag for responses derived from the stored transactions and ``CATEGORY_MAP``.
+
+    Built from the backend's data version, so computing it never reads rows.
+    """
+
+    try:
+        version = _backend().data_version()
+    except FileNotFoundError:
+        version = "0"
+    return f"{version}.{_category_map_version()}"
+
+
+def not_modified(etag):
+    """A 304 response when the request's ``If-None-Match`` already matches ``etag``."""
+
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def with_etag(response, etag):
+    if etag:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
 
 def _predict_category(merchant_name: str):
     try:
@@ -133,15 +177,7 @@ def _pick_prediction(merchant_name: str):
 
 
 def _env_label_for_score(score):
-    try:
-        value = int(score)
-    except Exception:
-        value = 5
-    if value <= 3:
-        return "good"
-    if value <= 7:
-        return "neutral"
-    return "bad"
+    return env_label(score)
 
 
 def _profile_for_user(user_id):
@@ -177,30 +213,56 @@ def _badge_for(eco_points, low_impact_ratio):
     return "Sprout"
 
 
-def _parse_date(value):
-    if not value:
-        return None
-    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y"):
-        try:
-            return datetime.strptime(value, fmt).date()
-        except Exception:
-            continue
-    return None
-
-
-def _streak_days(dates):
-    if not dates:
+def _streak_days(days):
+    """Length of the run of consecutive epoch days ending at the latest one."""
+    if not days:
         return 0
-    ordered = sorted(dates)
-    current = ordered[-1]
     streak = 0
-    probe = current
-    while probe in dates:
+    probe = max(days)
+    while probe in days:
         streak += 1
-        probe = probe - timedelta(days=1)
+        probe -= 1
     return streak
 
 
+def _backend():
+    return get_backend(CSV_PATH)
+
+
+def _user_co2(user_agg):
+    return sum(spend * CATEGORY_MAP.get(cid, {}).get("co2e", 0.0) for cid, spend in user_agg.category_spend.items())
+
+
+def _user_stats(user_agg):
+    """Derive leaderboard stats from a user's per-category aggregates."""
+    total_co2 = 0.0
+    env_score_sum = 0.0
+    low_impact_count = 0
+    low_impact_dates = set()
+    category_spend = {}
+    for cid, spend in user_agg.category_spend.items():
+        cat_info = CATEGORY_MAP.get(cid, {})
+        count = user_agg.category_counts[cid]
+        env_score = cat_info.get("env_score", 5)
+        total_co2 += spend * cat_info.get("co2e", 0.0)
+        env_score_sum += env_score * count
+        if env_score <= 4:
+            low_impact_count += count
+            low_impact_dates |= user_agg.category_days.get(cid, set())
+        if cid:
+            category_spend[cid] = spend
+    return {
+        "total_spend": user_agg.total_spend,
+        "total_co2": total_co2,
+        "tx_count": user_agg.tx_count,
+        "env_score_sum": env_score_sum,
+        "low_impact_count": low_impact_count,
+        "low_impact_dates": low_impact_dates,
+        "active_dates": user_agg.active_days,
+        "category_spend": category_spend,
+    }
+
+
 def _category_mix(spend_map, total_spend):
     if not spend_map or not total_spend:
         return []
@@ -229,150 +291,322 @@ def _impact_delta(value, cohort_average):
         return None
 
 
+def _transaction_json(row):
+    idx, merchant, cat_id, amount_val, date_str, uid = row
+    cat_info = CATEGORY_MAP.get(cat_id, {})
+    env_score = cat_info.get("env_score", 5)
+    return {
+        "id": idx,
+        "name": merchant,
+        "category": cat_id,
+        "category_name": cat_info.get("name", cat_id),
+        "env_score": env_score,
+        "env_label": _env_label_for_score(env_score),
+        "user_id": uid,
+        "amount": amount_val,
+        "price": amount_val,
+        "date": date_str
+    }
+
+
+def _stream_json_array(items):
+    """Encode an iterable as a JSON array one element at a time."""
+    yield "["
+    for idx, item in enumerate(items):
+        yield ("," if idx else "") + json.dumps(item)
+    yield "]"
+
+
+def _transaction_query(args):
+    """Translate GET /transactions query params into backend filters (ValueError on bad input)."""
+    filters = {}
+    for key in ("user_id", "category_id"):
+        value = (args.get(key) or "").strip()
+        if value:
+            filters[key] = value
+    for param, key in (("from", "start_day"), ("to", "end_day")):
+        value = (args.get(param) or "").strip()
+        if value:
+            day = parse_day(value)
+            if day == NO_DAY:
+                raise ValueError(f"invalid {param} date, use YYYY-MM-DD")
+            filters[key] = day
+    cursor = (args.get("cursor") or "").strip()
+    if cursor:
+        if not cursor.isdigit():
+            raise ValueError("invalid cursor")
+        filters["after_id"] = int(cursor)
+
+    limit = None
+    if args.get("limit") not in (None, ""):
+        try:
+            limit = int(args.get("limit"))
+        except Exception:
+            raise ValueError("limit must be an integer")
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        limit = min(limit, MAX_TRANSACTIONS_PAGE)
+    return filters, limit
+
+
 @transaction_bp.route("/transactions", methods=["GET"])
 def api_transactions():
-    transactions = []
+    """Stream enriched transactions, optionally filtered and cursor-paginated.
+
+    Without ``limit`` every matching row is streamed. With ``limit`` one page
+    is returned and, when more rows remain, the ``X-Next-Cursor`` and ``Link``
+    headers point at the next page (pass it back as ``cursor``).
+    """
+
     try:
-        with open(CSV_PATH, newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for idx, row in enumerate(reader, start=1):
-                cat_id = (row.get("category_id") or "").strip()
-                cat_info = CATEGORY_MAP.get(cat_id, {})
-                env_score = cat_info.get("env_score", 5)
-                amount_val = row.get("amount", 0)
-                try:
-                    amount_val = float(amount_val)
-                except Exception:
-                    amount_val = 0.0
-
-                transactions.append({
-                    "id": idx,
-                    "name": row.get("merchant", ""),
-                    "category": cat_id,
-                    "category_name": cat_info.get("name", cat_id),
-                    "env_score": env_score,
-                    "env_label": _env_label_for_score(env_score),
-                    "user_id": row.get("user_id") or "guest",
-                    "amount": amount_val,
-                    "price": amount_val,
-                    "date": row.get("date", "")
-                })
+        filters, limit = _transaction_query(request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    etag = data_etag()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    headers = {}
+    try:
+        rows = _backend().iter_transactions(**filters, limit=limit + 1 if limit else None)
+        if limit:
+            rows = list(rows)
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = str(rows[-1][0])
+                next_args = request.args.to_dict()
+                next_args["cursor"] = next_cursor
+                headers["X-Next-Cursor"] = next_cursor
+                headers["Link"] = f'<{request.base_url}?{urlencode(next_args)}>; rel="next"'
     except FileNotFoundError:
         return jsonify([])
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
-    return jsonify(transactions)
+    body = _stream_json_array(_transaction_json(row) for row in rows)
+    return with_etag(Response(body, mimetype="application/json", headers=headers), etag)
+
+
+def _cohorts_for(user_id):
+    profile = _profile_for_user(user_id)
+    return {"team": profile.get("team"), "location": profile.get("location")}
+
+
+def _leaderboard():
+    """The shared materialized leaderboard (with team/location cohorts) for the current backend."""
+
+    version = (_category_map_version(), id(USER_PROFILES))
+    return materialized_leaderboard(_backend(), CATEGORY_MAP, version, _cohorts_for)
+
+
+def _leaderboard_limit():
+    try:
+        return max(0, int(request.args.get("limit", 50)))
+    except Exception:
+        return 50
+
+
+def _leaderboard_entry(uid, v, pct, avg_total):
+    try:
+        eco_points = round(100.0 - float(pct), 2)
+    except Exception:
+        eco_points = None
+
+    avg_env_score = round(v["env_score_sum"] / v["tx_count"], 2) if v["tx_count"] else None
+    low_impact_ratio = round(v["low_impact_count"] / v["tx_count"], 3) if v["tx_count"] else 0.0
+    streak_days = _streak_days(v["low_impact_dates"])
+    category_mix = _category_mix(v["category_spend"], v["total_spend"])
+    top_category = category_mix[0] if category_mix else None
+    impact_delta_pct = _impact_delta(v["total_co2"], avg_total)
+    trend = None
+    if impact_delta_pct is not None:
+        if impact_delta_pct <= -5:
+            trend = "up"
+        elif impact_delta_pct >= 5:
+            trend = "down"
+        else:
+            trend = "steady"
+
+    profile = _profile_for_user(uid)
+    badge = profile.get("badge") or _badge_for(eco_points, low_impact_ratio)
+    focus_area = profile.get("focus_area") or (f"{top_category['name']} focus" if top_category else "Balanced habits")
+
+    return {
+        "user_id": uid,
+        "display_name": profile.get("display_name") or uid,
+        "persona": profile.get("persona"),
+        "team": profile.get("team"),
+        "focus_area": focus_area,
+        "highlight_action": profile.get("highlight_action"),
+        "location": profile.get("location"),
+        "avatar_color": profile.get("avatar_color"),
+        "badge": badge,
+        "trend": trend or "steady",
+        "streak_days": streak_days,
+        "low_impact_ratio": low_impact_ratio,
+        "avg_env_score": avg_env_score,
+        "impact_delta_pct": impact_delta_pct,
+        "category_mix": category_mix,
+        "top_category": top_category,
+        "days_active": len(v["active_dates"]),
+        "total_spend": round(v["total_spend"], 2),
+        "total_co2": round(v["total_co2"], 4),
+        "tx_count": v["tx_count"],
+        "eco_score_percentile": round(pct, 2) if pct is not None else None,
+        "eco_points": eco_points,
+    }
+
+
+def _cohort_leaderboard(filters, limit):
+    """Leaderboard of one team/location cohort, ranked within it.
+
+    Reads only the cohort's members: their totals come from the cohort's
+    sorted index and full stats are loaded for the returned rows alone.
+    """
+
+    board = _leaderboard()
+    cohorts = [board.cohort(field, value) for field, value in filters]
+    if any(cohort is None for cohort in cohorts):
+        return []
+    cohort = min(cohorts, key=len)
+    others = [other for other in cohorts if other is not cohort]
+    if others:
+        # team and location together: rank within the intersection
+        totals = {uid: t for uid, t in cohort.totals.items() if all(uid in other.totals for other in others)}
+        if not totals:
+            return []
+        values = list(totals.values())
+        percentile = dict(zip(totals, (float(p) for p in percentiles_of_values(values, values))))
+        avg_total = sum(values) / len(values)
+        ranked = sorted(totals.items(), key=lambda item: item[1])[:limit]
+    else:
+        avg_total = cohort.sum / len(cohort)
+        ranked = cohort.lowest(limit)
+        percentile = {uid: cohort.percentile_of(total) for uid, total in ranked}
+    return _ranked_entries(ranked, percentile, avg_total)
+
+
+def _global_leaderboard(limit):
+    """Leaderboard of every user, from the materialized board's sorted totals.
+
+    Only the returned rows load their full stats (and day sets).
+    """
+
+    board = _leaderboard()
+    if not len(board):
+        return []
+    ranked = board.lowest(limit)
+    percentile = {uid: board.percentile_of(total) for uid, total in ranked}
+    return _ranked_entries(ranked, percentile, board.sum / len(board))
+
+
+def _ranked_entries(ranked, percentile, avg_total):
+    backend = _backend()
+    out = []
+    for idx, (uid, _total) in enumerate(ranked, start=1):
+        agg = backend.user_aggregates(uid, with_days=True).get(uid)
+        if agg is None:
+            continue
+        entry = _leaderboard_entry(uid, _user_stats(agg), percentile[uid], avg_total)
+        entry["rank"] = idx
+        out.append(entry)
+    return out
+
+
+def _window_leaderboard(days, filters, limit):
+    """Leaderboard over the last ``days`` days, from the rolling-window ring buffers.
+
+    ``total_co2``, the percentile, eco points, trend and rank cover the
+    window; the descriptive stats (spend, category mix, streak) stay all-time.
+    """
+
+    board = _leaderboard()
+    windows = board.windows
+    cohorts = [board.cohort(field, value) for field, value in filters]
+    if any(cohort is None for cohort in cohorts):
+        return []
+    if cohorts:
+        members = [(uid, t) for uid, t in windows.lowest(days) if all(uid in c.totals for c in cohorts)]
+        values = [t for _, t in members]
+        percentile = dict(zip((uid for uid, _ in members), (float(p) for p in percentiles_of_values(values, values))))
+        ranked = members[:limit]
+    else:
+        values = None
+        ranked = windows.lowest(days, limit)
+        percentile = {uid: windows.percentile_of(total, days) for uid, total in ranked}
+    if not ranked:
+        return []
+    avg_total = windows.mean(days) if values is None else sum(values) / len(values)
+
+    backend = _backend()
+    label = f"{days}d"
+    out = []
+    for idx, (uid, total) in enumerate(ranked, start=1):
+        agg = backend.user_aggregates(uid, with_days=True).get(uid)
+        if agg is None:
+            continue
+        stats = _user_stats(agg)
+        stats["total_co2"] = total
+        entry = _leaderboard_entry(uid, stats, percentile[uid], avg_total)
+        entry.update(rank=idx, window=label, window_tx_count=windows.tx_count(uid, days))
+        out.append(entry)
+    return out
 
 
 @transaction_bp.route("/leaderboard", methods=["GET"])
 def api_leaderboard():
-    """Return leaderboard of users ranked by eco points (higher is better)."""
+    """Return leaderboard of users ranked by eco points (higher is better).
+
+    ``team`` and/or ``location`` restrict it to that cohort, ranked within it;
+    ``window`` (7d, 30d or 90d) ranks on CO2 over that many recent days.
+    """
 
     try:
-        per_user = {}
-        with open(CSV_PATH, newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                uid = (row.get("user_id") or "guest")
-                try:
-                    amt = float(row.get("amount", 0) or 0)
-                except Exception:
-                    amt = 0.0
-                cid = (row.get("category_id") or "").strip()
-                cat_info = CATEGORY_MAP.get(cid, {})
-                co2e = cat_info.get("co2e", 0.0)
-                total_co2 = amt * co2e
-                stats = per_user.setdefault(uid, {
-                    "total_spend": 0.0,
-                    "total_co2": 0.0,
-                    "tx_count": 0,
-                    "env_score_sum": 0.0,
-                    "low_impact_count": 0,
-                    "low_impact_dates": set(),
-                    "active_dates": set(),
-                    "category_spend": defaultdict(float),
-                    "category_counts": defaultdict(int),
-                })
-                stats["total_spend"] += amt
-                stats["total_co2"] += total_co2
-                stats["tx_count"] += 1
-                env_score = cat_info.get("env_score", 5)
-                stats["env_score_sum"] += env_score
-
-                tx_date = _parse_date(row.get("date", ""))
-                if tx_date:
-                    stats["active_dates"].add(tx_date)
-                if env_score <= 4:
-                    stats["low_impact_count"] += 1
-                    if tx_date:
-                        stats["low_impact_dates"].add(tx_date)
-
-                if cid:
-                    stats["category_spend"][cid] += amt
-                    stats["category_counts"][cid] += 1
-
-        totals = [v["total_co2"] for v in per_user.values()]
-        avg_total = sum(totals) / len(totals) if totals else None
-        out = []
-        for uid, v in per_user.items():
-            pct = percentile_of_value(v["total_co2"], totals) if totals else 0.0
-            try:
-                eco_points = round(100.0 - float(pct), 2)
-            except Exception:
-                eco_points = None
-
-            avg_env_score = round(v["env_score_sum"] / v["tx_count"], 2) if v["tx_count"] else None
-            low_impact_ratio = round(v["low_impact_count"] / v["tx_count"], 3) if v["tx_count"] else 0.0
-            streak_days = _streak_days(v["low_impact_dates"])
-            category_mix = _category_mix(v["category_spend"], v["total_spend"])
-            top_category = category_mix[0] if category_mix else None
-            impact_delta_pct = _impact_delta(v["total_co2"], avg_total)
-            trend = None
-            if impact_delta_pct is not None:
-                if impact_delta_pct <= -5:
-                    trend = "up"
-                elif impact_delta_pct >= 5:
-                    trend = "down"
-                else:
-                    trend = "steady"
-
-            profile = _profile_for_user(uid)
-            badge = profile.get("badge") or _badge_for(eco_points, low_impact_ratio)
-            focus_area = profile.get("focus_area") or (f"{top_category['name']} focus" if top_category else "Balanced habits")
+        window = parse_window(request.args.get("window"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    etag = data_etag()
+    if window:
+        etag = f"{etag}.{today()}"  # windows slide with the calendar day
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
 
-            out.append({
-                "user_id": uid,
-                "display_name": profile.get("display_name") or uid,
-                "persona": profile.get("persona"),
-                "team": profile.get("team"),
-                "focus_area": focus_area,
-                "highlight_action": profile.get("highlight_action"),
-                "location": profile.get("location"),
-                "avatar_color": profile.get("avatar_color"),
-                "badge": badge,
-                "trend": trend or "steady",
-                "streak_days": streak_days,
-                "low_impact_ratio": low_impact_ratio,
-                "avg_env_score": avg_env_score,
-                "impact_delta_pct": impact_delta_pct,
-                "category_mix": category_mix,
-                "top_category": top_category,
-                "days_active": len(v["active_dates"]),
-                "total_spend": round(v["total_spend"], 2),
-                "total_co2": round(v["total_co2"], 4),
-                "tx_count": v["tx_count"],
-                "eco_score_percentile": round(pct, 2) if pct is not None else None,
-                "eco_points": eco_points,
-            })
+    try:
+        limit = _leaderboard_limit()
+        filters = [(field, request.args[field]) for field in ("team", "location") if request.args.get(field)]
+        if window:
+            return with_etag(jsonify(_window_leaderboard(window, filters, limit)), etag)
+        if filters:
+            return with_etag(jsonify(_cohort_leaderboard(filters, limit)), etag)
+        return with_etag(jsonify(_global_leaderboard(limit)), etag)
+    except FileNotFoundError:
+        return jsonify([])
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 500
 
-        out.sort(key=lambda x: (x["eco_points"] is None, -(x["eco_points"] or 0)))
-        for idx, entry in enumerate(out, start=1):
-            entry["rank"] = idx
-        try:
-            limit = int(request.args.get("limit", 50))
-        except Exception:
-            limit = 50
-        return jsonify(out[: max(0, limit)])
+
+@transaction_bp.route("/leaderboard/teams", methods=["GET"])
+def api_leaderboard_teams():
+    """Rank teams (or ``by=location``) on total and per-capita CO2, lowest first.
+
+    ``sort=total`` orders by total CO2; the default orders per capita.
+    """
+
+    etag = data_etag()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    field = "location" if request.args.get("by") == "location" else "team"
+    metric = "total_co2" if request.args.get("sort") == "total" else "per_capita_co2"
+    try:
+        rows = _leaderboard().cohort_rankings(field, by=metric)
+        for row in rows:
+            row["total_co2"] = round(row["total_co2"], 4)
+            row["per_capita_co2"] = round(row["per_capita_co2"], 4)
+        return with_etag(jsonify(rows[:_leaderboard_limit()]), etag)
     except FileNotFoundError:
         return jsonify([])
     except Exception as exc:
@@ -395,63 +629,94 @@ def api_transaction_categories():
         return jsonify({"error": str(exc)}), 500
 
 
+def _category_rollup(agg, level):
+    """``/transactions/top`` rows for the hierarchy nodes at ``level``, rolled up from per-leaf totals."""
+
+    tree = get_registry(CATEGORY_CSV_PATH).current().derived("tree", CategoryTree)
+    ids = list(agg)
+    spend = [agg[cid]["total_spend"] for cid in ids]
+    co2 = [data * CATEGORY_MAP.get(cid, {}).get("co2e", 0.0) for cid, data in zip(ids, spend)]
+    counts = [agg[cid]["count"] for cid in ids]
+    result = []
+    for node in tree.rollup(ids, level, total_spend=spend, total_co2e=co2, count=counts):
+        node_cid = node["category_id"]
+        total_spend, total_co2e = node["total_spend"], node["total_co2e"]
+        result.append({
+            "category_id": node_cid,
+            "name": node["name"],
+            "path": node["path"],
+            "level": node["level"],
+            "total_spend": round(total_spend, 2),
+            "transaction_count": int(node["count"]),
+            "co2e_per_dollar": round(total_co2e / total_spend, 4) if total_spend else 0.0,
+            "env_score": CATEGORY_MAP.get(node_cid, {}).get("env_score") if node_cid else None,
+            "total_co2e": round(total_co2e, 2),
+            "_total_co2e_raw": total_co2e,
+        })
+    return result
+
+
 @transaction_bp.route("/transactions/top", methods=["GET"])
 def api_transactions_top_categories():
     try:
         limit = int(request.args.get("limit", 10))
     except Exception:
         limit = 10
+    level = request.args.get("level")
+    if level is not None:
+        try:
+            level = int(level)
+            if level < 1:
+                raise ValueError
+        except ValueError:
+            return jsonify({"error": "level must be a positive integer"}), 400
+
+    etag = data_etag()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
 
     agg = {}
     try:
-        with open(CSV_PATH, newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                cid = (row.get("category_id") or "").strip()
-                try:
-                    amt = float(row.get("amount", 0) or 0)
-                except Exception:
-                    amt = 0.0
-                agg.setdefault(cid, {"total_spend": 0.0, "count": 0})
-                agg[cid]["total_spend"] += amt
-                agg[cid]["count"] += 1
+        for cid, (spend, count) in _backend().category_totals().items():
+            agg[cid] = {"total_spend": spend, "count": count}
     except FileNotFoundError:
         return jsonify([])
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
 
-    result = []
-    for cid, data in agg.items():
-        cat_info = CATEGORY_MAP.get(cid, {})
-        co2 = cat_info.get("co2e", 0.0)
-        env_score = cat_info.get("env_score", 5)
-        total_spend = data["total_spend"]
-        total_co2e = total_spend * co2
-        result.append({
-            "category_id": cid,
-            "name": cat_info.get("name", cid),
-            "total_spend": round(total_spend, 2),
-            "transaction_count": data["count"],
-            "co2e_per_dollar": co2,
-            "env_score": env_score,
-            "total_co2e": round(total_co2e, 2),
-            "_total_co2e_raw": total_co2e,
-        })
+    if level is not None:
+        result = _category_rollup(agg, level)
+    else:
+        result = []
+        for cid, data in agg.items():
+            cat_info = CATEGORY_MAP.get(cid, {})
+            co2 = cat_info.get("co2e", 0.0)
+            env_score = cat_info.get("env_score", 5)
+            total_spend = data["total_spend"]
+            total_co2e = total_spend * co2
+            result.append({
+                "category_id": cid,
+                "name": cat_info.get("name", cid),
+                "total_spend": round(total_spend, 2),
+                "transaction_count": data["count"],
+                "co2e_per_dollar": co2,
+                "env_score": env_score,
+                "total_co2e": round(total_co2e, 2),
+                "_total_co2e_raw": total_co2e,
+            })
 
     result.sort(key=lambda item: item.get("total_co2e", 0), reverse=True)
 
     try:
         vals = [entry["_total_co2e_raw"] for entry in result]
-        for entry in result:
-            try:
-                v = entry.get("_total_co2e_raw", 0.0)
-                pct = percentile_of_value(v, vals)
-                if pct is None or (isinstance(pct, float) and (math.isnan(pct) or math.isinf(pct))):
-                    entry["percentile"] = None
-                else:
-                    entry["percentile"] = round(float(pct), 2)
-            except Exception:
+        percentiles = percentiles_of_values(vals, vals) if vals else []
+        for entry, pct in zip(result, percentiles):
+            pct = float(pct)
+            if math.isnan(pct) or math.isinf(pct):
                 entry["percentile"] = None
+            else:
+                entry["percentile"] = round(pct, 2)
     except Exception:
         for entry in result:
             entry["percentile"] = None
@@ -459,7 +724,7 @@ def api_transactions_top_categories():
     for entry in result:
         entry.pop("_total_co2e_raw", None)
 
-    return jsonify(result[: max(0, limit)])
+    return with_etag(jsonify(result[: max(0, limit)]), etag)
 
 
 @transaction_bp.route("/transactions", methods=["POST"])
@@ -492,19 +757,14 @@ def api_add_transaction():
         amount = 0.0
 
     try:
-        file_exists = os.path.isfile(CSV_PATH)
-        with open(CSV_PATH, "a", newline="") as csvfile:
-            fieldnames = ["merchant", "category_id", "amount", "date", "user_id"]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            if not file_exists or os.stat(CSV_PATH).st_size == 0:
-                writer.writeheader()
-            writer.writerow({
-                "merchant": merchant,
-                "category_id": category_id,
-                "amount": amount,
-                "date": date,
-                "user_id": user_id,
-            })
+        _backend().append({
+            "merchant": merchant,
+            "category_id": category_id,
+            "amount": amount,
+            "date": date,
+            "user_id": user_id,
+        })
+        invalidate_coaching(user_id)
         resp = {"success": True}
         if prediction_meta:
             resp["predicted_category"] = prediction_meta
@@ -513,6 +773,126 @@ def api_add_transaction():
         return jsonify({"error": str(exc)}), 500
 
 
+def _parse_bulk_body():
+    """Decode a bulk upload as NDJSON (default) or CSV (``text/csv`` or ``?format=csv``)."""
+    text = request.get_data(as_text=True) or ""
+    fmt = (request.args.get("format") or "").strip().lower()
+    if not fmt:
+        fmt = "csv" if (request.mimetype or "").endswith("csv") else "ndjson"
+    if fmt == "csv":
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    if fmt != "ndjson":
+        raise ValueError("format must be ndjson or csv")
+    records = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except Exception:
+            record = None
+        # keep a placeholder so per-row results stay aligned with input lines
+        records.append(record if isinstance(record, dict) else {"__invalid__": f"line {line_no} is not a JSON object"})
+    return records
+
+
+def _bulk_text(data, key):
+    """``data[key]`` as stripped text; JSON numbers (e.g. numeric category ids) are accepted."""
+
+    value = data.get(key)
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"{key} must be a string")
+    return str(value).strip()
+
+
+def _validate_bulk_row(data):
+    if data.get("__invalid__"):
+        return None, data["__invalid__"]
+    try:
+        merchant, date, category_id, user_id = (
+            _bulk_text(data, key) for key in ("merchant", "date", "category_id", "user_id")
+        )
+    except ValueError as exc:
+        return None, str(exc)
+    if not merchant or not date:
+        return None, "merchant and date are required"
+    if parse_day(date) == NO_DAY:
+        return None, "invalid date, use YYYY-MM-DD"
+    amount = data.get("amount", 0.0)
+    try:
+        amount = float(amount if amount not in (None, "") else 0.0)
+    except Exception:
+        return None, "amount must be a number"
+    if math.isnan(amount) or math.isinf(amount):
+        return None, "amount must be a finite number"
+    return {
+        "merchant": merchant,
+        "category_id": category_id,
+        "amount": amount,
+        "date": date,
+        "user_id": user_id or "guest",
+    }, None
+
+
+@transaction_bp.route("/transactions/bulk", methods=["POST"])
+def api_add_transactions_bulk():
+    """Ingest many transactions (NDJSON or CSV) in one validated, batched append.
+
+    Every row is validated and missing categories are classified in a single
+    batch before anything is written; valid rows are then appended together.
+    Responds 201 when every row was stored, 207 when some were rejected and
+    400 when none were.
+    """
+
+    try:
+        records = _parse_bulk_body()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception as exc:
+        return jsonify({"error": f"could not parse upload: {exc}"}), 400
+    if not records:
+        return jsonify({"error": "no rows supplied"}), 400
+    if len(records) > MAX_BULK_ROWS:
+        return jsonify({"error": f"at most {MAX_BULK_ROWS} rows per upload"}), 413
+
+    results = []
+    rows = []
+    for idx, data in enumerate(records):
+        row, error = _validate_bulk_row(data)
+        results.append({"row": idx, "status": "error", "error": error} if error else {"row": idx, "status": "created"})
+        rows.append(row)
+
+    unclassified = [idx for idx, row in enumerate(rows) if row and not row["category_id"]]
+    if unclassified:
+        try:
+            predictions = ml_predict_batch([rows[idx]["merchant"] for idx in unclassified])
+        except Exception:
+            predictions = [[] for _ in unclassified]
+        for idx, preds in zip(unclassified, predictions):
+            if not preds:
+                rows[idx] = None
+                results[idx] = {"row": idx, "status": "error", "error": "category_id is required when classifier has no prediction"}
+                continue
+            top = preds[0]
+            rows[idx]["category_id"] = top.category_id
+            results[idx]["predicted_category"] = {"category_id": top.category_id, "confidence": round(top.confidence, 4)}
+
+    valid = [row for row in rows if row]
+    if valid:
+        try:
+            _backend().append_many(valid)
+        except Exception as exc:
+            return jsonify({"error": str(exc)}), 500
+        for user_id in {row["user_id"] for row in valid}:
+            invalidate_coaching(user_id)
+
+    created = len(valid)
+    status = 201 if created == len(records) else (207 if created else 400)
+    return jsonify({"created": created, "failed": len(records) - created, "results": results}), status
+
+
 @transaction_bp.route("/transactions/classify", methods=["POST"])
 def api_transactions_classify():
     payload = request.get_json(silent=True) or {}
@@ -528,32 +908,37 @@ def api_transactions_classify():
 
 @transaction_bp.route("/transactions/eco-score", methods=["GET"])
 def api_eco_score():
-    """Return the user's eco score (percentile of total CO2 vs. all users)."""
+    """Return the user's eco score (percentile of total CO2 vs. all users).
+
+    With ``window`` (7d, 30d or 90d) the score covers that many recent days,
+    against the users active in them.
+    """
+
+    try:
+        window = parse_window(request.args.get("window"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     try:
         user_id = request.args.get("user_id")
-        per_user = {}
-        with open(CSV_PATH, newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                uid = (row.get("user_id") or "guest")
-                try:
-                    amt = float(row.get("amount", 0) or 0)
-                except Exception:
-                    amt = 0.0
-                cid = (row.get("category_id") or "").strip()
-                cat_info = CATEGORY_MAP.get(cid, {})
-                co2e = cat_info.get("co2e", 0.0)
-                total_co2 = amt * co2e
-                per_user.setdefault(uid, {"total_spend": 0.0, "total_co2": 0.0, "tx_count": 0})
-                per_user[uid]["total_spend"] += amt
-                per_user[uid]["total_co2"] += total_co2
-                per_user[uid]["tx_count"] += 1
-
-        totals = [info["total_co2"] for info in per_user.values()]
         target_uid = user_id or "guest"
-        target_total = per_user.get(target_uid, {"total_co2": 0.0})["total_co2"]
-        percentile = percentile_of_value(target_total, totals) if totals else 0.0
+        board = _leaderboard()
+        if window:
+            windows = board.windows
+            target_total = windows.total(target_uid, window)
+            percentile = windows.percentile_of(target_total, window)
+            return jsonify({
+                "user_id": target_uid,
+                "window": f"{window}d",
+                "total_co2": target_total,
+                "tx_count": windows.tx_count(target_uid, window),
+                "eco_score_percentile": percentile,
+                "eco_points": round(100.0 - percentile, 2),
+                "rank": windows.rank(target_uid, window),
+                "users": windows.active_users(window),
+            })
+        target_total = board.total(target_uid)
+        percentile = board.percentile_of(target_total)
         try:
             eco_points = round(100.0 - float(percentile), 2)
         except Exception:
@@ -563,6 +948,8 @@ def api_eco_score():
             "total_co2": target_total,
             "eco_score_percentile": percentile,
             "eco_points": eco_points,
+            "rank": board.rank(target_uid),
+            "users": len(board),
         })
     except FileNotFoundError:
         return jsonify({"user_id": request.args.get("user_id") or "guest", "total_co2": 0, "eco_score_percentile": 0, "eco_points": 100})
@@ -585,21 +972,7 @@ def api_transactions_total():
         target_year = target.year
         target_month = target.month
 
-        total = 0.0
-        with open(CSV_PATH, newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                date_str = row.get("date", "")
-                try:
-                    tx_date = datetime.strptime(date_str, "%Y-%m-%d")
-                except Exception:
-                    continue
-                if tx_date.year == target_year and tx_date.month == target_month:
-                    try:
-                        amt = float(row.get("amount", 0))
-                    except Exception:
-                        amt = 0.0
-                    total += amt
+        total = _backend().month_total(target_year, target_month)
 
         return jsonify({"month": f"{target_year}-{str(target_month).zfill(2)}", "total": total})
     except ValueError:
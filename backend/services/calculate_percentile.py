@@ -1,7 +1,17 @@
+import os
+
 import pandas as pd
 import numpy as np
 
+try:
+    from .quantile_sketch import KLLSketch, k_for_error
+except ImportError:  # run as a script
+    from quantile_sketch import KLLSketch, k_for_error
+
 EXISTING_DATA_PATH = "../data/raw_data.csv"
+# Above this many reference values percentiles come from a KLL sketch.
+SKETCH_THRESHOLD = int(os.getenv("PERCENTILE_SKETCH_THRESHOLD", "250000"))
+SKETCH_RANK_ERROR = float(os.getenv("PERCENTILE_SKETCH_ERROR", "0.005"))
 
 def get_raw_data () -> list[int]:
     raw_datas_df = pd.read_csv(EXISTING_DATA_PATH)
@@ -16,11 +26,14 @@ def percentile_of_value(importingData: int, raw_data: list[int]) -> float:
 
     Args:
         importingData (int): The value to calculate percentile for.
-        raw_data (list of int): The list of raw numbers.
+        raw_data (list of int or KLLSketch): The list of raw numbers, or a
+            sketch of them for an approximate answer.
 
     Returns:
         float: Percentile rank (0-100) of importingData within raw_data.
     """
+    if isinstance(raw_data, KLLSketch):
+        return raw_data.percentile_of(importingData)
     raw_array = np.array(raw_data)
     # Count values less than importingData
     count_below = np.sum(raw_array < importingData)
@@ -31,6 +44,62 @@ def percentile_of_value(importingData: int, raw_data: list[int]) -> float:
     return percentile
 
 
+def percentiles_of_values(values, raw_data, presorted: bool = False) -> np.ndarray:
+    """
+    Calculate the percentile of every value in ``values`` within ``raw_data``.
+
+    Same "rank" method as ``percentile_of_value`` (half of the ties count as
+    below), but ``raw_data`` is sorted once and the below/equal counts come
+    from binary search, so ranking n values is O(n log n) instead of O(n^2).
+
+    Args:
+        values (sequence of float): The values to calculate percentiles for.
+        raw_data (sequence of float or KLLSketch): The reference numbers, or
+            a sketch of them for approximate answers.
+        presorted (bool): ``raw_data`` is already sorted ascending (e.g. a
+            cached reference), so the sort is skipped.
+
+    Returns:
+        np.ndarray: Percentile ranks (0-100), aligned with ``values``.
+    """
+    if isinstance(raw_data, KLLSketch):
+        return np.array([raw_data.percentile_of(value) for value in np.asarray(values, dtype=float)])
+    values = np.asarray(values, dtype=float)
+    raw_array = np.asarray(raw_data, dtype=float)
+    if not presorted:
+        raw_array = np.sort(raw_array)
+    if raw_array.size == 0:
+        return np.full(values.shape, np.nan)
+    # NaNs sort last and never compare below/equal, exactly as in the scalar version
+    count_below = np.searchsorted(raw_array, values, side="left")
+    count_equal = np.searchsorted(raw_array, values, side="right") - count_below
+    nan_values = np.isnan(values)
+    count_below[nan_values] = 0
+    count_equal[nan_values] = 0
+
+    return (count_below + 0.5 * count_equal) / len(raw_array) * 100
+
+
+def percentile_reference(raw_data, threshold: int = None, rank_error: float = None):
+    """
+    Pick the reference to rank against: the raw values, or a sketch when there are many.
+
+    Args:
+        raw_data (sequence of float): The reference numbers.
+        threshold (int): Use a sketch above this many values (default ``SKETCH_THRESHOLD``).
+        rank_error (float): Target normalized rank error of the sketch
+            (default ``SKETCH_RANK_ERROR``).
+
+    Returns:
+        The raw values unchanged, or a ``KLLSketch`` built from them. Either
+        can be passed to ``percentile_of_value``/``percentiles_of_values``.
+    """
+    threshold = SKETCH_THRESHOLD if threshold is None else threshold
+    if len(raw_data) <= threshold:
+        return raw_data
+    return KLLSketch.from_values(raw_data, k_for_error(rank_error or SKETCH_RANK_ERROR), seed=0)
+
+
 def main(value:int):
     df_with_percentile = get_raw_data()
     percentile = percentile_of_value(value, df_with_percentile)
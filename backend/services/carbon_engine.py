@@ -1,19 +1,26 @@
 import os
-import pandas as pd
+
+import numpy as np
+
+from .category_registry import get_registry
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # services/
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 
 CATEGORIES_FILE = os.path.join(DATA_DIR, "decarbon_categories.csv")
-cat_df = pd.read_csv(CATEGORIES_FILE, dtype={"category_id": str}).set_index("category_id")
+
+def categories():
+    """The shared, hot-reloaded category table this engine scores against."""
+
+    return get_registry(CATEGORIES_FILE).current()
 
 def get_category_info(category_id):
-    if str(category_id) not in cat_df.index:
+    info = categories().mapping.get(str(category_id))
+    if info is None:
         return None
-    row = cat_df.loc[str(category_id)]
     return {
-        "group": row["group"],
-        "co2e_per_dollar": float(row["co2e_per_dollar"])
+        "group": info["group"],
+        "co2e_per_dollar": float(info["co2e"])
     }
 
 def compute_co2_grams(amount, category_id):
@@ -24,18 +31,80 @@ def compute_co2_grams(amount, category_id):
 
 POINTS = {"good": 10, "neutral": 0, "bad": -20}
 
+def _classify(g, co2):
+    if g in ["renewable_energy", "public_transport"] or co2 < 0.1:
+        return "good", "Sustainable category or low CO₂ intensity"
+
+    if g in ["fast_fashion", "electronics"] or co2 > 1.0:
+        return "bad", "High CO₂ intensity category"
+
+    return "neutral", "Moderate CO₂"
+
 def classify_transaction(category_id):
     info = get_category_info(category_id)
     if not info:
         return "neutral", "Unknown category"
 
-    g = info["group"]
-    co2 = info["co2e_per_dollar"]
+    return _classify(info["group"], info["co2e_per_dollar"])
 
-    if g in ["renewable_energy", "public_transport"] or co2 < 0.1:
-        return "good", "Sustainable category or low CO₂ intensity"
 
-    if g in ["fast_fashion", "electronics"] or co2 > 1.0:
-        return "bad", "High CO₂ intensity category"
+# -- batch APIs ---------------------------------------------------------------
+#
+# The scalar functions above do a dict lookup and build a dict per
+# transaction. The batch versions map category ids to the registry's dense
+# codes once per distinct id and then gather from flat arrays, so scoring a
+# whole column is a few NumPy passes.
 
-    return "neutral", "Moderate CO₂"
+LABELS = np.array(["good", "neutral", "bad"])
+_LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+_UNKNOWN_REASON = "Unknown category"
+
+
+class CategoryTable:
+    """This engine's labels, reasons and points as dense arrays over the registry's category codes.
+
+    Code ``len(ids)`` is the "unknown category" row (no CO2, neutral), so
+    unmatched ids need no special casing when gathering.
+    """
+
+    def __init__(self, categories):
+        self.ids = categories.ids
+        self.encode = categories.encode
+        self.unknown = categories.unknown
+        self.co2e_per_dollar = categories.co2e
+        pairs = [_classify(g, c) for g, c in zip(categories.groups, categories.co2e.tolist())]
+        labels = [label for label, _ in pairs]
+        self.label_code = np.array([_LABEL_CODES[label] for label in labels] + [_LABEL_CODES["neutral"]], dtype=np.int8)
+        self.reasons = np.array([reason for _, reason in pairs] + [_UNKNOWN_REASON])
+        self.points = np.array([POINTS[label] for label in LABELS])[self.label_code]
+
+
+def category_table():
+    """:class:`CategoryTable` for the current categories, rebuilt only when they reload."""
+
+    return categories().derived("carbon_engine", CategoryTable)
+
+def compute_co2_grams_batch(amounts, category_ids, table=None):
+    """``compute_co2_grams`` for whole columns: ``amounts * co2e_per_dollar`` (0 for unknown ids)."""
+
+    table = table or category_table()
+    codes = table.encode(category_ids)
+    return np.asarray(amounts, dtype=float) * table.co2e_per_dollar[codes]
+
+def classify_transactions(category_ids, table=None):
+    """``classify_transaction`` for a column: arrays of labels and reasons."""
+
+    table = table or category_table()
+    codes = table.encode(category_ids)
+    return LABELS[table.label_code[codes]], table.reasons[codes]
+
+def score_transactions(amounts, category_ids, table=None):
+    """CO2, good/neutral/bad label and points for every transaction from one category lookup."""
+
+    table = table or category_table()
+    codes = table.encode(category_ids)
+    return {
+        "co2": np.asarray(amounts, dtype=float) * table.co2e_per_dollar[codes],
+        "label": LABELS[table.label_code[codes]],
+        "points": table.points[codes],
+    }
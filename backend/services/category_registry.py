@@ -0,0 +1,267 @@
+"""Shared, hot-reloadable view of ``decarbon_categories.csv``.
+
+The transaction routes, the eco coach and the carbon engine used to parse
+the category table separately at import, and they disagreed on env scores.
+:func:`get_registry` now hands out one :class:`CategoryRegistry` per file.
+Each registry holds an immutable :class:`Categories` snapshot with a dict
+view (``mapping``) and dense per-code arrays (``co2e``, ``env_score``,
+``label_code``).
+
+:meth:`CategoryRegistry.current` stats the file at most every
+``CATEGORY_RELOAD_INTERVAL`` seconds. When the mtime or size has changed it
+parses the file into a fresh snapshot and swaps it in with one reference
+assignment, so a reader sees either the old table or the new one and never
+a mix. A file that fails to parse keeps the previous snapshot.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_CATEGORY_CSV = os.path.join(os.path.dirname(__file__), "../data/decarbon_categories.csv")
+RELOAD_INTERVAL = float(os.environ.get("CATEGORY_RELOAD_INTERVAL", 1.0))
+
+LABELS = ("good", "neutral", "bad")
+DEFAULT_ENV_SCORE = 5
+# Category ids are 8 digits, two for the top level, three for the second and three for the leaf:
+# 13005031 (Filipino) sits under 13005000 (Restaurants) under 13000000 (Food and Drink).
+ID_WIDTH = 8
+ID_PREFIXES = (5, 2)
+
+
+def env_label(score) -> str:
+    """good (1-3), neutral (4-7) or bad (8-10) for an env score."""
+
+    try:
+        value = int(score)
+    except Exception:
+        value = DEFAULT_ENV_SCORE
+    if value <= 3:
+        return "good"
+    if value <= 7:
+        return "neutral"
+    return "bad"
+
+
+def env_scores(co2_values: Sequence[float]) -> List[int]:
+    """1-10 scores min-max scaled over ``co2_values`` (all 5 when they are equal)."""
+
+    if not co2_values:
+        return []
+    low, high = min(co2_values), max(co2_values)
+    if high == low:
+        return [DEFAULT_ENV_SCORE] * len(co2_values)
+    return [max(1, min(1 + int((co2 - low) / (high - low) * 9), 10)) for co2 in co2_values]
+
+
+def id_ancestors(category_id) -> List[str]:
+    """Ancestor ids implied by the id structure, nearest first (empty for ids of another shape)."""
+
+    if not isinstance(category_id, str) or len(category_id) != ID_WIDTH or not category_id.isdigit():
+        return []
+    ancestors = []
+    for keep in ID_PREFIXES:
+        candidate = category_id[:keep].ljust(ID_WIDTH, "0")
+        if candidate != category_id and candidate not in ancestors:
+            ancestors.append(candidate)
+    return ancestors
+
+
+class CategoryMapping(dict):
+    """``{category_id: info}`` whose ``get`` falls back to the nearest known ancestor.
+
+    An id missing from the table (a new leaf, say) resolves to the closest id
+    in :func:`id_ancestors` that is known: at most two more dict probes.
+    ``in``, indexing and iteration only see the table's own ids.
+    """
+
+    def get(self, key, default=None):
+        info = dict.get(self, key)
+        if info is not None:
+            return info
+        for ancestor in id_ancestors(key):
+            info = dict.get(self, ancestor)
+            if info is not None:
+                return info
+        return default
+
+
+class Categories:
+    """One immutable parse of the category table.
+
+    ``mapping`` is ``{category_id: {"name", "group", "co2e", "env_score"}}``
+    (a :class:`CategoryMapping`). ``paths`` holds each category's
+    ``hierarchy`` as a tuple. The arrays are indexed by the code in ``codes``.
+    Code ``len(ids)`` is the unknown-category row (no CO2, neutral score), so
+    ``encode`` never needs special casing.
+    """
+
+    def __init__(self, rows: Sequence[Tuple[str, str, str, float, Tuple[str, ...]]] = (), version: int = 0) -> None:
+        self.version = version
+        self.ids: List[str] = [row[0] for row in rows]
+        self.codes: Dict[str, int] = {cid: code for code, cid in enumerate(self.ids)}
+        self.unknown = len(self.ids)
+        co2 = [row[3] for row in rows]
+        scores = env_scores(co2)
+        self.mapping = CategoryMapping(
+            (cid, {"name": name, "group": group, "co2e": value, "env_score": score})
+            for (cid, name, group, value, _), score in zip(rows, scores)
+        )
+        self.groups: List[str] = [row[2] for row in rows]
+        self.paths: List[Tuple[str, ...]] = [row[4] or (row[1],) for row in rows]
+        self.co2e = np.array(co2 + [0.0], dtype=float)
+        self.env_score = np.array(scores + [DEFAULT_ENV_SCORE], dtype=np.int8)
+        label_codes = {label: code for code, label in enumerate(LABELS)}
+        self.label_code = np.array([label_codes[env_label(score)] for score in self.env_score.tolist()], dtype=np.int8)
+        self._derived: Dict[str, object] = {}
+        self._derived_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def code_of(self, category_id) -> int:
+        """Code of ``category_id``, else of its nearest known ancestor, else ``unknown``."""
+
+        code = self.codes.get(category_id)
+        if code is not None:
+            return code
+        for ancestor in id_ancestors(category_id):
+            code = self.codes.get(ancestor)
+            if code is not None:
+                return code
+        return self.unknown
+
+    def encode(self, category_ids) -> np.ndarray:
+        """Dense codes (see :meth:`code_of`) for ``category_ids``; each distinct id is resolved once."""
+
+        values = np.asarray(category_ids)
+        if values.dtype.kind != "U":
+            values = values.astype(str)
+        if not values.size:
+            return np.empty(values.shape, dtype=np.int64)
+        unique, inverse = np.unique(values, return_inverse=True)
+        lookup = np.array([self.code_of(cid) for cid in unique.tolist()], dtype=np.int64)
+        return lookup[inverse].reshape(values.shape)
+
+    def derived(self, key: str, build: Callable[["Categories"], object]):
+        """``build(self)`` computed once per snapshot, so derived views reload together with it."""
+
+        value = self._derived.get(key)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = build(self)
+        return value
+
+
+def parse_categories(path: str, version: int = 0) -> Categories:
+    """Parse ``path`` into a :class:`Categories` snapshot; raises ``OSError`` when it cannot be read."""
+
+    rows = []
+    seen = set()
+    with open(path, newline="") as csvfile:
+        for row in csv.DictReader(csvfile):
+            cid = (row.get("category_id") or "").strip()
+            if not cid or cid in seen:
+                continue
+            seen.add(cid)
+            co2_raw = (row.get("co2e_per_dollar") or "").strip()
+            try:
+                co2 = float(co2_raw) if co2_raw else 0.0
+            except Exception:
+                co2 = 0.0
+            group = (row.get("group") or "").strip()
+            hier = row.get("hierarchy") or ""
+            path = tuple(part.strip() for part in next(csv.reader([hier])) if part.strip()) if hier.strip() else ()
+            name = hier.replace('"', "").split(",")[-1].strip() if hier else group
+            rows.append((cid, name or cid, group, co2, path))
+    return Categories(rows, version)
+
+
+def _file_signature(path: str) -> Tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class CategoryRegistry:
+    """The current :class:`Categories` for one CSV, re-parsed when the file changes."""
+
+    def __init__(self, path: str, reload_interval: float = RELOAD_INTERVAL) -> None:
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._signature = _file_signature(path)
+        self._checked = time.monotonic()
+        self._current = self._parse(1)
+
+    def _parse(self, version: int) -> Categories:
+        try:
+            return parse_categories(self.path, version)
+        except Exception as exc:
+            if self._signature is not None:
+                print(f"[category_registry] could not load {self.path}: {exc}")
+            return Categories(version=version)
+
+    @property
+    def version(self) -> int:
+        return self._current.version
+
+    def current(self) -> Categories:
+        """The latest snapshot, reloading first when the file changed since the last check."""
+
+        now = time.monotonic()
+        if now - self._checked >= self.reload_interval:
+            self.reload(now)
+        return self._current
+
+    def reload(self, now: float | None = None) -> bool:
+        """Re-parse the file if its mtime/size changed; returns True when a new snapshot was swapped in."""
+
+        with self._lock:
+            self._checked = time.monotonic() if now is None else now
+            signature = _file_signature(self.path)
+            if signature == self._signature:
+                return False
+            try:
+                categories = parse_categories(self.path, self._current.version + 1)
+            except Exception as exc:
+                if signature is not None:
+                    # e.g. caught mid-rewrite; the next check retries
+                    print(f"[category_registry] keeping previous categories: {exc}")
+                    return False
+                categories = Categories(version=self._current.version + 1)
+            self._signature = signature
+            self._current = categories
+            return True
+
+
+_REGISTRIES: Dict[str, CategoryRegistry] = {}
+_LOCK = threading.Lock()
+
+
+def get_registry(path: str | None = None) -> CategoryRegistry:
+    """Return the (cached) registry for ``path`` (defaults to ``data/decarbon_categories.csv``)."""
+
+    key = os.path.abspath(path or DEFAULT_CATEGORY_CSV)
+    registry = _REGISTRIES.get(key)
+    if registry is not None:
+        return registry
+    with _LOCK:
+        registry = _REGISTRIES.get(key)
+        if registry is None:
+            registry = _REGISTRIES[key] = CategoryRegistry(key)
+    return registry
+
+
+def current_categories(path: str | None = None) -> Categories:
+    return get_registry(path).current()
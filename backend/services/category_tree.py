@@ -0,0 +1,106 @@
+"""Category hierarchy from the ``hierarchy`` column, with single-pass rollups.
+
+Every distinct hierarchy prefix is a node, e.g. "Food and Drink" >
+"Restaurants" > "Filipino". Each node has a parent pointer and a depth
+(1 for top-level nodes). A prefix with no row of its own still gets a node,
+so every category ends a complete chain. ``ancestors[node, level - 1]`` is
+precomputed as the node's ancestor at ``level``, or the node itself when it is
+shallower. Rolling per-leaf aggregates up to any level is then one gather
+plus one ``np.bincount`` per column.
+
+Build it once per category snapshot with ``categories.derived("tree", CategoryTree)``.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+UNCATEGORIZED = "Uncategorized"
+
+
+class CategoryTree:
+    """Nodes for every hierarchy prefix of a :class:`~services.category_registry.Categories` snapshot."""
+
+    def __init__(self, categories) -> None:
+        self.categories = categories
+        self.paths: List[Tuple[str, ...]] = []
+        self.category_ids: List[str | None] = []
+        self._nodes: Dict[Tuple[str, ...], int] = {}
+        parents: List[int] = []
+
+        leaf_nodes = []
+        for cid, path in zip(categories.ids, categories.paths):
+            node = self._node(path, parents)
+            if self.category_ids[node] is None:
+                self.category_ids[node] = cid
+            leaf_nodes.append(node)
+        # ids that resolve to no known category roll up into one top-level node
+        self.uncategorized = self._node((UNCATEGORIZED,), parents)
+        leaf_nodes.append(self.uncategorized)
+
+        self.parent = np.array(parents, dtype=np.int64)
+        self.depth = np.array([len(path) for path in self.paths], dtype=np.int64)
+        self.max_depth = int(self.depth.max())
+        self.leaf_node = np.array(leaf_nodes, dtype=np.int64)  # category code -> node
+
+        self.ancestors = np.empty((len(self.paths), self.max_depth), dtype=np.int64)
+        # paths are registered parents-first, so a parent's row is filled before its children's
+        for node, parent in enumerate(parents):
+            depth = len(self.paths[node])
+            if parent >= 0:
+                self.ancestors[node, : depth - 1] = self.ancestors[parent, : depth - 1]
+            self.ancestors[node, depth - 1:] = node
+
+    def _node(self, path: Tuple[str, ...], parents: List[int]) -> int:
+        node = self._nodes.get(path)
+        if node is not None:
+            return node
+        parent = self._node(path[:-1], parents) if len(path) > 1 else -1
+        node = self._nodes[path] = len(self.paths)
+        self.paths.append(path)
+        self.category_ids.append(None)
+        parents.append(parent)
+        return node
+
+    def node_for(self, category_id: str) -> int:
+        """Node of ``category_id``, or of its nearest known ancestor id."""
+
+        return int(self.leaf_node[self.categories.code_of(category_id)])
+
+    def rollup(
+        self,
+        category_ids: Sequence[str],
+        level: int,
+        **columns: Sequence[float],
+    ) -> List[Dict[str, object]]:
+        """Sum per-leaf ``columns`` into the nodes at ``level`` (deeper levels clamp to the leaves).
+
+        Returns one dict per node that received a leaf, holding ``node``,
+        ``category_id`` (None for a prefix with no row of its own), ``name``,
+        ``path``, ``level`` and every column's total.
+        """
+
+        level = max(1, min(int(level), self.max_depth))
+        codes = self.categories.encode(list(category_ids))
+        nodes = self.ancestors[self.leaf_node[codes], level - 1]
+        size = len(self.paths)
+        present = np.bincount(nodes, minlength=size) > 0
+        totals = {
+            name: np.bincount(nodes, weights=np.asarray(values, dtype=float), minlength=size)
+            for name, values in columns.items()
+        }
+        out = []
+        for node in np.flatnonzero(present).tolist():
+            path = self.paths[node]
+            row = {
+                "node": node,
+                "category_id": self.category_ids[node],
+                "name": path[-1],
+                "path": list(path),
+                "level": len(path),
+            }
+            row.update((name, float(total[node])) for name, total in totals.items())
+            out.append(row)
+        return out
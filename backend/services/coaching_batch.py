@@ -0,0 +1,203 @@
+"""Offline weekly coaching digests for every user.
+
+Calling ``generate_coaching_payload`` once per user re-reads transactions
+once per user. This job makes one pass over the backend's transactions and
+groups each user's dated rows. Sorted users are then cut into shards of
+``--chunk-users``. Each shard goes to one of ``--workers`` processes, which
+builds its own :class:`~.weekly_index.WeeklyIndex`, the users' last
+``--weeks`` profiles, their suggestions and the JSON lines. The parent only
+reads rows and writes finished text.
+
+Each user's payload is written as one NDJSON line, in user order, matching
+what ``/coaching/suggestions`` would return apart from ``generated_at``,
+which is the same for the whole run. Users whose rows are all undated get
+an empty profile list, as the API gives them. Throughput and peak memory go
+to stdout as one JSON object. ``--compare-serial`` also times the same
+shards in-process and reports the speedup::
+
+    python -m services.coaching_batch --csv data/transactions.csv --out digests.ndjson --workers 4 --compare-serial
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Mapping, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+from . import dates, eco_coach
+from .eco_coach import payload_from_profiles, profiles_from_weeks
+from .storage import get_backend
+from .weekly_index import WeeklyIndex
+
+BATCH_WORKERS = int(os.environ.get("COACHING_BATCH_WORKERS", min(4, os.cpu_count() or 1)))
+CHUNK_USERS = 2000
+
+UserRows = List[Tuple[int, str, float]]  # (epoch day, category_id, amount)
+Shard = List[Tuple[str, UserRows]]
+
+_worker_categories: Mapping[str, Mapping[str, object]] | None = None
+
+
+def collect_user_rows(csv_path: str) -> Tuple[Dict[str, UserRows], int]:
+    """One pass over every stored transaction: each user's dated rows, plus the row count.
+
+    Users whose rows are all undated are kept with an empty list.
+    """
+
+    users: Dict[str, UserRows] = {}
+    rows = 0
+    for _row_id, _merchant, category_id, amount, date, user_id in get_backend(csv_path).iter_transactions():
+        user_rows = users.get(user_id)
+        if user_rows is None:
+            user_rows = users[user_id] = []
+        day = dates.parse_day(date)
+        if day != dates.NO_DAY:
+            user_rows.append((day, category_id, amount))
+        rows += 1
+    return users, rows
+
+
+def _shards(users: Dict[str, UserRows], chunk_users: int) -> Iterator[Shard]:
+    ordered = sorted(users)
+    chunk_users = max(1, chunk_users)
+    for start in range(0, len(ordered), chunk_users):
+        yield [(user_id, users[user_id]) for user_id in ordered[start:start + chunk_users]]
+
+
+def _init_worker(category_map: Mapping[str, Mapping[str, object]]) -> None:
+    global _worker_categories
+    _worker_categories = category_map
+
+
+def digest_shard(
+    shard: Shard,
+    weeks: int,
+    generated_at: str,
+    category_map: Mapping[str, Mapping[str, object]] | None = None,
+) -> str:
+    """NDJSON payloads for a shard of users, built from their raw rows."""
+
+    category_map = _worker_categories if category_map is None else category_map
+    index = WeeklyIndex()
+    lines = []
+    for user_id, user_rows in shard:
+        for day, category_id, amount in user_rows:
+            index.add(user_id, day, category_id, amount)
+        profiles = profiles_from_weeks(index.recent(user_id, weeks), category_map)
+        lines.append(json.dumps(payload_from_profiles(user_id, profiles, generated_at)) + "\n")
+    return "".join(lines)
+
+
+def _digest_serial(users, weeks, chunk_users, generated_at, category_map, out) -> None:
+    for shard in _shards(users, chunk_users):
+        out.write(digest_shard(shard, weeks, generated_at, category_map))
+
+
+def _digest_pool(users, weeks, chunk_users, generated_at, category_map, out, workers) -> None:
+    context = multiprocessing.get_context("spawn")  # never fork a process that may hold threads and locks
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(category_map,)
+    ) as pool:
+        # a bounded window of shards in flight keeps memory flat; results are written in user order
+        pending = deque()
+        for shard in _shards(users, chunk_users):
+            pending.append(pool.submit(digest_shard, shard, weeks, generated_at))
+            if len(pending) >= 2 * workers:
+                out.write(pending.popleft().result())
+        while pending:
+            out.write(pending.popleft().result())
+
+
+def _peak_rss_mb(who) -> float:
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)  # KiB on Linux
+
+
+def run_batch(
+    csv_path: str,
+    out_path: str,
+    weeks: int = 4,
+    workers: int = BATCH_WORKERS,
+    chunk_users: int = CHUNK_USERS,
+    compare_serial: bool = False,
+) -> Dict[str, object]:
+    """Write one coaching payload per user to ``out_path`` (NDJSON) and return run statistics.
+
+    With ``compare_serial`` a pooled run also digests every shard in-process
+    (output discarded) and reports ``serial_digest_seconds`` and ``speedup``.
+    """
+
+    began = time.perf_counter()
+    users, rows = collect_user_rows(csv_path)
+    collected = time.perf_counter()
+    generated_at = datetime.now(timezone.utc).isoformat()
+    category_map = eco_coach._category_map()
+
+    used_workers = 1
+    with open(out_path, "w") as out:
+        if workers > 1 and len(users) > chunk_users:
+            try:
+                _digest_pool(users, weeks, chunk_users, generated_at, category_map, out, workers)
+                used_workers = workers
+            except (OSError, BrokenProcessPool) as exc:
+                print(f"[coaching_batch] falling back to serial digests: {exc}")
+                out.seek(0)
+                out.truncate()
+        if used_workers == 1:
+            _digest_serial(users, weeks, chunk_users, generated_at, category_map, out)
+    finished = time.perf_counter()
+
+    n_users = len(users)
+    seconds = finished - began
+    stats = {
+        "users": n_users,
+        "rows": rows,
+        "workers": used_workers,
+        "collect_seconds": round(collected - began, 3),
+        "digest_seconds": round(finished - collected, 3),
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+        "users_per_second": round(n_users / seconds, 1) if seconds else None,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "peak_worker_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource and used_workers > 1 else None,
+        "out": out_path,
+    }
+    if compare_serial:
+        started = time.perf_counter()
+        with open(os.devnull, "w") as sink:
+            _digest_serial(users, weeks, chunk_users, generated_at, category_map, sink)
+        serial = time.perf_counter() - started
+        stats["serial_digest_seconds"] = round(serial, 3)
+        stats["speedup"] = round(serial / (finished - collected), 2) if finished > collected else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write weekly coaching digests for every user as NDJSON")
+    parser.add_argument("--csv", default=eco_coach.TRANSACTION_CSV)
+    parser.add_argument("--out", default="coaching_digests.ndjson")
+    parser.add_argument("--weeks", type=int, default=4, help="Historical weeks per user (max 8, as in the API)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--chunk-users", type=int, default=CHUNK_USERS)
+    parser.add_argument("--compare-serial", action="store_true", help="Also time an in-process run and report the speedup")
+    args = parser.parse_args()
+
+    stats = run_batch(
+        args.csv, args.out, max(1, min(args.weeks, 8)), args.workers, args.chunk_users, args.compare_serial
+    )
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
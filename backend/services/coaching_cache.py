@@ -0,0 +1,109 @@
+"""Bounded LRU/TTL cache for per-user payloads, invalidated per user on write.
+
+``/coaching/suggestions`` used to rebuild a user's profiles and suggestions
+on every GET, although the answer only changes when that user's
+transactions change. :class:`PayloadCache` keeps up to ``max_entries``
+payloads in least-recently-used order. Each entry also expires ``ttl``
+seconds after it was computed, which bounds staleness for writes this
+process does not see, such as another worker appending to the CSV.
+
+Entries are keyed by ``(user_id, user version) + key``. :meth:`invalidate`
+bumps the user's version and drops that user's entries. A payload that was
+being computed while its user was invalidated is therefore not stored, and
+other users' entries stay warm.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Set, Tuple
+
+CACHE_SIZE = int(os.environ.get("COACHING_CACHE_SIZE", 4096))
+CACHE_TTL = float(os.environ.get("COACHING_CACHE_TTL", 300))
+
+
+class PayloadCache:
+    """LRU of ``compute()`` results with a time-to-live and per-user invalidation."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple, Tuple[float, object]]" = OrderedDict()
+        self._by_user: Dict[str, Set[Tuple]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, user_id: str, key: Tuple[Hashable, ...], compute: Callable[[], object]):
+        """The cached payload for ``user_id`` and ``key``, else ``compute()`` (cached on the way out)."""
+
+        with self._lock:
+            version = self._versions.get(user_id, 0)
+            full_key = (user_id, version) + tuple(key)
+            entry = self._entries.get(full_key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._drop(full_key)
+            self.misses += 1
+
+        payload = compute()
+        if self.max_entries <= 0:
+            return payload
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return payload  # the user wrote while this was computed
+            self._entries[full_key] = (self._clock() + self.ttl, payload)
+            self._entries.move_to_end(full_key)
+            self._by_user.setdefault(user_id, set()).add(full_key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return payload
+
+    def _drop(self, full_key: Tuple) -> None:
+        self._entries.pop(full_key, None)
+        keys = self._by_user.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key)
+            if not keys:
+                del self._by_user[full_key[0]]
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget ``user_id``'s payloads, including any being computed right now."""
+
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            for full_key in self._by_user.pop(user_id, ()):
+                self._entries.pop(full_key, None)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._versions.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+            }
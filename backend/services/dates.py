@@ -0,0 +1,94 @@
+"""Shared date normalization for transaction dates.
+
+Transactions store dates as free-form strings in one of ``DATE_FORMATS``.
+Everything downstream works on integer epoch days (days since 1970-01-01,
+``NO_DAY`` when a value cannot be parsed) and month indexes (months since
+1970-01). Parsing goes through :func:`parse_day`, which is memoized and has a
+fast path for ISO dates, so each distinct string costs one ``strptime`` at
+most; :func:`parse_days` normalizes a whole column at once.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+import numpy as np
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NO_DAY = np.iinfo(np.int32).min
+NO_MONTH = -1
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y")
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_day(value: str) -> int:
+    """Epoch day of ``value`` in any of ``DATE_FORMATS``; ``NO_DAY`` if unparseable."""
+
+    if not value:
+        return NO_DAY
+    if len(value) == 10 and value[4] == "-" and value[7] == "-":
+        year, month, day = value[:4], value[5:7], value[8:]
+        if year.isdigit() and month.isdigit() and day.isdigit():
+            try:
+                return date(int(year), int(month), int(day)).toordinal() - EPOCH_ORDINAL
+            except ValueError:
+                return NO_DAY
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).toordinal() - EPOCH_ORDINAL
+        except Exception:
+            continue
+    return NO_DAY
+
+
+def parse_days(values: Iterable[str], count: int = -1) -> np.ndarray:
+    """Vector of epoch days for ``values``; each distinct string is parsed once."""
+
+    return np.fromiter(map(parse_day, values), dtype=np.int32, count=count)
+
+
+def day_to_date(day: int) -> date:
+    return date.fromordinal(int(day) + EPOCH_ORDINAL)
+
+
+@lru_cache(maxsize=1 << 16)
+def iso_week(day: int) -> Tuple[int, int]:
+    """``(iso_year, iso_week)`` containing epoch ``day``."""
+
+    iso_year, week, _ = day_to_date(day).isocalendar()
+    return iso_year, week
+
+
+def date_to_day(value: date) -> int:
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def today() -> int:
+    """Epoch day of the local calendar date."""
+
+    return date_to_day(date.today())
+
+
+def month_index(year: int, month: int) -> int:
+    """Months since 1970-01, the key used for per-month aggregates."""
+
+    return (year - 1970) * 12 + month - 1
+
+
+def day_to_month(day: int) -> int:
+    if day == NO_DAY:
+        return NO_MONTH
+    value = day_to_date(day)
+    return month_index(value.year, value.month)
+
+
+def days_to_months(days: np.ndarray) -> np.ndarray:
+    """Vectorized :func:`day_to_month` (``NO_DAY`` maps to ``NO_MONTH``)."""
+
+    days = np.asarray(days)
+    valid = days != NO_DAY
+    months = np.full(days.shape, NO_MONTH, dtype=np.int32)
+    months[valid] = days[valid].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return months
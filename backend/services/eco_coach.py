@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
-import csv
 import os
-from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Dict, List
 
+from .category_registry import env_label, get_registry
+from .coaching_cache import PayloadCache
+from .storage import get_backend
+from .weekly_index import weekly_index
+
 TRANSACTION_CSV_ENV = "ECO_COACH_TRANSACTIONS_CSV"
 CATEGORY_CSV_ENV = "ECO_COACH_CATEGORIES_CSV"
 _DEFAULT_TX = os.path.join(os.path.dirname(__file__), "../data/transactions.csv")
@@ -29,120 +32,71 @@ class CoachingSuggestion:
     status: str = "new"
 
 
-def _load_category_map(path: str = CATEGORY_CSV_PATH):
-    mapping: Dict[str, Dict[str, float | str]] = {}
-    if not path or not os.path.exists(path):
-        return mapping
-    try:
-        with open(path, newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                cid = (row.get("category_id") or "").strip()
-                if not cid:
-                    continue
-                co2_raw = (row.get("co2e_per_dollar") or "").strip()
-                try:
-                    co2 = float(co2_raw) if co2_raw else 0.0
-                except Exception:
-                    co2 = 0.0
-                hier = (row.get("hierarchy") or "").replace('"', "")
-                name = hier.split(",")[-1].strip() if hier else (row.get("group") or cid)
-                mapping[cid] = {
-                    "name": name or cid,
-                    "co2e": co2,
-                    "env_score": _score_for_co2(co2),
-                }
-    except Exception:
-        return mapping
-    return mapping
+def _load_category_map(path: str | None = None):
+    """Category metadata with env scores, from the shared category registry."""
+    return get_registry(path or CATEGORY_CSV_PATH).current().mapping
+
 
+def _category_map() -> Dict[str, Dict[str, object]]:
+    """``CATEGORY_MAP``, replaced by the registry's table once the category file changes."""
 
-def _score_for_co2(value: float) -> int:
-    if value <= 0:
-        return 4
-    if value < 10:
-        return 3
-    if value < 30:
-        return 5
-    if value < 60:
-        return 7
-    if value < 100:
-        return 8
-    return 9
+    global CATEGORY_MAP, _category_snapshot_seen
+    categories = get_registry(CATEGORY_CSV_PATH).current()
+    if categories is not _category_snapshot_seen:
+        _category_snapshot_seen = categories
+        CATEGORY_MAP = categories.mapping
+    return CATEGORY_MAP
 
 
 CATEGORY_MAP = _load_category_map()
+_category_snapshot_seen = get_registry(CATEGORY_CSV_PATH).current()
 
 
 def _env_label(score: int | float | None) -> str:
+    return env_label(score or 5)
+
+
+def _user_weeks(user_id: str, max_weeks: int, csv_path: str | None = None):
+    """The user's newest ``max_weeks`` ISO-week buckets from the backend's weekly index."""
+    path = csv_path or TRANSACTION_CSV
+    if not path:
+        return []
     try:
-        val = int(score or 5)
+        return weekly_index(get_backend(path)).recent(user_id, max_weeks)
     except Exception:
-        val = 5
-    if val <= 3:
-        return "good"
-    if val <= 7:
-        return "neutral"
-    return "bad"
+        return []
 
 
-def _iter_transactions(csv_path: str | None = None):
+def _user_stamp(user_id: str, csv_path: str | None = None):
+    """``(index generation, dated rows)`` for ``user_id``; changes whenever their weeks do."""
     path = csv_path or TRANSACTION_CSV
-    if not path or not os.path.exists(path):
-        return
+    if not path:
+        return None
     try:
-        with open(path, newline="") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                yield row
+        index = weekly_index(get_backend(path))
     except Exception:
-        return
+        return None
+    return index.generation, index.rows.get(user_id, 0)
 
 
 def build_weekly_profiles(user_id: str, max_weeks: int = 4) -> List[Dict[str, object]]:
-    """Aggregate transactions into ISO week summaries for the user."""
-
-    buckets: Dict[tuple[int, int], Dict[str, object]] = {}
-    for row in _iter_transactions():
-        uid = (row.get("user_id") or "guest").strip() or "guest"
-        if uid != user_id:
-            continue
-        date_str = row.get("date", "")
-        try:
-            tx_date = datetime.strptime(date_str, "%Y-%m-%d")
-        except Exception:
-            continue
-        iso_year, iso_week, _ = tx_date.isocalendar()
-        key = (iso_year, iso_week)
-        bucket = buckets.setdefault(
-            key,
-            {
-                "year": iso_year,
-                "week": iso_week,
-                "total_spend": 0.0,
-                "total_co2": 0.0,
-                "category_impacts": defaultdict(float),
-            },
-        )
-        try:
-            amount = float(row.get("amount", 0) or 0)
-        except Exception:
-            amount = 0.0
-        cat_id = (row.get("category_id") or "").strip()
-        cat_info = CATEGORY_MAP.get(cat_id, {})
-        co2e = float(cat_info.get("co2e", 0.0))
-        impact = amount * co2e
-        bucket["total_spend"] += amount
-        bucket["total_co2"] += impact
-        bucket["category_impacts"][cat_id or "UNKNOWN"] += impact
+    """Summaries of the user's most recent ISO weeks, read from the per-user weekly index."""
+
+    return profiles_from_weeks(_user_weeks(user_id, max_weeks), _category_map())
+
+
+def profiles_from_weeks(weeks, category_map) -> List[Dict[str, object]]:
+    """Profile dicts for ``[((iso_year, iso_week), WeekBucket), ...]``, CO2 taken from ``category_map``."""
 
     profiles: List[Dict[str, object]] = []
-    for key in sorted(buckets.keys(), reverse=True):
-        bucket = buckets[key]
-        impacts: Dict[str, float] = bucket.pop("category_impacts")  # type: ignore[assignment]
+    for (iso_year, iso_week), week in weeks:
+        impacts = [
+            (cat_id, spend * float(category_map.get(cat_id, {}).get("co2e", 0.0)))
+            for cat_id, spend in week.category_spend.items()
+        ]
         top_categories = []
-        for cat_id, total in sorted(impacts.items(), key=lambda item: item[1], reverse=True):
-            info = CATEGORY_MAP.get(cat_id, {})
+        for cat_id, total in sorted(impacts, key=lambda item: item[1], reverse=True):
+            info = category_map.get(cat_id, {})
             env_score = info.get("env_score", 5)
             top_categories.append(
                 {
@@ -153,16 +107,20 @@ def build_weekly_profiles(user_id: str, max_weeks: int = 4) -> List[Dict[str, ob
                     "env_label": _env_label(env_score),
                 }
             )
-        bucket["top_categories"] = top_categories
-        bucket["total_spend"] = round(bucket["total_spend"], 2)
-        bucket["total_co2"] = round(bucket["total_co2"], 2)
         try:
-            bucket["week_start"] = datetime.fromisocalendar(bucket["year"], bucket["week"], 1).strftime("%Y-%m-%d")
+            week_start = datetime.fromisocalendar(iso_year, iso_week, 1).strftime("%Y-%m-%d")
         except Exception:
-            bucket["week_start"] = None
-        profiles.append(bucket)
-        if len(profiles) >= max_weeks:
-            break
+            week_start = None
+        profiles.append(
+            {
+                "year": iso_year,
+                "week": iso_week,
+                "total_spend": round(week.spend, 2),
+                "total_co2": round(sum(total for _, total in impacts), 2),
+                "top_categories": top_categories,
+                "week_start": week_start,
+            }
+        )
     return profiles
 
 
@@ -223,7 +181,10 @@ def _suggestions_from_profile(user_id: str, profile: Dict[str, object]) -> List[
 
 
 def generate_coaching_payload(user_id: str, weeks: int = 4) -> Dict[str, object]:
-    profiles = build_weekly_profiles(user_id, max_weeks=weeks)
+    return payload_from_profiles(user_id, build_weekly_profiles(user_id, max_weeks=weeks))
+
+
+def payload_from_profiles(user_id: str, profiles: List[Dict[str, object]], generated_at: str | None = None) -> Dict[str, object]:
     latest = profiles[0] if profiles else None
     suggestions: List[CoachingSuggestion] = []
     if latest:
@@ -243,7 +204,30 @@ def generate_coaching_payload(user_id: str, weeks: int = 4) -> Dict[str, object]
 
     return {
         "user_id": user_id,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "generated_at": generated_at or datetime.now(timezone.utc).isoformat(),
         "profiles": profiles,
         "suggestions": [s.__dict__ for s in suggestions],
-    }
\ No newline at end of file
+    }
+
+
+PAYLOAD_CACHE = PayloadCache()
+
+
+def cached_coaching_payload(user_id: str, weeks: int = 4) -> Dict[str, object]:
+    """:func:`generate_coaching_payload` through :data:`PAYLOAD_CACHE`.
+
+    A hit returns the payload as it was generated, ``generated_at`` included.
+    The key carries the user's stamp in the weekly index, which follows the
+    shared transactions file, so rows written by another worker or edited
+    by hand are seen on the next request rather than after the TTL.
+    """
+
+    _category_map()  # pick up a reloaded category table before keying on its version
+    key = (TRANSACTION_CSV, weeks, CATEGORY_CSV_PATH, _category_snapshot_seen.version, _user_stamp(user_id))
+    return PAYLOAD_CACHE.get_or_compute(user_id, key, lambda: generate_coaching_payload(user_id, weeks=weeks))
+
+
+def invalidate_user(user_id: str) -> None:
+    """Drop ``user_id``'s cached payloads; call after writing transactions for them."""
+
+    PAYLOAD_CACHE.invalidate(user_id)
@@ -1,11 +1,42 @@
+"""Batch eco scoring of transaction files.
+
+Classifies every transaction as good/neutral/bad, awards eco points,
+estimates the CO2 a low-impact alternative would have saved, and rolls
+everything up per user with a percentile and a badge. Transactions are
+streamed ``chunksize`` rows at a time. Each chunk is scored with vectorized
+``map``/``np.select`` and its per-user sums are merged into a running
+aggregate, so files larger than memory work. Results are written as Parquet::
+
+    python -m services.ecoscore_system --transactions data/transactions.csv \\
+        --categories data/decarbon_categories.csv --out user_scores.parquet \\
+        [--transactions-out scored.parquet] [--category-info-out categories.parquet]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from typing import Iterator, Tuple
+
+import numpy as np
 import pandas as pd
 
-# Load CSVs
-transactions = pd.read_csv("transactions.csv")
-co2e_data = pd.read_csv("co2e_categories.csv")
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - only needed for streamed Parquet output
+    pa = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # services/
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+TRANSACTIONS_FILE = os.path.join(DATA_DIR, "transactions.csv")
+CATEGORIES_FILE = os.path.join(DATA_DIR, "decarbon_categories.csv")
+CHUNK_ROWS = 500_000
+# read as text even when a chunk holds only blanks, so every chunk has the Parquet schema of the first
+TEXT_COLUMNS = ('date', 'merchant', 'user_id', 'name', 'description')
 
 # Low-impact alternatives (example mapping)
-low_impact = {
+LOW_IMPACT = {
     'fast_fashion': 0.1,
     'electronics': 0.05,
     'rideshare': 0.02,
@@ -13,78 +44,188 @@ low_impact = {
     'public_transport': 0.01,
     'renewable_energy': 0.0
 }
+HIGH_IMPACT_CATEGORIES = ['fast_fashion', 'electronics', 'rideshare']
+ESSENTIAL_SUSTAINABLE_CATEGORIES = ['groceries', 'public_transport', 'renewable_energy']
+POINTS = {'good': 10, 'neutral': 0, 'bad': -20}
+REASONS = {
+    'good': 'Low CO2 or sustainable essential',
+    'bad': 'High CO2 or high-impact industry',
+    'neutral': 'Moderate impact',
+}
+# (minimum percentile, badge), checked in order
+BADGES = [(99, 'Echo Elite'), (90, 'Planet Guardian'), (75, 'Green Advocate')]
+DEFAULT_BADGE = 'Eco Starter'
+
+_SUM_COLUMNS = ['total_points', 'total_co2e', 'total_co2_saved', 'good_count', 'bad_count']
+
+
+def load_categories(path: str = CATEGORIES_FILE) -> pd.DataFrame:
+    """Category table indexed by ``category_id`` (as text) with its CO2 multiplier."""
 
-# Merge CO2e data
-transactions = transactions.merge(
-    co2e_data[['category_id', 'co2e_per_dollar', 'group', 'hierarchy', 'mods']],
-    left_on='merchant_category',
-    right_on='category_id',
-    how='left'
-)
-
-transactions['adjusted_co2e_per_dollar'] = transactions['co2e_per_dollar'] * transactions['mods'].fillna(1)
-transactions['co2e'] = transactions['amount'] * transactions['adjusted_co2e_per_dollar']
-
-# Classification
-high_impact_categories = ['fast_fashion', 'electronics', 'rideshare']
-essential_sustainable_categories = ['groceries', 'public_transport', 'renewable_energy']
-
-def classify(row):
-    if row['co2e_per_dollar'] < 0.1 or row['group'] in essential_sustainable_categories:
-        return 'good', 'Low CO2 or sustainable essential'
-    elif row['group'] in high_impact_categories or row['co2e_per_dollar'] > 1:
-        return 'bad', 'High CO2 or high-impact industry'
-    else:
-        return 'neutral', 'Moderate impact'
-
-transactions[['classification', 'reason']] = transactions.apply(classify, axis=1, result_type='expand')
-
-# Eco points
-def score_transaction(row):
-    if row['classification'] == 'good':
-        return 10
-    elif row['classification'] == 'bad':
-        return -20
-    else:
-        return 0
-
-transactions['eco_points'] = transactions.apply(score_transaction, axis=1)
-
-# CO2 saved calculation
-transactions['low_impact_co2e'] = transactions['group'].map(low_impact).fillna(transactions['co2e_per_dollar'])
-transactions['co2_saved'] = (transactions['co2e_per_dollar'] - transactions['low_impact_co2e']) * transactions['amount']
-transactions['co2_saved'] = transactions['co2_saved'].clip(lower=0)
-
-# Aggregate per user
-user_scores = transactions.groupby('user_id').agg(
-    total_points=('eco_points', 'sum'),
-    total_co2e=('co2e', 'sum'),
-    total_co2_saved=('co2_saved', 'sum'),
-    good_count=('classification', lambda x: (x=='good').sum()),
-    bad_count=('classification', lambda x: (x=='bad').sum())
-).reset_index()
-
-# Percentile & badges
-user_scores['percentile'] = user_scores['total_points'].rank(pct=True) * 100
-
-def assign_badge(pct):
-    if pct >= 99:
-        return 'Echo Elite'
-    elif pct >= 90:
-        return 'Planet Guardian'
-    elif pct >= 75:
-        return 'Green Advocate'
-    else:
-        return 'Eco Starter'
-
-user_scores['badge'] = user_scores['percentile'].apply(assign_badge)
-
-# --- Category info page ---
-category_info = co2e_data.copy()
-category_info['sustainability'] = category_info['group'].apply(
-    lambda g: 'good' if g in essential_sustainable_categories else ('bad' if g in high_impact_categories else 'neutral')
-)
-category_info['notes'] = category_info['mods'].fillna('No special notes')
-
-print(user_scores)
-print(category_info)
\ No newline at end of file
+    categories = pd.read_csv(path, dtype={'category_id': str})
+    categories['category_id'] = categories['category_id'].str.strip()
+    categories = categories.drop_duplicates('category_id').set_index('category_id')
+    # ``mods`` is a free-text note in the shipped table; only numeric values scale the CO2
+    categories['multiplier'] = pd.to_numeric(categories['mods'], errors='coerce').fillna(1.0)
+    return categories
+
+
+def classify(co2e_per_dollar: pd.Series, group: pd.Series) -> np.ndarray:
+    """good/neutral/bad for every row (unknown categories are neutral)."""
+
+    good = (co2e_per_dollar < 0.1) | group.isin(ESSENTIAL_SUSTAINABLE_CATEGORIES)
+    bad = group.isin(HIGH_IMPACT_CATEGORIES) | (co2e_per_dollar > 1)
+    return np.select([good.to_numpy(), bad.to_numpy()], ['good', 'bad'], default='neutral')
+
+
+def score_chunk(chunk: pd.DataFrame, categories: pd.DataFrame, category_column: str) -> pd.DataFrame:
+    """Add co2e, classification, reason, eco_points and co2_saved to a chunk of transactions."""
+
+    ids = chunk[category_column].astype(str).str.strip()
+    co2e_per_dollar = ids.map(categories['co2e_per_dollar']).astype(float)
+    group = ids.map(categories['group'])
+    amount = pd.to_numeric(chunk['amount'], errors='coerce')
+
+    scored = chunk.copy()
+    # rows without a user belong to "guest", as in the transaction store
+    users = scored['user_id'] if 'user_id' in scored else pd.Series(None, index=scored.index, dtype=object)
+    scored['user_id'] = users.fillna('guest').replace('', 'guest')
+    scored['co2e_per_dollar'] = co2e_per_dollar
+    scored['group'] = group
+    scored['co2e'] = amount * co2e_per_dollar * ids.map(categories['multiplier']).fillna(1.0)
+    scored['classification'] = classify(co2e_per_dollar, group)
+    scored['reason'] = scored['classification'].map(REASONS)
+    scored['eco_points'] = scored['classification'].map(POINTS).astype(np.int64)
+    low_impact_co2e = group.map(LOW_IMPACT).fillna(co2e_per_dollar)
+    scored['co2_saved'] = ((co2e_per_dollar - low_impact_co2e) * amount).clip(lower=0)
+    return scored
+
+
+def aggregate_chunk(scored: pd.DataFrame) -> pd.DataFrame:
+    """Per-user sums for one scored chunk; partials merge by adding them."""
+
+    parts = pd.DataFrame({
+        'user_id': scored['user_id'],
+        'total_points': scored['eco_points'],
+        'total_co2e': scored['co2e'],
+        'total_co2_saved': scored['co2_saved'],
+        'good_count': (scored['classification'] == 'good').astype(np.int64),
+        'bad_count': (scored['classification'] == 'bad').astype(np.int64),
+    })
+    return parts.groupby('user_id', sort=False).sum()
+
+
+def merge_user_partials(running: pd.DataFrame | None, partial: pd.DataFrame) -> pd.DataFrame:
+    if running is None:
+        return partial
+    return running.add(partial, fill_value=0)
+
+
+def finalize_user_scores(totals: pd.DataFrame) -> pd.DataFrame:
+    """Percentile of total points across users and the badge it earns."""
+
+    user_scores = totals.reset_index()
+    for column in ('total_points', 'good_count', 'bad_count'):
+        user_scores[column] = user_scores[column].astype(np.int64)
+    user_scores['percentile'] = user_scores['total_points'].rank(pct=True) * 100
+    pct = user_scores['percentile'].to_numpy()
+    user_scores['badge'] = np.select([pct >= floor for floor, _ in BADGES], [badge for _, badge in BADGES],
+                                     default=DEFAULT_BADGE)
+    return user_scores
+
+
+def category_info(categories: pd.DataFrame) -> pd.DataFrame:
+    """Category info page: sustainability label and notes per category."""
+
+    info = categories.drop(columns='multiplier').reset_index()
+    info['sustainability'] = np.select(
+        [info['group'].isin(ESSENTIAL_SUSTAINABLE_CATEGORIES), info['group'].isin(HIGH_IMPACT_CATEGORIES)],
+        ['good', 'bad'],
+        default='neutral',
+    )
+    info['notes'] = info['mods'].fillna('No special notes')
+    return info
+
+
+def _category_column(columns: pd.Index, transactions_path: str) -> str:
+    for name in ('merchant_category', 'category_id'):
+        if name in columns:
+            return name
+    raise ValueError(f"{transactions_path} has no merchant_category or category_id column")
+
+
+def iter_scored_chunks(
+    transactions_path: str = TRANSACTIONS_FILE,
+    categories: pd.DataFrame | None = None,
+    chunksize: int = CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Scored transactions, ``chunksize`` rows at a time."""
+
+    categories = load_categories() if categories is None else categories
+    columns = pd.read_csv(transactions_path, nrows=0).columns
+    category_column = _category_column(columns, transactions_path)
+    dtype = {name: str for name in (category_column, *TEXT_COLUMNS) if name in columns}
+    # rows with more fields than the header are malformed appends; skip them rather than abort the run
+    reader = pd.read_csv(transactions_path, chunksize=chunksize, dtype=dtype, on_bad_lines='skip')
+    for chunk in reader:
+        yield score_chunk(chunk, categories, category_column)
+
+
+def score_file(
+    transactions_path: str = TRANSACTIONS_FILE,
+    categories_path: str = CATEGORIES_FILE,
+    chunksize: int = CHUNK_ROWS,
+    transactions_out: str | None = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Score a transactions file; returns ``(user_scores, category_info)``.
+
+    With ``transactions_out`` every scored row is also streamed to that Parquet file.
+    """
+
+    categories = load_categories(categories_path)
+    writer = None
+    totals = None
+    try:
+        for scored in iter_scored_chunks(transactions_path, categories, chunksize):
+            totals = merge_user_partials(totals, aggregate_chunk(scored))
+            if transactions_out:
+                writer = _write_rows(writer, transactions_out, scored)
+    finally:
+        if writer is not None:
+            writer.close()
+    if totals is None:
+        totals = pd.DataFrame(columns=_SUM_COLUMNS, index=pd.Index([], name='user_id'))
+    return finalize_user_scores(totals), category_info(categories)
+
+
+def _write_rows(writer, path: str, scored: pd.DataFrame):
+    if pa is None:  # pragma: no cover - optional dependency
+        raise RuntimeError("pyarrow is required to stream scored transactions to Parquet")
+    if writer is None:
+        # text columns can be all-null in a chunk, so pin them to strings up front
+        schema = pa.Schema.from_pandas(scored, preserve_index=False)
+        fields = [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in schema]
+        writer = pq.ParquetWriter(path, pa.schema(fields))
+    writer.write_table(pa.Table.from_pandas(scored, schema=writer.schema, preserve_index=False))
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score transactions and write per-user eco scores as Parquet")
+    parser.add_argument("--transactions", default=TRANSACTIONS_FILE)
+    parser.add_argument("--categories", default=CATEGORIES_FILE)
+    parser.add_argument("--out", default="user_scores.parquet", help="Per-user scores")
+    parser.add_argument("--transactions-out", help="Also write every scored transaction here")
+    parser.add_argument("--category-info-out", help="Also write the category info table here")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    user_scores, info = score_file(args.transactions, args.categories, args.chunksize, args.transactions_out)
+    user_scores.to_parquet(args.out, index=False)
+    if args.category_info_out:
+        info.to_parquet(args.category_info_out, index=False)
+    print(f"{len(user_scores)} users -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
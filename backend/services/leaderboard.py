@@ -0,0 +1,248 @@
+"""Materialized CO2 leaderboard with logarithmic rank and percentile lookups.
+
+``/transactions/eco-score`` only needs one user's standing, yet used to
+aggregate every user per request. :class:`MaterializedLeaderboard` keeps the
+per-user CO2 totals in a sorted list, so a single user's rank or percentile
+is two binary searches. :func:`materialized_leaderboard` keeps one per
+backend in sync by folding in only the rows appended since the last call.
+
+Past ``SKETCH_THRESHOLD`` users the sorted list (and its O(n) insertions) is
+dropped; ranks and percentiles then come from a KLL sketch of the totals,
+rebuilt once per batch of changes, with a bounded rank error.
+
+Given a ``cohort_of`` callable (user id -> ``{"team": ..., "location": ...}``)
+the board also keeps one nested board per cohort, updated by the same
+:meth:`~MaterializedLeaderboard.add` calls, so cohort ranks only ever touch
+that cohort's members.
+
+Each backend's board also carries :class:`~.rolling_windows.RollingWindows`
+(``board.windows``), fed from the same appended rows and slid forward to
+today on every call, for 7/30/90-day rankings.
+"""
+
+from __future__ import annotations
+
+import math
+import heapq
+import threading
+import weakref
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, List, Mapping, Tuple
+
+from . import dates
+from .calculate_percentile import SKETCH_THRESHOLD, percentile_reference
+from .quantile_sketch import KLLSketch
+from .rolling_windows import RollingWindows
+from .storage.base import TransactionBackend
+
+
+class MaterializedLeaderboard:
+    """Per-user CO2 totals kept in sorted order (lower CO2 ranks first)."""
+
+    def __init__(
+        self,
+        sketch_threshold: int | None = None,
+        cohort_of: Callable[[str], Mapping[str, str | None]] | None = None,
+    ) -> None:
+        self.totals: Dict[str, float] = {}
+        self.sum = 0.0
+        self.sketch_threshold = SKETCH_THRESHOLD if sketch_threshold is None else sketch_threshold
+        self.cohort_of = cohort_of
+        self.cohorts: Dict[Tuple[str, str], MaterializedLeaderboard] = {}
+        self._memberships: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+        self.windows: RollingWindows | None = None
+        self._sorted: list | None = []
+        self._sketch: KLLSketch | None = None
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+    @property
+    def approximate(self) -> bool:
+        return self._sorted is None
+
+    def add(self, user_id: str, co2: float) -> None:
+        """Add ``co2`` to a user's total (creating the user when new)."""
+
+        old = self.totals.get(user_id)
+        new = co2 if old is None else old + co2
+        self.totals[user_id] = new
+        self.sum += co2
+        if self.cohort_of is not None:
+            self._add_to_cohorts(user_id, co2)
+        if self._sorted is None:
+            self._sketch = None
+            return
+        if old is not None:
+            del self._sorted[bisect_left(self._sorted, old)]
+        insort(self._sorted, new)
+        if len(self._sorted) > self.sketch_threshold:
+            self._sorted = None
+
+    def _add_to_cohorts(self, user_id: str, co2: float) -> None:
+        keys = self._memberships.get(user_id)
+        if keys is None:
+            keys = self._memberships[user_id] = tuple(
+                (field, value) for field, value in self.cohort_of(user_id).items() if value
+            )
+        for key in keys:
+            board = self.cohorts.get(key)
+            if board is None:
+                board = self.cohorts[key] = MaterializedLeaderboard(self.sketch_threshold)
+            board.add(user_id, co2)
+
+    def _reference(self):
+        if self._sorted is not None:
+            return None
+        if self._sketch is None:
+            self._sketch = percentile_reference(list(self.totals.values()), threshold=0)
+        return self._sketch
+
+    def total(self, user_id: str, default: float = 0.0) -> float:
+        return self.totals.get(user_id, default)
+
+    def percentile_of(self, value: float) -> float:
+        """Same "rank" method as ``percentile_of_value`` (half of the ties count as below)."""
+
+        if not self.totals:
+            return 0.0
+        sketch = self._reference()
+        if sketch is not None:
+            return sketch.percentile_of(value)
+        below = bisect_left(self._sorted, value)
+        equal = bisect_right(self._sorted, value) - below
+        return (below + 0.5 * equal) / len(self._sorted) * 100
+
+    def percentile(self, user_id: str) -> float:
+        return self.percentile_of(self.total(user_id))
+
+    def rank(self, user_id: str) -> int | None:
+        """1-based competition rank (users with equal totals share a rank)."""
+
+        total = self.totals.get(user_id)
+        if total is None:
+            return None
+        sketch = self._reference()
+        if sketch is not None:
+            values, cumulative = sketch.cdf()
+            return int(cumulative[bisect_left(values, total)]) + 1
+        return bisect_left(self._sorted, total) + 1
+
+    def cohort(self, field: str, value: str) -> "MaterializedLeaderboard | None":
+        """The nested board of users whose ``field`` (e.g. "team") is ``value``."""
+
+        return self.cohorts.get((field, value))
+
+    def lowest(self, limit: int | None = None) -> List[Tuple[str, float]]:
+        """``(user_id, total)`` pairs by ascending total; ties keep first-seen order."""
+
+        if limit is None:
+            return sorted(self.totals.items(), key=lambda item: item[1])
+        return heapq.nsmallest(limit, self.totals.items(), key=lambda item: item[1])
+
+    def cohort_rankings(self, field: str, by: str = "per_capita_co2") -> List[Dict[str, object]]:
+        """Every ``field`` cohort with its total and per-capita CO2 and a rank on each.
+
+        Lower CO2 ranks first; rows are ordered by the ``by`` metric.
+        """
+
+        rows = [
+            {field: value, "members": len(board), "total_co2": board.sum, "per_capita_co2": board.sum / len(board)}
+            for (name, value), board in self.cohorts.items()
+            if name == field and len(board)
+        ]
+        for metric in ("total_co2", "per_capita_co2"):
+            for rank, row in enumerate(sorted(rows, key=lambda row: row[metric]), start=1):
+                row[f"rank_{metric[:-4]}"] = rank
+        rows.sort(key=lambda row: row[by])
+        return rows
+
+
+class _View:
+    __slots__ = ("board", "category_version", "data_version", "last_id", "spend")
+
+    def __init__(self, category_version, cohort_of=None) -> None:
+        self.board = MaterializedLeaderboard(cohort_of=cohort_of)
+        self.board.windows = RollingWindows()
+        self.category_version = category_version
+        self.data_version = None
+        self.last_id = 0
+        self.spend = 0.0
+
+
+_VIEWS: "weakref.WeakKeyDictionary[TransactionBackend, _View]" = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+def materialized_leaderboard(
+    backend: TransactionBackend,
+    category_map: Mapping[str, Mapping[str, object]],
+    category_version: object,
+    cohort_of: Callable[[str], Mapping[str, str | None]] | None = None,
+) -> MaterializedLeaderboard:
+    """Return the leaderboard for ``backend``, folding in rows appended since the last call.
+
+    It is rebuilt from scratch when ``category_version`` changes, when the
+    backend's data version moved without any appended rows to fold in (a
+    rewrite, e.g. a row recategorised or moved to another user), or when the
+    stored spend no longer matches what was folded in. Callers that pass ``cohort_of`` should
+    fold its source (e.g. the profiles) into ``category_version``, since
+    memberships are only looked up the first time a user is seen.
+    """
+
+    with _LOCK:
+        view = _VIEWS.get(backend)
+        if view is None or view.category_version != category_version:
+            view = _VIEWS[backend] = _View(category_version, cohort_of)
+        version = backend.data_version()
+        if version == view.data_version:
+            view.board.windows.advance(dates.today())
+            return view.board
+
+        folded = _fold_new_rows(view, backend, category_map)
+        rewritten = view.data_version is not None and not folded
+        if rewritten or not math.isclose(view.spend, backend.total_spend(), rel_tol=1e-9, abs_tol=1e-6):
+            view = _VIEWS[backend] = _View(category_version, cohort_of)
+            _fold_new_rows(view, backend, category_map)
+        view.data_version = version
+        view.board.windows.advance(dates.today())
+        return view.board
+
+
+def _fold_new_rows(view: _View, backend: TransactionBackend, category_map: Mapping[str, Mapping[str, object]]) -> int:
+    """Fold rows after ``view.last_id`` into the view; returns how many there were."""
+
+    folded = 0
+    rates: Dict[str, float] = {}
+    per_user: Dict[str, float] = {}
+    per_user_day: Dict[Tuple[str, int], List[float]] = {}
+    for row_id, _merchant, category_id, amount, date, user_id in backend.iter_transactions(after_id=view.last_id):
+        rate = rates.get(category_id)
+        if rate is None:
+            rate = rates[category_id] = category_map.get(category_id, {}).get("co2e", 0.0) or 0.0
+        co2 = amount * rate
+        per_user[user_id] = per_user.get(user_id, 0.0) + co2
+        day = dates.parse_day(date)
+        if day != dates.NO_DAY:
+            bucket = per_user_day.get((user_id, day))
+            if bucket is None:
+                per_user_day[(user_id, day)] = [co2, 1]
+            else:
+                bucket[0] += co2
+                bucket[1] += 1
+        view.spend += amount
+        view.last_id = row_id
+        folded += 1
+    for user_id, co2 in per_user.items():
+        view.board.add(user_id, co2)
+    if per_user_day:
+        # slide once to the newest day (never past today) so older buckets are not added and then evicted
+        view.board.windows.advance(max(day for _, day in per_user_day))
+        for (user_id, day), (co2, count) in per_user_day.items():
+            view.board.windows.add(user_id, day, co2, count)
+    return folded
+
+
+def clear_leaderboards() -> None:
+    with _LOCK:
+        _VIEWS.clear()
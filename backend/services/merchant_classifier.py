@@ -9,9 +9,10 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from typing import List, Tuple, TYPE_CHECKING
+from typing import List, Sequence, Tuple, TYPE_CHECKING
 
 import joblib
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 
@@ -92,6 +93,22 @@ class MerchantCategoryClassifier:
         output = [Prediction(category_id=cid, confidence=float(conf)) for cid, conf in pairs[:top_k]]
         return output
 
+    def predict_batch(self, merchants: Sequence[str], top_k: int = 3) -> List[List[Prediction]]:
+        """Classify many merchants with one transform + predict_proba call."""
+        cleaned = [(m or "").strip().lower() for m in merchants]
+        present = [idx for idx, m in enumerate(cleaned) if m]
+        results: List[List[Prediction]] = [[] for _ in merchants]
+        if not present or self.model is None or self.vectorizer is None:
+            return results
+        proba = self.model.predict_proba(self.vectorizer.transform([cleaned[idx] for idx in present]))
+        classes = self.model.classes_
+        top = np.argsort(-proba, axis=1, kind="stable")[:, :top_k]
+        for row, idx in enumerate(present):
+            results[idx] = [
+                Prediction(category_id=classes[col], confidence=float(proba[row, col])) for col in top[row]
+            ]
+        return results
+
 
 _classifier: MerchantCategoryClassifier | None = None
 _transformer_predictor: "TransformerPredictor | None" = None
@@ -165,3 +182,33 @@ def predict_category(merchant: str) -> List[Prediction]:
 
     classifier = get_classifier()
     return classifier.predict(merchant)
+
+
+def predict_categories(merchants: Sequence[str]) -> List[List[Prediction]]:
+    """Batch counterpart of :func:`predict_category`.
+
+    Distinct merchant names are classified once in a single vectorized call,
+    using the transformer when enabled and falling back to TF-IDF.
+    """
+    keys = [(m or "").strip() for m in merchants]
+    unique = [m for m in dict.fromkeys(keys) if m]
+    if not unique:
+        return [[] for _ in merchants]
+
+    by_merchant = {}
+    if _should_use_transformer():
+        predictor = _get_transformer_predictor()
+        if predictor is not None:
+            try:
+                for merchant, preds in zip(unique, predictor.predict_batch(unique, top_k=3)):
+                    if preds:
+                        by_merchant[merchant] = [
+                            Prediction(category_id=p.category_id, confidence=p.confidence) for p in preds
+                        ]
+            except Exception:
+                by_merchant = {}
+
+    remaining = [m for m in unique if m not in by_merchant]
+    if remaining:
+        by_merchant.update(zip(remaining, get_classifier().predict_batch(remaining)))
+    return [list(by_merchant.get(key, [])) for key in keys]
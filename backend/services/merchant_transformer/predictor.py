@@ -5,9 +5,10 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import List
+from typing import List, Tuple
 
 DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(__file__), "../../json/merchant_transformer")
+PREDICT_BATCH_SIZE = int(os.environ.get("MERCHANT_TRANSFORMER_BATCH_SIZE", 256))
 
 
 @dataclass
@@ -66,3 +67,44 @@ class TransformerPredictor:
             label = self.id2label.get(label_idx, str(label_idx))
             results.append(TransformerPrediction(category_id=label, confidence=float(score)))
         return results
+
+    def predict_batch(
+        self, merchants: List[str], top_k: int = 3, batch_size: int = PREDICT_BATCH_SIZE
+    ) -> List[List[TransformerPrediction]]:
+        """Classify many merchants in padded forward passes of at most ``batch_size`` texts.
+
+        Each pass is only padded to its own longest merchant, so peak memory
+        is bounded by ``batch_size`` rather than by the size of the request.
+        """
+
+        cleaned = [(m or "").strip() for m in merchants]
+        texts = [m for m in cleaned if m]
+        if not texts:
+            return [[] for _ in merchants]
+        batch_size = max(1, batch_size)
+        ranked_all: List[Tuple[List[float], List[int]]] = []
+        for start in range(0, len(texts), batch_size):
+            ranked_all.extend(self._rank(texts[start:start + batch_size], top_k))
+        ranked = iter(ranked_all)
+        results: List[List[TransformerPrediction]] = []
+        for merchant in cleaned:
+            if not merchant:
+                results.append([])
+                continue
+            scores, label_ids = next(ranked)
+            results.append([
+                TransformerPrediction(category_id=self.id2label.get(idx, str(idx)), confidence=float(score))
+                for score, idx in zip(scores, label_ids)
+            ])
+        return results
+
+    def _rank(self, texts: List[str], top_k: int) -> List[Tuple[List[float], List[int]]]:
+        """Top-``top_k`` (scores, label ids) for each text, from one padded forward pass."""
+        import torch
+
+        batch = self.tokenizer(texts, truncation=True, padding=True, max_length=48, return_tensors="pt")
+        batch = {k: v.to(self.device) for k, v in batch.items()}
+        with torch.no_grad():
+            probs = torch.softmax(self.model(**batch).logits, dim=-1)
+        values, indices = torch.topk(probs, min(top_k, probs.shape[-1]), dim=-1)
+        return list(zip(values.tolist(), indices.tolist()))
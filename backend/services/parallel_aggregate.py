@@ -0,0 +1,185 @@
+"""Offline map-reduce rebuild of the per-user leaderboard totals.
+
+The API never calls this module: the served leaderboard is materialized and
+folds in appended rows (see ``leaderboard``). This job covers full rebuilds
+of large files, e.g. to check the served totals after a backfill or to
+export them. The CSV body is split into newline-aligned byte ranges. Each
+of ``--workers`` spawned processes parses its range into a detached
+``TransactionStore`` and computes its :func:`partial_stats`: spend, counts
+and date sets per user and category, as NumPy arrays that pickle cheaply.
+The parent re-codes each range's users and categories into shared
+dictionaries and reduces the partials with :func:`combine_partials` into
+one ``TransactionAggregates``. Aggregates stay keyed by category, so CO2 is
+applied once per (user, category) at the end.
+
+Like the tail reader, ranges assume one row per line (no quoted newlines).
+Rows are written lowest CO2 first as NDJSON; run statistics go to stdout::
+
+    python -m services.parallel_aggregate --csv data/transactions.csv --out leaderboard.ndjson --workers 4 --verify
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Mapping, Tuple
+
+import numpy as np
+
+from .transaction_aggregates import TransactionAggregates, combine_partials, partial_stats
+from .transaction_store import TransactionStore
+
+REBUILD_WORKERS = int(os.environ.get("LEADERBOARD_REBUILD_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def byte_ranges(path: str, start: int, end: int, parts: int) -> List[Tuple[int, int]]:
+    """Split ``[start, end)`` of ``path`` into up to ``parts`` ranges that end on a newline.
+
+    The last range stops just after the last newline before ``end``, so a
+    trailing partial line (a write still in flight) is left out.
+    """
+
+    with open(path, "rb") as fh:
+        stop = _last_newline(fh, start, end)
+        bounds = [start]
+        for i in range(1, parts):
+            fh.seek(max(start + (stop - start) * i // parts - 1, bounds[-1]))
+            fh.readline()
+            cut = min(fh.tell(), stop)
+            if cut > bounds[-1]:
+                bounds.append(cut)
+    if stop > bounds[-1]:
+        bounds.append(stop)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _last_newline(fh, lo: int, hi: int, block: int = 1 << 16) -> int:
+    pos = hi
+    while pos > lo:
+        step = min(block, pos - lo)
+        fh.seek(pos - step)
+        found = fh.read(step).rfind(b"\n")
+        if found >= 0:
+            return pos - step + found + 1
+        pos -= step
+    return lo
+
+
+def _read_header(path: str) -> Tuple[List[str] | None, int]:
+    with open(path, "rb") as fh:
+        line = fh.readline()
+    if not line.endswith(b"\n"):
+        return None, 0
+    return next(csv.reader(io.StringIO(line.decode("utf-8")))), len(line)
+
+
+def aggregate_range(path: str, start: int, end: int, fieldnames: List[str]):
+    """``(partial_stats, users, categories)`` of the rows in ``[start, end)``, coded locally."""
+
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        data = fh.read(end - start)
+    part = TransactionStore.detached(fieldnames)
+    part._ingest(data)
+    return partial_stats(part), part.users, part.categories
+
+
+def aggregate_file(path: str, workers: int = REBUILD_WORKERS) -> TransactionAggregates:
+    """Full aggregates of ``path``, computed over ``workers`` byte ranges.
+
+    One worker (or one range) runs in-process; so does a pool that fails to start.
+    """
+
+    fieldnames, body = _read_header(path)
+    if fieldnames is None:
+        return TransactionAggregates()
+    ranges = byte_ranges(path, body, os.path.getsize(path), max(1, workers))
+    if not ranges:
+        return TransactionAggregates()
+
+    jobs = [(path, lo, hi, fieldnames) for lo, hi in ranges]
+    parts = None
+    if workers > 1 and len(ranges) > 1:
+        context = multiprocessing.get_context("spawn")  # same rule as coaching_batch: never fork
+        try:
+            with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as pool:
+                parts = list(pool.map(aggregate_range, *zip(*jobs)))
+        except (OSError, BrokenProcessPool) as exc:
+            print(f"[parallel_aggregate] falling back to a serial rebuild: {exc}")
+    if parts is None:
+        parts = [aggregate_range(*job) for job in jobs]
+
+    # ranges come back in file order, so shared codes follow first appearance as in the store
+    users: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    user_maps, category_maps = [], []
+    for _, part_users, part_categories in parts:
+        user_maps.append(np.asarray([users.setdefault(u, len(users)) for u in part_users], dtype=np.int64))
+        category_maps.append(np.asarray([categories.setdefault(c, len(categories)) for c in part_categories],
+                                        dtype=np.int64))
+    combined = combine_partials([partial for partial, _, _ in parts], user_maps, category_maps, len(categories))
+    return TransactionAggregates.from_partial(combined, list(users), list(categories))
+
+
+def leaderboard_rows(
+    aggregates: TransactionAggregates, category_map: Mapping[str, Mapping[str, object]]
+) -> List[Dict[str, object]]:
+    """Per-user totals, lowest CO2 first, with CO2 rated per category as the served board does."""
+
+    rates = {cid: category_map.get(cid, {}).get("co2e", 0.0) or 0.0 for cid in aggregates.category_spend}
+    rows = []
+    for user_id, user in aggregates.users.items():
+        co2 = sum(spend * rates.get(cid, 0.0) for cid, spend in user.category_spend.items())
+        rows.append({
+            "user_id": user_id,
+            "total_co2": round(co2, 4),
+            "total_spend": round(user.total_spend, 2),
+            "tx_count": user.tx_count,
+            "active_days": len(user.active_days),
+        })
+    rows.sort(key=lambda row: (row["total_co2"], row["user_id"]))
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+    return rows
+
+
+def main():
+    from . import eco_coach
+
+    parser = argparse.ArgumentParser(description="Rebuild per-user leaderboard totals with a process pool")
+    parser.add_argument("--csv", default=eco_coach.TRANSACTION_CSV)
+    parser.add_argument("--out", help="Write the ranked rows here as NDJSON")
+    parser.add_argument("--workers", type=int, default=REBUILD_WORKERS)
+    parser.add_argument("--verify", action="store_true", help="Also load the file serially and compare aggregates")
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    aggregates = aggregate_file(args.csv, args.workers)
+    seconds = time.perf_counter() - began
+    rows = leaderboard_rows(aggregates, eco_coach._category_map())
+    if args.out:
+        with open(args.out, "w") as out:
+            out.writelines(json.dumps(row) + "\n" for row in rows)
+
+    stats = {
+        "rows": aggregates.tx_count,
+        "users": len(aggregates.users),
+        "workers": args.workers,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(aggregates.tx_count / seconds, 1) if seconds else None,
+        "out": args.out,
+    }
+    if args.verify:
+        stats["differences"] = aggregates.diff(TransactionStore(args.csv).aggregates)[:20]
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
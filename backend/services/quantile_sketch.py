@@ -0,0 +1,176 @@
+"""Mergeable KLL quantile sketch for approximate percentiles over huge populations.
+
+A KLL sketch (Karnin, Lang, Liberty 2016) keeps a hierarchy of compactors.
+Level ``h`` holds items that each stand for ``2**h`` inputs, and a full level
+is sorted and every other item promoted. Memory stays at roughly ``3k`` items
+no matter how many values are added. Sketches built on separate shards
+:meth:`merge` into one with the same guarantees, so per-shard partials can be
+combined without ever materializing all values.
+
+Percentiles use the same "rank" method as ``percentile_of_value`` (half of
+the ties count as below), with a normalized rank error around
+:func:`normalized_rank_error` for the chosen ``k``.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List
+
+DEFAULT_K = 200
+_C = 2.0 / 3.0
+
+
+def normalized_rank_error(k: int) -> float:
+    """Approximate rank error (fraction of n) at ~99% confidence for sketch size ``k``."""
+
+    # empirical fit for KLL with c = 2/3 (the same one Apache DataSketches publishes)
+    return 2.296 / k ** 0.9723
+
+
+def k_for_error(error: float) -> int:
+    """Smallest ``k`` whose :func:`normalized_rank_error` is at most ``error``."""
+
+    return max(8, math.ceil((2.296 / error) ** (1 / 0.9723)))
+
+
+class KLLSketch:
+    def __init__(self, k: int = DEFAULT_K, seed: int | None = None) -> None:
+        self.k = k
+        self.n = 0
+        self.levels: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+        self._size = 0
+        self._max_size = self._capacity_sum()
+        self._cdf = None
+
+    @classmethod
+    def for_error(cls, error: float, seed: int | None = None) -> "KLLSketch":
+        return cls(k_for_error(error), seed=seed)
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], k: int = DEFAULT_K, seed: int | None = None) -> "KLLSketch":
+        sketch = cls(k, seed=seed)
+        sketch.extend(values)
+        return sketch
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def retained(self) -> int:
+        """Number of items actually stored."""
+
+        return self._size
+
+    @property
+    def rank_error(self) -> float:
+        return normalized_rank_error(self.k)
+
+    # -- updates -----------------------------------------------------------
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self.levels) - height - 1
+        return max(2, math.ceil(self.k * _C ** depth))
+
+    def _capacity_sum(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _grow(self) -> None:
+        self.levels.append([])
+        self._max_size = self._capacity_sum()
+
+    def update(self, value: float) -> None:
+        self.levels[0].append(float(value))
+        self.n += 1
+        self._size += 1
+        self._cdf = None
+        if self._size >= self._max_size:
+            self._compress()
+
+    def extend(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.update(value)
+
+    def _compress(self) -> None:
+        for height in range(len(self.levels)):
+            level = self.levels[height]
+            if len(level) < self._capacity(height):
+                continue
+            if height + 1 >= len(self.levels):
+                self._grow()
+            level.sort()
+            # promote every other item of the even-length prefix; an odd leftover stays
+            keep = level[len(level) - len(level) % 2:]
+            offset = self._rng.random() < 0.5
+            self.levels[height + 1].extend(level[offset:len(level) - len(keep):2])
+            self.levels[height] = keep
+            self._size = sum(len(items) for items in self.levels)
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold ``other`` (e.g. a shard-local sketch) into this one; returns self."""
+
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for height, items in enumerate(other.levels):
+            self.levels[height].extend(items)
+        self.n += other.n
+        self._size = sum(len(items) for items in self.levels)
+        self._cdf = None
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    # -- queries -----------------------------------------------------------
+
+    def cdf(self):
+        """Retained values in sorted order and the cumulative weight before each (length + 1)."""
+
+        if self._cdf is None:
+            pairs = sorted((value, 1 << height) for height, items in enumerate(self.levels) for value in items)
+            values = [value for value, _ in pairs]
+            cumulative = [0] + list(accumulate(weight for _, weight in pairs))
+            self._cdf = (values, cumulative)
+        return self._cdf
+
+    def rank(self, value: float) -> float:
+        """Estimated number of inputs strictly below ``value``, plus half the ties."""
+
+        values, cumulative = self.cdf()
+        below = cumulative[bisect_left(values, value)]
+        through = cumulative[bisect_right(values, value)]
+        return below + 0.5 * (through - below)
+
+    def percentile_of(self, value: float) -> float:
+        if not self.n or value != value:  # NaN never ranks, as in percentile_of_value
+            return 0.0 if self.n else math.nan
+        return self.rank(value) / self.n * 100
+
+    def quantile(self, q: float) -> float:
+        """Smallest retained value whose cumulative weight reaches ``q`` of the inputs."""
+
+        values, cumulative = self.cdf()
+        if not values:
+            return math.nan
+        target = q * cumulative[-1]
+        idx = bisect_left(cumulative, target, lo=1) - 1
+        return values[min(max(idx, 0), len(values) - 1)]
+
+    # -- transport ---------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"k": self.k, "n": self.n, "levels": [list(items) for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object], seed: int | None = None) -> "KLLSketch":
+        sketch = cls(int(data["k"]), seed=seed)
+        sketch.levels = [list(items) for items in data["levels"]] or [[]]
+        sketch.n = int(data["n"])
+        sketch._size = sum(len(items) for items in sketch.levels)
+        sketch._max_size = sketch._capacity_sum()
+        return sketch
@@ -1,10 +1,22 @@
 import pandas as pd
 import os
-from usd_to_cad import convert_usd_to_cad
+import weakref
 
-ROUTE_TO_TRANSACTION_DATA = os.path.join("..", "data", "transactions.csv")
-ROUTE_TO_CARBON_DATA = os.path.join("..", "data", "decarbon_categories.csv")
+try:
+    from .usd_to_cad import convert_usd_to_cad
+except ImportError:  # run as a script from services/
+    from usd_to_cad import convert_usd_to_cad
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # services/
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+
+ROUTE_TO_TRANSACTION_DATA = os.path.join(DATA_DIR, "transactions.csv")
+ROUTE_TO_CARBON_DATA = os.path.join(DATA_DIR, "decarbon_categories.csv")
 USD_TOCAD_API_URL = "http://127.0.0.1:5000/api/convert"
+# Transactions are streamed in chunks of this many rows, so the file can exceed memory.
+CHUNK_ROWS = 500_000
+# id(carbon_df) -> (weakref to it, its rates); entries go away with the frame
+_RATES_BY_FRAME = {}
 
 def main():
     total_score = calculate_cumulated_carbon_score()
@@ -13,43 +25,80 @@ def main():
     else:
         print("Failed to read transaction data.")
 
-def read_carbon_data():
+def read_carbon_data(carbon_path=ROUTE_TO_CARBON_DATA):
     try:
-        df = pd.read_csv(ROUTE_TO_CARBON_DATA)
+        df = pd.read_csv(carbon_path, dtype={"category_id": str})
         df = df[["category_id", "co2e_per_dollar"]]
         return df
     except Exception as e:
         print(f"Error importing carbon data: {e}")
         return None
 
+def carbon_rates(carbon_df):
+    """``co2e_per_dollar`` as a Series indexed by category id, for vectorized ``map`` lookups."""
+
+    rates = carbon_df.drop_duplicates("category_id").set_index("category_id")["co2e_per_dollar"]
+    rates.index = rates.index.astype(str).str.strip()
+    return rates.astype(float)
+
+def _rates_for(carbon_df):
+    """:func:`carbon_rates` of ``carbon_df``, built once per frame (treat the frame as read-only)."""
+
+    key = id(carbon_df)
+    entry = _RATES_BY_FRAME.get(key)
+    if entry is not None and entry[0]() is carbon_df:
+        return entry[1]
+    rates = carbon_rates(carbon_df)
+    _RATES_BY_FRAME[key] = (weakref.ref(carbon_df, lambda _ref: _RATES_BY_FRAME.pop(key, None)), rates)
+    return rates
+
 def calculate_carbon_score(category_id, carbon_df):
     try:
-        if category_id in carbon_df["category_id"].tolist():
-            return carbon_df.loc[carbon_df["category_id"] == category_id, "co2e_per_dollar"].values[0]
-        else:
-            return 0
+        return float(_rates_for(carbon_df).get(str(category_id).strip(), 0))
     except Exception as e:
         print(f"Error calculating carbon score for {category_id}: {e}")
         return 0
 
-def calculate_cumulated_carbon_score():
-    try:
-        carbon_df = read_carbon_data()
-        if carbon_df is None:
-            return None
+def cumulated_co2e(transactions_path=ROUTE_TO_TRANSACTION_DATA, carbon_path=ROUTE_TO_CARBON_DATA, chunksize=CHUNK_ROWS):
+    """Sum of ``amount * co2e_per_dollar`` over every transaction (unknown categories count as 0).
 
-        transaction_df = pd.read_csv(ROUTE_TO_TRANSACTION_DATA)
-        if "category_id" not in transaction_df.columns or "amount" not in transaction_df.columns:
-            print("Transaction CSV missing required columns.")
-            return None
+    The category table is turned into one id -> rate mapping, and the
+    transactions are read ``chunksize`` rows at a time and joined against it
+    with ``Series.map``. Returns None when either file cannot be used.
+    """
+
+    carbon_df = read_carbon_data(carbon_path)
+    if carbon_df is None:
+        return None
+    rates = carbon_rates(carbon_df)
+
+    columns = pd.read_csv(transactions_path, nrows=0).columns
+    if "category_id" not in columns or "amount" not in columns:
+        print("Transaction CSV missing required columns.")
+        return None
+
+    total = 0.0
+    chunks = pd.read_csv(
+        transactions_path, usecols=["category_id", "amount"], dtype={"category_id": str}, chunksize=chunksize
+    )
+    for chunk in chunks:
+        amounts = pd.to_numeric(chunk["amount"], errors="coerce").fillna(0.0)
+        per_dollar = chunk["category_id"].str.strip().map(rates).fillna(0.0)
+        total += float((amounts * per_dollar).sum())
+    return total
 
-        # Calculate total CO2e for each transaction (score * amount)
-        transaction_df["carbon_score"] = transaction_df.apply(
-            lambda row: calculate_carbon_score(row["category_id"], carbon_df) * row["amount"], axis=1
-        )
+def calculate_cumulated_carbon_score(
+    transactions_path=ROUTE_TO_TRANSACTION_DATA,
+    carbon_path=ROUTE_TO_CARBON_DATA,
+    chunksize=CHUNK_ROWS,
+    convert=convert_usd_to_cad,
+):
+    try:
+        total_co2e_usd = cumulated_co2e(transactions_path, carbon_path, chunksize)
+        if total_co2e_usd is None:
+            return None
 
-        total_co2e_usd = transaction_df["carbon_score"].sum()
-        total_co2e_cad = convert_usd_to_cad(total_co2e_usd)
+        total_co2e_cad = convert(total_co2e_usd)
 
         return total_co2e_cad
 
@@ -58,4 +107,4 @@ def calculate_cumulated_carbon_score():
         return None
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
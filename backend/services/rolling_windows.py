@@ -0,0 +1,192 @@
+"""Sliding 7/30/90-day CO2 totals per user, kept in daily ring buffers.
+
+Each user owns one row of a ``users x span`` array of daily CO2 (and one of
+transaction counts), where day ``d`` lives in column ``d % span``. Alongside it
+every window keeps a running per-user total. Appending a transaction adds to
+one bucket and to the totals of the windows that cover its day. When the
+newest day moves forward, each window subtracts the column of the day that
+just left it and the reused column is cleared. Both steps are vectorized over
+users and never rescan older history.
+
+The newest day never moves past today. Future-dated transactions are held
+back and folded in once the calendar reaches their day, so a single
+mistyped date cannot empty every window.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from . import dates
+
+WINDOWS = {"7d": 7, "30d": 30, "90d": 90}
+
+
+def parse_window(value: str | None) -> int | None:
+    """Window length in days for a ``window`` query value ("7d", "30d", "90d"); None when absent."""
+
+    if not value:
+        return None
+    days = WINDOWS.get(value.strip().lower())
+    if days is None:
+        raise ValueError(f"window must be one of {', '.join(WINDOWS)}")
+    return days
+
+
+class RollingWindows:
+    """Per-user CO2 over the last ``window`` days ending at :attr:`head`, for each configured window."""
+
+    def __init__(self, windows=tuple(WINDOWS.values()), clock: Callable[[], int] | None = None) -> None:
+        self._clock = clock
+        self.windows: Tuple[int, ...] = tuple(sorted(set(windows)))
+        self.span = self.windows[-1]
+        self.head: int | None = None
+        self.users: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._co2 = np.zeros((0, self.span))
+        self._count = np.zeros((0, self.span), dtype=np.int64)
+        self._totals = {days: np.zeros(0) for days in self.windows}
+        self._counts = {days: np.zeros(0, dtype=np.int64) for days in self.windows}
+        self._rankings: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._held: Dict[int, List[Tuple[str, float, int]]] = {}
+
+    def _today(self) -> int:
+        return self._clock() if self._clock is not None else dates.today()
+
+    def _row(self, user_id: str) -> int:
+        row = self._index.get(user_id)
+        if row is not None:
+            return row
+        row = self._index[user_id] = len(self.users)
+        self.users.append(user_id)
+        if row >= len(self._co2):
+            capacity = max(2 * len(self._co2), 1024)
+            self._co2 = _grow(self._co2, capacity)
+            self._count = _grow(self._count, capacity)
+            for days in self.windows:
+                self._totals[days] = _grow(self._totals[days], capacity)
+                self._counts[days] = _grow(self._counts[days], capacity)
+        return row
+
+    def advance(self, day: int) -> None:
+        """Slide every window forward so it ends at ``day``, but not past today (no-op for earlier days)."""
+
+        day = min(day, self._today())
+        if self.head is None:
+            self.head = day
+            self._release_held()
+            return
+        if day <= self.head:
+            return
+        n = len(self.users)
+        if day - self.head >= self.span:
+            # everything buffered has left even the longest window
+            self._co2[:n] = 0.0
+            self._count[:n] = 0
+            for days in self.windows:
+                self._totals[days][:n] = 0.0
+                self._counts[days][:n] = 0
+        else:
+            for new in range(self.head + 1, day + 1):
+                for days in self.windows:
+                    leaving = (new - days) % self.span
+                    self._totals[days][:n] -= self._co2[:n, leaving]
+                    self._counts[days][:n] -= self._count[:n, leaving]
+                slot = new % self.span
+                self._co2[:n, slot] = 0.0
+                self._count[:n, slot] = 0
+        self.head = day
+        self._rankings.clear()
+        self._release_held()
+
+    def _release_held(self) -> None:
+        due = [day for day in self._held if day <= self.head]
+        for day in sorted(due):
+            for user_id, co2, count in self._held.pop(day):
+                self.add(user_id, day, co2, count)
+
+    def add(self, user_id: str, day: int, co2: float, count: int = 1) -> None:
+        """Fold ``count`` transactions worth ``co2`` on epoch ``day`` into ``user_id``'s buckets."""
+
+        if self.head is None or day > self.head:
+            if day > self._today():
+                self._held.setdefault(day, []).append((user_id, co2, count))
+                return
+            self.advance(day)
+        age = self.head - day
+        if age >= self.span:
+            return
+        row = self._row(user_id)
+        slot = day % self.span
+        self._co2[row, slot] += co2
+        self._count[row, slot] += count
+        for days in self.windows:
+            if age < days:
+                self._totals[days][row] += co2
+                self._counts[days][row] += count
+        self._rankings.clear()
+
+    # -- queries -----------------------------------------------------------
+
+    def _ranking(self, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows active in the window, ordered by ascending total, and those totals."""
+
+        cached = self._rankings.get(days)
+        if cached is None:
+            n = len(self.users)
+            active = np.flatnonzero(self._counts[days][:n] > 0)
+            totals = self._totals[days][active]
+            order = np.argsort(totals, kind="stable")
+            cached = self._rankings[days] = (active[order], totals[order])
+        return cached
+
+    def active_users(self, days: int) -> int:
+        return len(self._ranking(days)[0])
+
+    def mean(self, days: int) -> float | None:
+        """Average total over the users active in the window."""
+
+        _, totals = self._ranking(days)
+        return float(totals.mean()) if len(totals) else None
+
+    def total(self, user_id: str, days: int) -> float:
+        row = self._index.get(user_id)
+        return 0.0 if row is None else float(self._totals[days][row])
+
+    def tx_count(self, user_id: str, days: int) -> int:
+        row = self._index.get(user_id)
+        return 0 if row is None else int(self._counts[days][row])
+
+    def percentile_of(self, value: float, days: int) -> float:
+        """Same "rank" method as ``percentile_of_value``, among users active in the window."""
+
+        _, totals = self._ranking(days)
+        if not len(totals):
+            return 0.0
+        below = np.searchsorted(totals, value, side="left")
+        equal = np.searchsorted(totals, value, side="right") - below
+        return float((below + 0.5 * equal) / len(totals) * 100)
+
+    def rank(self, user_id: str, days: int) -> int | None:
+        """1-based competition rank in the window, or None when the user had no transactions in it."""
+
+        if not self.tx_count(user_id, days):
+            return None
+        _, totals = self._ranking(days)
+        return int(np.searchsorted(totals, self.total(user_id, days), side="left")) + 1
+
+    def lowest(self, days: int, limit: int | None = None) -> List[Tuple[str, float]]:
+        """``(user_id, total)`` for users active in the window, by ascending total."""
+
+        rows, totals = self._ranking(days)
+        if limit is not None:
+            rows, totals = rows[:limit], totals[:limit]
+        return [(self.users[row], total) for row, total in zip(rows.tolist(), totals.tolist())]
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
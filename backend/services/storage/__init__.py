@@ -0,0 +1,71 @@
+"""Pluggable transaction storage.
+
+``TRANSACTION_BACKEND`` selects the implementation: ``csv`` (default, the flat
+file plus the in-memory columnar store), ``sqlite`` (``TRANSACTION_DB_PATH``,
+seeded from the CSV the first time it is opened empty) or ``partitioned``
+(one file per month under ``TRANSACTION_PARTITION_DIR`` plus a manifest of
+per-partition totals, seeded the same way).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, Tuple
+
+from .append_log import AppendLog
+from .base import FIELDNAMES, TransactionBackend, TransactionRow
+from .csv_backend import CsvBackend
+from .partitioned_backend import PartitionedBackend
+from .sqlite_backend import SqliteBackend, import_csv
+
+BACKEND_ENV = "TRANSACTION_BACKEND"
+DB_PATH_ENV = "TRANSACTION_DB_PATH"
+PARTITION_DIR_ENV = "TRANSACTION_PARTITION_DIR"
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "../../data/transactions.db")
+DEFAULT_PARTITION_DIR = os.path.join(os.path.dirname(__file__), "../../data/transactions_by_month")
+
+_BACKENDS: Dict[Tuple[str, str], TransactionBackend] = {}
+_LOCK = threading.Lock()
+
+
+def get_backend(csv_path: str, kind: str | None = None) -> TransactionBackend:
+    """Return the (cached) backend serving the transactions behind ``csv_path``."""
+
+    kind = (kind or os.getenv(BACKEND_ENV, "csv")).strip().lower()
+    key = (kind, os.path.abspath(csv_path))
+    backend = _BACKENDS.get(key)
+    if backend is not None:
+        return backend
+    with _LOCK:
+        backend = _BACKENDS.get(key)
+        if backend is None:
+            if kind == "sqlite":
+                backend = SqliteBackend(os.getenv(DB_PATH_ENV, DEFAULT_DB_PATH), seed_csv=csv_path)
+            elif kind == "partitioned":
+                backend = PartitionedBackend(os.getenv(PARTITION_DIR_ENV, DEFAULT_PARTITION_DIR), seed_csv=csv_path)
+            elif kind == "csv":
+                backend = CsvBackend(csv_path)
+            else:
+                raise ValueError(f"unknown transaction backend: {kind}")
+            _BACKENDS[key] = backend
+    return backend
+
+
+def clear_backends() -> None:
+    with _LOCK:
+        _BACKENDS.clear()
+
+
+__all__ = [
+    "AppendLog",
+    "FIELDNAMES",
+    "TransactionBackend",
+    "TransactionRow",
+    "CsvBackend",
+    "SqliteBackend",
+    "PartitionedBackend",
+    "import_csv",
+    "get_backend",
+    "clear_backends",
+]
@@ -0,0 +1,109 @@
+"""Append-only CSV log that is safe under several threads and gunicorn workers.
+
+Writers hand complete, newline-terminated records to :meth:`AppendLog.append`.
+A per-process writer thread drains everything queued so far into one
+``O_APPEND`` write (group commit) while holding an exclusive ``flock`` on the
+file, so the header decision and the write are atomic across processes and
+rows from different writers never interleave. Readers only consume up to the
+last newline (see ``TransactionStore``), so they never observe a torn row.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import List
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: in-process serialization only
+    fcntl = None
+
+
+class _Pending:
+    __slots__ = ("payload", "done", "error")
+
+    def __init__(self, payload: bytes) -> None:
+        self.payload = payload
+        self.done = threading.Event()
+        self.error: BaseException | None = None
+
+
+class AppendLog:
+    def __init__(self, path: str, header: str = "", fsync: bool = False) -> None:
+        self.path = path
+        self.header = header.encode("utf-8")
+        self.fsync = fsync
+        self.batches = 0
+        self.records = 0
+        self._cond = threading.Condition()
+        self._queue: List[_Pending] = []
+        self._writer: threading.Thread | None = None
+        self._pid = os.getpid()
+
+    def append(self, payload: str) -> None:
+        """Durably append ``payload`` (one or more complete lines); blocks until written."""
+
+        if not payload:
+            return
+        pending = _Pending(payload.encode("utf-8"))
+        with self._cond:
+            self._ensure_writer()
+            self._queue.append(pending)
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+
+    def _ensure_writer(self) -> None:
+        # A forked worker inherits the queue but not the thread; start afresh.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._queue = []
+            self._writer = None
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._run, name=f"append-log:{os.path.basename(self.path)}", daemon=True)
+            self._writer.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                batch, self._queue = self._queue, []
+            error = None
+            try:
+                self._write(b"".join(p.payload for p in batch))
+                self.batches += 1
+                self.records += len(batch)
+            except BaseException as exc:  # surfaced to every waiting writer
+                error = exc
+            for pending in batch:
+                pending.error = error
+                pending.done.set()
+
+    def _write(self, data: bytes) -> None:
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size == 0:
+                data = self.header + data
+            elif not _ends_with_newline(self.path, size):
+                # Terminate a hand-edited last line instead of gluing onto it.
+                data = b"\r\n" + data
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _ends_with_newline(path: str, size: int) -> bool:
+    with open(path, "rb") as fh:
+        fh.seek(size - 1)
+        return fh.read(1) == b"\n"
@@ -0,0 +1,79 @@
+"""Interface shared by the transaction storage backends."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Tuple
+
+from ..transaction_aggregates import UserAggregate
+
+# (id, merchant, category_id, amount, date, user_id)
+TransactionRow = Tuple[int, str, str, float, str, str]
+
+FIELDNAMES = ["merchant", "category_id", "amount", "date", "user_id"]
+
+
+class TransactionBackend:
+    """Query surface the routes need; filters and group-bys live in the backend."""
+
+    name = "base"
+
+    def iter_transactions(
+        self,
+        user_id: str | None = None,
+        category_id: str | None = None,
+        start_day: int | None = None,
+        end_day: int | None = None,
+        after_id: int = 0,
+        limit: int | None = None,
+    ) -> Iterator[TransactionRow]:
+        """Rows in id order with ``id > after_id``, matching every given filter.
+
+        Day bounds are inclusive epoch days. Implementations must raise lookup
+        errors (e.g. a missing file) on call rather than on first iteration so
+        callers can still choose a response before streaming.
+        """
+
+        raise NotImplementedError
+
+    def iter_user_transactions(self, user_id: str) -> Iterator[Tuple[int | None, str, float]]:
+        """Yield ``(epoch_day, category_id, amount)`` for one user; day is None when undated."""
+
+        raise NotImplementedError
+
+    def user_aggregates(self, user_id: str | None = None, with_days: bool = False) -> Dict[str, UserAggregate]:
+        """Per-user, per-category spend/count for one or all users.
+
+        Day sets (``active_days``/``category_days``) are only filled with ``with_days``.
+        """
+
+        raise NotImplementedError
+
+    def category_totals(self) -> Dict[str, Tuple[float, int]]:
+        """``{category_id: (total_spend, transaction_count)}``."""
+
+        raise NotImplementedError
+
+    def month_total(self, year: int, month: int) -> float:
+        raise NotImplementedError
+
+    def total_spend(self) -> float:
+        raise NotImplementedError
+
+    def data_version(self) -> str:
+        """Cheap token that changes whenever the stored rows change.
+
+        Read without touching the rows themselves, so callers can use it for
+        conditional requests.
+        """
+
+        raise NotImplementedError
+
+    def append(self, row: Dict[str, object]) -> None:
+        """Persist one ``FIELDNAMES`` row."""
+
+        self.append_many([row])
+
+    def append_many(self, rows: List[Dict[str, object]]) -> None:
+        """Persist many ``FIELDNAMES`` rows in one write."""
+
+        raise NotImplementedError
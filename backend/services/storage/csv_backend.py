@@ -0,0 +1,100 @@
+"""Flat-file backend: the CSV on disk plus the in-memory columnar store."""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+from itertools import islice
+from typing import Dict, Iterator, List, Tuple
+
+from ..dates import NO_DAY, month_index
+from ..transaction_aggregates import UserAggregate
+from ..transaction_store import get_transaction_store, notify_transactions_appended
+from .append_log import AppendLog
+from .base import FIELDNAMES, TransactionBackend, TransactionRow
+
+
+def _copy_user(agg: UserAggregate, with_days: bool) -> UserAggregate:
+    user = UserAggregate(total_spend=agg.total_spend, tx_count=agg.tx_count)
+    user.category_spend.update(agg.category_spend)
+    user.category_counts.update(agg.category_counts)
+    if with_days:
+        user.category_days.update({cid: set(days) for cid, days in agg.category_days.items()})
+        user.active_days = set(agg.active_days)
+    return user
+
+
+class CsvBackend(TransactionBackend):
+    name = "csv"
+
+    def __init__(self, csv_path: str) -> None:
+        self.csv_path = csv_path
+        header = io.StringIO()
+        csv.DictWriter(header, fieldnames=FIELDNAMES).writeheader()
+        self._log = AppendLog(csv_path, header=header.getvalue())
+
+    def _store(self):
+        return get_transaction_store(self.csv_path)
+
+    def iter_transactions(
+        self,
+        user_id: str | None = None,
+        category_id: str | None = None,
+        start_day: int | None = None,
+        end_day: int | None = None,
+        after_id: int = 0,
+        limit: int | None = None,
+    ) -> Iterator[TransactionRow]:
+        rows = self._store().iter_rows(
+            user_id=user_id, category_id=category_id, start_day=start_day, end_day=end_day, after_id=after_id
+        )
+        return islice(rows, limit) if limit is not None else rows
+
+    def iter_user_transactions(self, user_id: str) -> Iterator[Tuple[int | None, str, float]]:
+        store = self._store()
+        code = store.user_code_for(user_id)
+        if code is None:
+            return
+        rows = (store.user_code == code).nonzero()[0]
+        categories = store.categories
+        days = store.day[rows].tolist()
+        for day, cat, amt in zip(days, store.category_code[rows].tolist(), store.amount[rows].tolist()):
+            yield (None if day == NO_DAY else day), categories[cat], amt
+
+    def user_aggregates(self, user_id: str | None = None, with_days: bool = False) -> Dict[str, UserAggregate]:
+        # Copies are taken under the store lock so callers can iterate freely
+        # while later appends mutate the live aggregates.
+        store = self._store()
+        with store.lock:
+            users = store.aggregates.users
+            if user_id is not None:
+                agg = users.get(user_id)
+                return {user_id: _copy_user(agg, with_days)} if agg is not None else {}
+            return {uid: _copy_user(agg, with_days) for uid, agg in users.items()}
+
+    def category_totals(self) -> Dict[str, Tuple[float, int]]:
+        store = self._store()
+        with store.lock:
+            counts = store.aggregates.category_counts
+            return {cid: (spend, counts[cid]) for cid, spend in store.aggregates.category_spend.items()}
+
+    def month_total(self, year: int, month: int) -> float:
+        return self._store().aggregates.month_spend.get(month_index(year, month), 0.0)
+
+    def total_spend(self) -> float:
+        return self._store().aggregates.total_spend
+
+    def data_version(self) -> str:
+        # Appends grow the file and any rewrite moves mtime forward. This is a
+        # change token rather than a counter: the file's stat is the only state
+        # shared by every worker and by edits made outside the app.
+        st = os.stat(self.csv_path)
+        return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    def append_many(self, rows: List[Dict[str, object]]) -> None:
+        # Encode everything first so the batch lands in a single locked write.
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=FIELDNAMES).writerows(rows)
+        self._log.append(buffer.getvalue())
+        notify_transactions_appended(self.csv_path)
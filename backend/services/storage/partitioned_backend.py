@@ -0,0 +1,349 @@
+"""Month-partitioned transaction storage with a manifest of per-partition totals.
+
+Layout under the root directory::
+
+    manifest.json     per-partition rows, id/day ranges, spend and category totals
+    2025-11.csv       mutable partition (or the delta of a compacted one)
+    2025-10.parquet   compacted, immutable partition
+    undated.csv       rows whose date could not be parsed
+
+Month totals and category totals are answered from the manifest without
+touching partition files; range queries only open the partitions whose day
+span overlaps the range. ``compact`` rewrites old partitions into Parquet;
+rows that arrive late for a compacted month land in a CSV delta next to it.
+
+    python -m services.storage.partitioned_backend import --csv data/transactions.csv --root data/transactions_by_month
+    python -m services.storage.partitioned_backend compact --root data/transactions_by_month --before 2025-11
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import heapq
+import io
+import json
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..transaction_aggregates import UserAggregate
+from ..dates import NO_DAY, day_to_date, parse_day, parse_days
+from ..transaction_store import TransactionStore
+from .base import FIELDNAMES, TransactionBackend, TransactionRow
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: in-process locking only
+    fcntl = None
+
+UNDATED = "undated"
+PARTITION_FIELDS = ["id"] + FIELDNAMES
+MANIFEST = "manifest.json"
+
+
+def partition_key(day: int) -> str:
+    if day == NO_DAY:
+        return UNDATED
+    value = day_to_date(day)
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def _empty_frame() -> pd.DataFrame:
+    frame = pd.DataFrame({name: pd.Series(dtype=object) for name in PARTITION_FIELDS})
+    frame["id"] = frame["id"].astype(np.int64)
+    frame["amount"] = frame["amount"].astype(np.float64)
+    frame["day"] = pd.Series(dtype=np.int64)
+    return frame
+
+
+class PartitionedBackend(TransactionBackend):
+    name = "partitioned"
+
+    def __init__(self, root: str, seed_csv: str | None = None) -> None:
+        self.root = root
+        self._local_lock = threading.RLock()
+        self._manifest_cache: Tuple[Tuple[int, int], dict] | None = None
+        self._frames: Dict[str, Tuple[tuple, pd.DataFrame]] = {}
+        os.makedirs(root, exist_ok=True)
+        if seed_csv and os.path.exists(seed_csv) and not os.path.exists(self._path(MANIFEST)):
+            self.import_csv(seed_csv)
+
+    # -- locking / manifest ------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool):
+        with self._local_lock:
+            fd = os.open(self._path(".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                yield
+            finally:
+                os.close(fd)
+
+    def manifest(self) -> dict:
+        path = self._path(MANIFEST)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return {"next_id": 1, "partitions": {}}
+        signature = (st.st_mtime_ns, st.st_size)
+        if self._manifest_cache is None or self._manifest_cache[0] != signature:
+            with open(path) as fh:
+                self._manifest_cache = (signature, json.load(fh))
+        return self._manifest_cache[1]
+
+    def _write_manifest(self, manifest: dict) -> None:
+        tmp = self._path(MANIFEST + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self._path(MANIFEST))
+
+    # -- partition files ---------------------------------------------------
+
+    def _partition_files(self, key: str) -> List[str]:
+        return [p for p in (self._path(f"{key}.parquet"), self._path(f"{key}.csv")) if os.path.exists(p)]
+
+    def _frame(self, key: str) -> pd.DataFrame:
+        """Load one partition (compacted base + CSV delta) as a DataFrame sorted by id."""
+
+        with self._locked(exclusive=False):
+            return self._read_frame(key)
+
+    def _read_frame(self, key: str) -> pd.DataFrame:
+        """:meth:`_frame` for callers that already hold the lock (flock would deadlock on a second acquire)."""
+
+        files = self._partition_files(key)
+        signature = tuple((p, os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in files)
+        cached = self._frames.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        parts = []
+        for path in files:
+            if path.endswith(".parquet"):
+                parts.append(pd.read_parquet(path))
+            else:
+                parts.append(pd.read_csv(path, dtype=str, keep_default_na=False))
+        if not parts:
+            frame = _empty_frame()
+        else:
+            frame = pd.concat(parts, ignore_index=True)
+            frame["id"] = frame["id"].astype(np.int64)
+            frame["amount"] = pd.to_numeric(frame["amount"], errors="coerce").fillna(0.0)
+            for name in ("merchant", "category_id", "date"):
+                frame[name] = frame[name].astype(str)
+            frame["user_id"] = frame["user_id"].astype(str).replace("", "guest")
+            frame["day"] = parse_days(frame["date"].tolist(), len(frame)).astype(np.int64)
+            frame = frame.sort_values("id", kind="stable").reset_index(drop=True)
+        self._frames[key] = (signature, frame)
+        return frame
+
+    def _keys_for(self, start_day: int | None, end_day: int | None) -> List[str]:
+        """Partitions whose day span overlaps ``[start_day, end_day]``."""
+
+        keys = []
+        for key, info in self.manifest()["partitions"].items():
+            if start_day is not None or end_day is not None:
+                if key == UNDATED:
+                    continue
+                if start_day is not None and info["max_day"] < start_day:
+                    continue
+                if end_day is not None and info["min_day"] > end_day:
+                    continue
+            keys.append(key)
+        return sorted(keys)
+
+    # -- reads -------------------------------------------------------------
+
+    def iter_transactions(
+        self,
+        user_id: str | None = None,
+        category_id: str | None = None,
+        start_day: int | None = None,
+        end_day: int | None = None,
+        after_id: int = 0,
+        limit: int | None = None,
+    ) -> Iterator[TransactionRow]:
+        streams = []
+        for key in self._keys_for(start_day, end_day):
+            if self.manifest()["partitions"][key]["max_id"] <= after_id:
+                continue
+            frame = self._frame(key)
+            mask = frame["id"].to_numpy() > after_id
+            if user_id is not None:
+                mask &= frame["user_id"].to_numpy() == user_id
+            if category_id is not None:
+                mask &= frame["category_id"].to_numpy() == category_id
+            if start_day is not None:
+                mask &= frame["day"].to_numpy() >= start_day
+            if end_day is not None:
+                mask &= frame["day"].to_numpy() <= end_day
+            picked = frame.loc[mask]
+            streams.append(zip(*(picked[name].tolist() for name in ("id", "merchant", "category_id", "amount", "date", "user_id"))))
+        # each partition is id-sorted, so a k-way merge restores global id order
+        rows = heapq.merge(*streams)
+        return (row for _, row in zip(range(limit), rows)) if limit is not None else rows
+
+    def iter_user_transactions(self, user_id: str) -> Iterator[Tuple[int | None, str, float]]:
+        for key in self._keys_for(None, None):
+            frame = self._frame(key)
+            picked = frame.loc[frame["user_id"].to_numpy() == user_id]
+            for day, cid, amount in zip(picked["day"].tolist(), picked["category_id"].tolist(), picked["amount"].tolist()):
+                yield (None if day == NO_DAY else day), cid, amount
+
+    def user_aggregates(self, user_id: str | None = None, with_days: bool = False) -> Dict[str, UserAggregate]:
+        users: Dict[str, UserAggregate] = {}
+        first_seen: Dict[str, int] = {}
+        for key in self._keys_for(None, None):
+            frame = self._frame(key)
+            if user_id is not None:
+                frame = frame.loc[frame["user_id"].to_numpy() == user_id]
+            if frame.empty:
+                continue
+            grouped = frame.groupby(["user_id", "category_id"], sort=False).agg(
+                spend=("amount", "sum"), count=("amount", "size"), first=("id", "min")
+            )
+            for (uid, cid), spend, count, first in grouped.itertuples(name=None):
+                user = users.get(uid)
+                if user is None:
+                    user = users[uid] = UserAggregate()
+                first_seen[uid] = min(first_seen.get(uid, first), first)
+                user.total_spend += spend
+                user.tx_count += int(count)
+                user.category_spend[cid] += spend
+                user.category_counts[cid] += int(count)
+            if with_days:
+                dated = frame.loc[frame["day"].to_numpy() != NO_DAY, ["user_id", "category_id", "day"]].drop_duplicates()
+                for uid, cid, day in dated.itertuples(index=False, name=None):
+                    users[uid].category_days[cid].add(int(day))
+                    users[uid].active_days.add(int(day))
+        return {uid: users[uid] for uid in sorted(users, key=first_seen.__getitem__)}
+
+    def category_totals(self) -> Dict[str, Tuple[float, int]]:
+        totals: Dict[str, List] = {}
+        firsts: Dict[str, int] = {}
+        for info in self.manifest()["partitions"].values():
+            for cid, (spend, count, first) in info["categories"].items():
+                entry = totals.setdefault(cid, [0.0, 0])
+                entry[0] += spend
+                entry[1] += count
+                firsts[cid] = min(firsts.get(cid, first), first)
+        return {cid: (totals[cid][0], totals[cid][1]) for cid in sorted(totals, key=firsts.__getitem__)}
+
+    def month_total(self, year: int, month: int) -> float:
+        info = self.manifest()["partitions"].get(f"{year:04d}-{month:02d}")
+        return float(info["total_spend"]) if info else 0.0
+
+    def total_spend(self) -> float:
+        return float(sum(info["total_spend"] for info in self.manifest()["partitions"].values()))
+
+    def data_version(self) -> str:
+        return str(self.manifest()["next_id"] - 1)
+
+    # -- writes ------------------------------------------------------------
+
+    def append_many(self, rows: List[Dict[str, object]]) -> None:
+        with self._locked(exclusive=True):
+            self._manifest_cache = None
+            manifest = self.manifest()
+            by_partition: Dict[str, List[Dict[str, object]]] = defaultdict(list)
+            for row in rows:
+                day = parse_day(str(row.get("date") or ""))
+                record = dict(row, id=manifest["next_id"])
+                manifest["next_id"] += 1
+                by_partition[partition_key(day)].append(record)
+                info = manifest["partitions"].setdefault(
+                    partition_key(day),
+                    {"rows": 0, "total_spend": 0.0, "min_id": record["id"], "max_id": record["id"],
+                     "min_day": day, "max_day": day, "compacted": False, "categories": {}},
+                )
+                amount = float(row.get("amount") or 0.0)
+                info["rows"] += 1
+                info["total_spend"] += amount
+                info["max_id"] = record["id"]
+                info["min_day"] = min(info["min_day"], day)
+                info["max_day"] = max(info["max_day"], day)
+                spend, count, first = info["categories"].get(str(row["category_id"]), (0.0, 0, record["id"]))
+                info["categories"][str(row["category_id"])] = (spend + amount, count + 1, first)
+
+            for key, records in by_partition.items():
+                path = self._path(f"{key}.csv")
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=PARTITION_FIELDS)
+                if not os.path.exists(path) or os.path.getsize(path) == 0:
+                    writer.writeheader()
+                writer.writerows(records)
+                with open(path, "a", newline="") as fh:
+                    fh.write(buffer.getvalue())
+            self._write_manifest(manifest)
+
+    def import_csv(self, csv_path: str, batch_size: int = 50_000) -> int:
+        store = TransactionStore(csv_path)
+        batch: List[Dict[str, object]] = []
+        for _, merchant, cid, amount, date_str, uid in store.iter_rows():
+            batch.append({"merchant": merchant, "category_id": cid, "amount": amount, "date": date_str, "user_id": uid})
+            if len(batch) >= batch_size:
+                self.append_many(batch)
+                batch = []
+        if batch:
+            self.append_many(batch)
+        return len(store)
+
+    def compact(self, before: str) -> List[str]:
+        """Rewrite every dated partition older than ``before`` (YYYY-MM) into immutable Parquet."""
+
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("pyarrow is required to compact partitions") from exc
+
+        compacted = []
+        for key in self._keys_for(None, None):
+            if key == UNDATED or key >= before:
+                continue
+            # read and delete under one exclusive lock, so no append can land between them
+            with self._locked(exclusive=True):
+                if not os.path.exists(self._path(f"{key}.csv")):
+                    continue
+                frame = self._read_frame(key)[PARTITION_FIELDS]
+                tmp = self._path(f"{key}.parquet.tmp")
+                frame.to_parquet(tmp, index=False)
+                os.replace(tmp, self._path(f"{key}.parquet"))
+                os.remove(self._path(f"{key}.csv"))
+                self._manifest_cache = None
+                manifest = self.manifest()
+                manifest["partitions"][key]["compacted"] = True
+                self._write_manifest(manifest)
+            compacted.append(key)
+        return compacted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage month-partitioned transaction storage")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Load a flat transactions CSV into partitions")
+    imp.add_argument("--csv", required=True)
+    imp.add_argument("--root", required=True)
+    comp = sub.add_parser("compact", help="Compact partitions older than --before into Parquet")
+    comp.add_argument("--root", required=True)
+    comp.add_argument("--before", required=True, help="YYYY-MM; strictly older months are compacted")
+    args = parser.parse_args()
+
+    backend = PartitionedBackend(args.root)
+    if args.command == "import":
+        print(json.dumps({"imported": backend.import_csv(args.csv), "root": args.root}))
+    else:
+        print(json.dumps({"compacted": backend.compact(args.before)}))
+
+
+if __name__ == "__main__":
+    main()
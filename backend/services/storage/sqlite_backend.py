@@ -0,0 +1,197 @@
+"""Embedded SQLite backend with covering indexes for the per-user/date/category queries.
+
+Run ``python -m services.storage.sqlite_backend --csv data/transactions.csv
+--db data/transactions.db`` for a one-shot import of the existing CSV.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+from typing import Dict, Iterator, List, Tuple
+
+from ..transaction_aggregates import UserAggregate
+from ..dates import NO_DAY, date_to_day, parse_day
+from ..transaction_store import TransactionStore
+from .base import TransactionBackend, TransactionRow
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    merchant TEXT NOT NULL DEFAULT '',
+    category_id TEXT NOT NULL DEFAULT '',
+    amount REAL NOT NULL DEFAULT 0,
+    date TEXT NOT NULL DEFAULT '',
+    day INTEGER,
+    user_id TEXT NOT NULL DEFAULT 'guest'
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_category_day
+    ON transactions (user_id, category_id, day, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_day ON transactions (day, amount);
+CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (category_id, amount);
+"""
+
+_INSERT = "INSERT INTO transactions (merchant, category_id, amount, date, day, user_id) VALUES (?, ?, ?, ?, ?, ?)"
+_IMPORT_BATCH = 10_000
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def import_csv(csv_path: str, db_path: str, replace: bool = False) -> int:
+    """Copy every row of ``csv_path`` into ``db_path``; returns the number of rows imported."""
+
+    store = TransactionStore(csv_path)
+    days = store.day.tolist()
+    conn = _connect(db_path)
+    try:
+        with conn:
+            if replace:
+                conn.execute("DELETE FROM transactions")
+            batch = []
+            for (_, merchant, cid, amount, date_str, uid), day in zip(store.iter_rows(), days):
+                batch.append((merchant, cid, amount, date_str, None if day == NO_DAY else day, uid))
+                if len(batch) >= _IMPORT_BATCH:
+                    conn.executemany(_INSERT, batch)
+                    batch = []
+            if batch:
+                conn.executemany(_INSERT, batch)
+    finally:
+        conn.close()
+    return len(store)
+
+
+class SqliteBackend(TransactionBackend):
+    name = "sqlite"
+
+    def __init__(self, db_path: str, seed_csv: str | None = None) -> None:
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        if seed_csv and os.path.exists(seed_csv):
+            empty = conn.execute("SELECT NOT EXISTS (SELECT 1 FROM transactions)").fetchone()[0]
+            if empty:
+                import_csv(seed_csv, db_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.db_path)
+        return conn
+
+    def iter_transactions(
+        self,
+        user_id: str | None = None,
+        category_id: str | None = None,
+        start_day: int | None = None,
+        end_day: int | None = None,
+        after_id: int = 0,
+        limit: int | None = None,
+    ) -> Iterator[TransactionRow]:
+        clauses, params = ["id > ?"], [after_id]
+        for clause, value in (
+            ("user_id = ?", user_id),
+            ("category_id = ?", category_id),
+            ("day >= ?", start_day),
+            ("day <= ?", end_day),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = (
+            "SELECT id, merchant, category_id, amount, date, user_id FROM transactions "
+            f"WHERE {' AND '.join(clauses)} ORDER BY id"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._conn().execute(sql, params)
+
+    def iter_user_transactions(self, user_id: str) -> Iterator[Tuple[int | None, str, float]]:
+        cursor = self._conn().execute(
+            "SELECT day, category_id, amount FROM transactions WHERE user_id = ?", (user_id,)
+        )
+        yield from cursor
+
+    def user_aggregates(self, user_id: str | None = None, with_days: bool = False) -> Dict[str, UserAggregate]:
+        where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+        conn = self._conn()
+        users: Dict[str, UserAggregate] = {}
+        for uid, cid, spend, count in conn.execute(
+            f"SELECT user_id, category_id, SUM(amount), COUNT(*) FROM transactions {where} "
+            "GROUP BY user_id, category_id ORDER BY MIN(id)",
+            params,
+        ):
+            user = users.get(uid)
+            if user is None:
+                user = users[uid] = UserAggregate()
+            user.total_spend += spend
+            user.tx_count += count
+            user.category_spend[cid] = spend
+            user.category_counts[cid] = count
+        if with_days:
+            for uid, cid, day in conn.execute(
+                f"SELECT DISTINCT user_id, category_id, day FROM transactions {where} "
+                f"{'AND' if where else 'WHERE'} day IS NOT NULL",
+                params,
+            ):
+                user = users[uid]
+                user.category_days[cid].add(day)
+                user.active_days.add(day)
+        return users
+
+    def category_totals(self) -> Dict[str, Tuple[float, int]]:
+        rows = self._conn().execute(
+            "SELECT category_id, SUM(amount), COUNT(*) FROM transactions GROUP BY category_id ORDER BY MIN(id)"
+        )
+        return {cid: (spend, count) for cid, spend, count in rows}
+
+    def month_total(self, year: int, month: int) -> float:
+        start = date_to_day(date(year, month, 1))
+        end = date_to_day(date(year + month // 12, month % 12 + 1, 1))
+        row = self._conn().execute(
+            "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE day >= ? AND day < ?", (start, end)
+        ).fetchone()
+        return float(row[0])
+
+    def total_spend(self) -> float:
+        return float(self._conn().execute("SELECT COALESCE(SUM(amount), 0) FROM transactions").fetchone()[0])
+
+    def data_version(self) -> str:
+        # AUTOINCREMENT keeps a strictly increasing high-water mark per insert.
+        row = self._conn().execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'").fetchone()
+        return str(row[0] if row else 0)
+
+    def append_many(self, rows: List[Dict[str, object]]) -> None:
+        params = []
+        for row in rows:
+            day = parse_day(str(row.get("date") or ""))
+            params.append(
+                (row["merchant"], row["category_id"], row["amount"], row["date"], None if day == NO_DAY else day, row["user_id"])
+            )
+        conn = self._conn()
+        with conn:
+            conn.executemany(_INSERT, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a transactions CSV into the SQLite backend")
+    parser.add_argument("--csv", required=True, help="Source transactions CSV")
+    parser.add_argument("--db", required=True, help="Target SQLite database (created if missing)")
+    parser.add_argument("--replace", action="store_true", help="Delete existing rows before importing")
+    args = parser.parse_args()
+    count = import_csv(args.csv, args.db, replace=args.replace)
+    print(json.dumps({"imported": count, "db": args.db}))
+
+
+if __name__ == "__main__":
+    main()
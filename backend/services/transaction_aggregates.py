@@ -0,0 +1,227 @@
+"""Incrementally maintained aggregates over the transaction store.
+
+Totals are kept per user, per category and per month, keyed by category id
+rather than CO2 so they stay valid when category metadata changes; callers
+apply ``co2e``/``env_score`` at read time over the (small) category set.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Set
+
+import numpy as np
+
+from .dates import NO_DAY
+
+if TYPE_CHECKING:  # pragma: no cover - typing aid only
+    from .transaction_store import TransactionStore
+
+
+@dataclass
+class UserAggregate:
+    total_spend: float = 0.0
+    tx_count: int = 0
+    category_spend: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    category_counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    category_days: Dict[str, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    active_days: Set[int] = field(default_factory=set)
+
+
+class TransactionAggregates:
+    def __init__(self) -> None:
+        self.users: Dict[str, UserAggregate] = {}
+        self.category_spend: Dict[str, float] = defaultdict(float)
+        self.category_counts: Dict[str, int] = defaultdict(int)
+        self.month_spend: Dict[int, float] = defaultdict(float)
+        self.total_spend = 0.0
+        self.tx_count = 0
+
+    def add(self, user_id: str, category_id: str, amount: float, day: int | None, month: int | None) -> None:
+        """Fold one transaction into every aggregate in O(1); ``day``/``month`` are None when undated."""
+
+        user = self.users.get(user_id)
+        if user is None:
+            user = self.users[user_id] = UserAggregate()
+        user.total_spend += amount
+        user.tx_count += 1
+        user.category_spend[category_id] += amount
+        user.category_counts[category_id] += 1
+        if day is not None:
+            user.active_days.add(day)
+            user.category_days[category_id].add(day)
+            self.month_spend[month] += amount
+
+        self.category_spend[category_id] += amount
+        self.category_counts[category_id] += 1
+        self.total_spend += amount
+        self.tx_count += 1
+
+    @classmethod
+    def from_store(cls, store: "TransactionStore") -> "TransactionAggregates":
+        """Full rebuild from the store's columns using vectorized group-bys."""
+
+        if not len(store):
+            return cls()
+        return cls.from_partial(partial_stats(store), store.users, store.categories)
+
+    @classmethod
+    def from_partial(cls, partial: Dict[str, object], users: List[str], categories: List[str]) -> "TransactionAggregates":
+        """Build the aggregates from (combined) :func:`partial_stats` coded against ``users``/``categories``."""
+
+        aggregates = cls()
+        n_categories = partial["n_categories"]
+        pair_users, pair_categories = np.divmod(partial["pair_keys"], n_categories)
+        pair_spend = partial["pair_spend"]
+        pair_counts = partial["pair_counts"]
+        spend = np.bincount(pair_users, weights=pair_spend, minlength=len(users)).tolist()
+        counts = np.bincount(pair_users, weights=pair_counts, minlength=len(users)).astype(int).tolist()
+        entries = []
+        for code, uid in enumerate(users):
+            user = aggregates.users[uid] = UserAggregate(total_spend=spend[code], tx_count=counts[code])
+            entries.append(user)
+        for user, cat, total, count in zip(pair_users.tolist(), pair_categories.tolist(),
+                                            pair_spend.tolist(), pair_counts.tolist()):
+            entries[user].category_spend[categories[cat]] = total
+            entries[user].category_counts[categories[cat]] = count
+
+        # day keys are sorted, so each (user, category) and each user is one contiguous run
+        day_keys = partial["day_keys"]
+        days = ((day_keys & 0xFFFFFFFF) + NO_DAY).tolist()
+        pairs = day_keys >> 32
+        for pair, start, stop in _runs(pairs):
+            user, cat = divmod(pair, n_categories)
+            entries[user].category_days[categories[cat]] = set(days[start:stop])
+        day_users = pairs // n_categories
+        for user, start, stop in _runs(day_users):
+            entries[user].active_days = set(days[start:stop])
+
+        cat_spend = np.bincount(pair_categories, weights=pair_spend, minlength=len(categories)).tolist()
+        cat_counts = np.bincount(pair_categories, weights=pair_counts, minlength=len(categories)).astype(int).tolist()
+        for code, cid in enumerate(categories):
+            if cat_counts[code]:
+                aggregates.category_spend[cid] = cat_spend[code]
+                aggregates.category_counts[cid] = cat_counts[code]
+
+        aggregates.month_spend.update(zip(partial["months"].tolist(), partial["month_spend"].tolist()))
+        aggregates.total_spend = float(partial["total_spend"])
+        aggregates.tx_count = int(pair_counts.sum())
+        return aggregates
+
+    def diff(self, other: "TransactionAggregates") -> List[str]:
+        """Describe every difference between two aggregate states (empty when equal)."""
+
+        problems: List[str] = []
+
+        def close(a: float, b: float) -> bool:
+            return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+        def compare_sums(label: str, left: Dict, right: Dict) -> None:
+            for key in set(left) | set(right):
+                if not close(left.get(key, 0), right.get(key, 0)):
+                    problems.append(f"{label}[{key!r}]: {left.get(key, 0)} != {right.get(key, 0)}")
+
+        if self.tx_count != other.tx_count:
+            problems.append(f"tx_count: {self.tx_count} != {other.tx_count}")
+        if not close(self.total_spend, other.total_spend):
+            problems.append(f"total_spend: {self.total_spend} != {other.total_spend}")
+        compare_sums("category_spend", self.category_spend, other.category_spend)
+        compare_sums("category_counts", self.category_counts, other.category_counts)
+        compare_sums("month_spend", self.month_spend, other.month_spend)
+
+        for uid in set(self.users) | set(other.users):
+            left, right = self.users.get(uid), other.users.get(uid)
+            if left is None or right is None:
+                problems.append(f"user {uid!r} missing on one side")
+                continue
+            if left.tx_count != right.tx_count or not close(left.total_spend, right.total_spend):
+                problems.append(f"user {uid!r} totals differ")
+            compare_sums(f"user {uid!r} category_spend", left.category_spend, right.category_spend)
+            compare_sums(f"user {uid!r} category_counts", left.category_counts, right.category_counts)
+            if left.active_days != right.active_days:
+                problems.append(f"user {uid!r} active_days differ")
+            for cid in set(left.category_days) | set(right.category_days):
+                if left.category_days.get(cid, set()) != right.category_days.get(cid, set()):
+                    problems.append(f"user {uid!r} category_days[{cid!r}] differ")
+        return problems
+
+
+def partial_stats(store: "TransactionStore") -> Dict[str, object]:
+    """Mergeable group-by sums over ``store``'s rows, coded against its own dictionaries.
+
+    Keys pack ``user_code * n_categories + category_code`` (and, for
+    ``day_keys``, that pair shifted left 32 bits plus the epoch day), so
+    partials from separately parsed chunks can be re-coded and reduced by
+    :func:`combine_partials`, and :meth:`TransactionAggregates.from_partial`
+    builds every per-user set from sorted runs instead of inserting row by row.
+    """
+
+    n_categories = max(len(store.categories), 1)
+    pairs = store.user_code.astype(np.int64) * n_categories + store.category_code
+    pair_keys, inverse = np.unique(pairs, return_inverse=True)
+    dated = store.dated()
+    months, month_inverse = np.unique(store.month[dated], return_inverse=True)
+    return {
+        "n_categories": n_categories,
+        "pair_keys": pair_keys,
+        "pair_spend": np.bincount(inverse, weights=store.amount, minlength=len(pair_keys)),
+        "pair_counts": np.bincount(inverse, minlength=len(pair_keys)),
+        "day_keys": np.unique((pairs[dated] << 32) | (store.day[dated].astype(np.int64) - NO_DAY)),
+        "months": months.astype(np.int64),
+        "month_spend": np.bincount(month_inverse, weights=store.amount[dated], minlength=len(months)),
+        "total_spend": float(store.amount.sum()),
+    }
+
+
+def combine_partials(
+    partials: List[Dict[str, object]],
+    user_maps: List[np.ndarray],
+    category_maps: List[np.ndarray],
+    n_categories: int,
+) -> Dict[str, object]:
+    """Reduce :func:`partial_stats` of several chunks into one.
+
+    ``user_maps[i]``/``category_maps[i]`` translate chunk ``i``'s codes into
+    the shared dictionaries, which hold ``n_categories`` categories.
+    """
+
+    n_categories = max(n_categories, 1)
+    pair_keys, day_keys, months = [], [], []
+    for partial, user_map, category_map in zip(partials, user_maps, category_maps):
+        local = partial["n_categories"]
+
+        def recode(keys: np.ndarray) -> np.ndarray:
+            user, cat = np.divmod(keys, local)
+            return user_map[user].astype(np.int64) * n_categories + category_map[cat]
+
+        pair_keys.append(recode(partial["pair_keys"]))
+        day_keys.append((recode(partial["day_keys"] >> 32) << 32) | (partial["day_keys"] & 0xFFFFFFFF))
+        months.append(partial["months"])
+
+    unique_pairs, pair_inverse = np.unique(np.concatenate(pair_keys), return_inverse=True)
+    unique_months, month_inverse = np.unique(np.concatenate(months), return_inverse=True)
+    return {
+        "n_categories": n_categories,
+        "pair_keys": unique_pairs,
+        "pair_spend": np.bincount(pair_inverse, weights=np.concatenate([p["pair_spend"] for p in partials]),
+                                  minlength=len(unique_pairs)),
+        "pair_counts": np.bincount(pair_inverse, weights=np.concatenate([p["pair_counts"] for p in partials]),
+                                   minlength=len(unique_pairs)).astype(np.int64),
+        "day_keys": np.unique(np.concatenate(day_keys)),
+        "months": unique_months,
+        "month_spend": np.bincount(month_inverse, weights=np.concatenate([p["month_spend"] for p in partials]),
+                                   minlength=len(unique_months)),
+        "total_spend": math.fsum(p["total_spend"] for p in partials),
+    }
+
+
+def _runs(keys: np.ndarray):
+    """``(key, start, stop)`` for each run of equal values in sorted ``keys``."""
+
+    if not len(keys):
+        return []
+    starts = np.flatnonzero(np.diff(keys)) + 1
+    bounds = [0] + starts.tolist() + [len(keys)]
+    return zip(keys[np.asarray(bounds[:-1])].tolist(), bounds[:-1], bounds[1:])
@@ -0,0 +1,266 @@
+"""Memory-mapped Arrow snapshot of the enriched transactions.
+
+Parsing ``transactions.csv`` costs every gunicorn worker its own copy of the
+columns. A compaction step instead writes the columnar store, enriched with
+per-row ``co2e`` and ``env_score`` from the category map and the epoch-day
+date, to an uncompressed Arrow IPC file next to the CSV. Workers memory-map
+that file and use its buffers as NumPy views without copying, so all of them
+share one page-cache copy and only parse the CSV bytes appended after the
+snapshot was taken.
+
+The snapshot records which prefix of the CSV it covers (byte offset, size,
+mtime and a CRC-32 of every byte before the offset) and is ignored as soon as
+the CSV no longer starts with that prefix, including an edit anywhere in it
+followed by an append. Checking costs one sequential read of the prefix per
+full load, far less than parsing it. It is replaced atomically, so a worker
+that still maps the previous file keeps reading valid data.
+
+    python -m services.transaction_snapshot --csv data/transactions.csv
+    python -m services.transaction_snapshot --csv data/transactions.csv --watch 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Mapping, Tuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - snapshots are an optional speed-up
+    pa = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: no cross-process guard
+    fcntl = None
+
+SNAPSHOT_SUFFIX = ".arrow"
+_CHECKSUM_BLOCK = 1 << 20
+_DICTIONARY_COLUMNS = (
+    ("merchant", "merchant_code"),
+    ("category_id", "category_code"),
+    ("user_id", "user_code"),
+    ("date", "date_code"),
+)
+ENRICHED_COLUMNS = ("co2e", "env_score")
+
+
+def snapshot_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+
+def category_fingerprint(category_map: Mapping[str, Mapping[str, object]]) -> str:
+    """Stable hash of the category fields baked into the enriched columns."""
+
+    items = sorted((cid, info.get("co2e", 0.0), info.get("env_score", 0)) for cid, info in category_map.items())
+    return hashlib.sha1(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+def _prefix_checksum(path: str, offset: int) -> int:
+    """CRC-32 of the first ``offset`` bytes of ``path``, read in blocks."""
+
+    crc = 0
+    with open(path, "rb") as fh:
+        remaining = offset
+        while remaining > 0:
+            block = fh.read(min(remaining, _CHECKSUM_BLOCK))
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+            remaining -= len(block)
+    return crc
+
+
+class Snapshot:
+    """A mapped snapshot: NumPy views over the Arrow buffers plus their dictionaries."""
+
+    def __init__(self, path: str, table, meta: Dict[str, object], signature: Tuple[int, int]) -> None:
+        self.path = path
+        self.signature = signature
+        self.rows = int(meta["rows"])
+        self.offset = int(meta["source_offset"])
+        self.fieldnames: List[str] = meta["fieldnames"]
+        self.fingerprint = meta["category_fingerprint"]
+        self._table = table  # keeps the mapping alive for the views below
+        self.columns: Dict[str, np.ndarray] = {}
+        self.dictionaries: Dict[str, List[str]] = {}
+        for name, code in _DICTIONARY_COLUMNS:
+            chunk = _single_chunk(table, name)
+            self.columns[code] = chunk.indices.to_numpy(zero_copy_only=True)
+            self.dictionaries[name] = chunk.dictionary.to_pylist()
+        for name in ("amount", "day") + ENRICHED_COLUMNS:
+            self.columns[name] = _single_chunk(table, name).to_numpy(zero_copy_only=True)
+
+
+def _single_chunk(table, name: str):
+    column = table.column(name)
+    if column.num_chunks == 1:
+        return column.chunk(0)
+    return pa.concat_arrays(column.chunks)
+
+
+def load_snapshot(csv_path: str) -> Snapshot | None:
+    """Map the snapshot for ``csv_path`` if one exists and still matches the CSV."""
+
+    path = snapshot_path(csv_path)
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        st = os.stat(path)
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        meta = json.loads(table.schema.metadata[b"transactions"])
+        if not _covers_prefix(csv_path, meta):
+            return None
+        return Snapshot(path, table, meta, (st.st_mtime_ns, st.st_size))
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+
+def snapshot_signature(csv_path: str) -> Tuple[int, int] | None:
+    try:
+        st = os.stat(snapshot_path(csv_path))
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _covers_prefix(csv_path: str, meta: Mapping[str, object]) -> bool:
+    st = os.stat(csv_path)
+    offset = int(meta["source_offset"])
+    if st.st_size < offset:
+        return False
+    if st.st_size == meta["source_size"] and st.st_mtime_ns != meta["source_mtime_ns"]:
+        return False
+    return _prefix_checksum(csv_path, offset) == meta["prefix_crc32"]
+
+
+def write_snapshot(store, category_map: Mapping[str, Mapping[str, object]]) -> Dict[str, object]:
+    """Write the enriched snapshot of ``store`` (a ``TransactionStore``) next to its CSV."""
+
+    if pa is None:  # pragma: no cover - optional dependency
+        raise RuntimeError("pyarrow is required to write transaction snapshots")
+    with store.lock:
+        rows = len(store)
+        offset = store.offset
+        source_size, source_mtime = store.signature[1], store.signature[0]
+        fieldnames = list(store.fieldnames or [])
+        codes = {code: getattr(store, code).copy() for _, code in _DICTIONARY_COLUMNS}
+        dictionaries = {
+            "merchant": list(store.merchants),
+            "category_id": list(store.categories),
+            "user_id": list(store.users),
+            "date": list(store.dates),
+        }
+        amount = store.amount.copy()
+        day = store.day.astype(np.int32)
+        co2e = store.co2e(category_map, use_snapshot=False)
+        env_score = store.env_score(category_map, use_snapshot=False)
+
+    arrays = {
+        name: pa.DictionaryArray.from_arrays(codes[code], pa.array(dictionaries[name], type=pa.string()))
+        for name, code in _DICTIONARY_COLUMNS
+    }
+    arrays.update(amount=pa.array(amount), day=pa.array(day), co2e=pa.array(co2e), env_score=pa.array(env_score))
+    meta = {
+        "rows": rows,
+        "source_offset": offset,
+        "source_size": source_size,
+        "source_mtime_ns": source_mtime,
+        "prefix_crc32": _prefix_checksum(store.path, offset),
+        "fieldnames": fieldnames,
+        "category_fingerprint": category_fingerprint(category_map),
+        "written_at": time.time(),
+    }
+    table = pa.table(arrays).replace_schema_metadata({"transactions": json.dumps(meta)})
+
+    path = snapshot_path(store.path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(rows, 1))
+    os.replace(tmp, path)
+    return {"path": path, "rows": rows, "bytes": os.path.getsize(path)}
+
+
+def compact(csv_path: str, category_map: Mapping[str, Mapping[str, object]], min_new_bytes: int = 0) -> Dict[str, object] | None:
+    """Refresh the snapshot when the CSV grew by at least ``min_new_bytes``.
+
+    Only one process compacts at a time; the others skip this round.
+    Returns the write summary, or None when nothing was written.
+    """
+
+    from .transaction_store import get_transaction_store
+
+    lock_fd = os.open(snapshot_path(csv_path) + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+        store = get_transaction_store(csv_path)
+        snapshot = store.snapshot
+        fresh = (
+            snapshot is not None
+            and snapshot.offset == store.offset
+            and snapshot.fingerprint == category_fingerprint(category_map)
+        )
+        if fresh or (snapshot is not None and store.offset - snapshot.offset < min_new_bytes):
+            return None
+        return write_snapshot(store, category_map)
+    finally:
+        os.close(lock_fd)
+
+
+def start_compactor(
+    csv_path: str,
+    category_map: Callable[[], Mapping[str, Mapping[str, object]]],
+    interval: float,
+    min_new_bytes: int = 1 << 20,
+) -> threading.Thread:
+    """Run :func:`compact` every ``interval`` seconds on a daemon thread."""
+
+    def run() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                compact(csv_path, category_map(), min_new_bytes=min_new_bytes)
+            except Exception as exc:  # keep serving from the CSV if compaction fails
+                print(f"[transaction_snapshot] compaction failed: {exc}")
+
+    thread = threading.Thread(target=run, name="transaction-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    from .category_registry import DEFAULT_CATEGORY_CSV, get_registry
+
+    parser = argparse.ArgumentParser(description="Write the memory-mapped transactions snapshot")
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--categories", default=DEFAULT_CATEGORY_CSV)
+    parser.add_argument("--watch", type=float, default=0, help="Re-compact every N seconds instead of once")
+    args = parser.parse_args()
+
+    registry = get_registry(args.categories)
+    if not args.watch:
+        print(json.dumps(compact(args.csv, registry.current().mapping) or {"path": snapshot_path(args.csv), "up_to_date": True}))
+        return
+    while True:
+        result = compact(args.csv, registry.current().mapping, min_new_bytes=1)
+        if result:
+            print(json.dumps(result), flush=True)
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""Process-wide columnar cache of the transactions CSV.
+
+Parsing ``transactions.csv`` with ``csv.DictReader`` on every request dominated
+the read endpoints. The store parses the file once into NumPy columns (amount,
+epoch-day date, interned category/user codes) and keeps it in memory. When the
+file grows only the appended tail is parsed and folded into the columns and
+the incremental aggregates, provided the last ``_PREFIX_CHECK_BYTES`` before
+the parsed offset still match (so an edit followed by an append is not
+mistaken for a pure append); any other mtime/size change triggers a full
+reload.
+When a memory-mapped Arrow snapshot of the file exists (see
+``transaction_snapshot``) the columns start out as zero-copy views of it and
+only the bytes after the snapshot are parsed.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from . import transaction_snapshot
+from .dates import NO_DAY, day_to_month, days_to_months, parse_day
+from .transaction_aggregates import TransactionAggregates
+
+
+class _Interner:
+    """Assign dense integer codes to strings in first-seen order."""
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self.values: List[str] = list(values)
+        self.codes: Dict[str, int] = {value: code for code, value in enumerate(self.values)}
+
+    def __call__(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+_SCAN_BLOCK = 4096
+_PREFIX_CHECK_BYTES = 1 << 16
+_COLUMNS = (
+    ("amount", np.float64),
+    ("category_code", np.int32),
+    ("user_code", np.int32),
+    ("date_code", np.int32),
+    ("merchant_code", np.int32),
+)
+
+
+class TransactionStore:
+    """Columnar view of one transactions CSV plus its running aggregates.
+
+    Mutations happen only under ``lock`` (see :meth:`refresh`); readers that
+    walk the aggregate dicts should hold it too.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.RLock()
+        self._load()
+
+    @classmethod
+    def detached(cls, fieldnames: List[str]) -> "TransactionStore":
+        """An empty store not bound to a file, fed through ``_ingest`` (offline ``parallel_aggregate``)."""
+
+        store = cls.__new__(cls)
+        store.path = None
+        store.lock = threading.RLock()
+        store._reset()
+        store.fieldnames = fieldnames
+        return store
+
+    def _reset(self) -> None:
+        self.fieldnames: List[str] | None = None
+        self.offset = 0
+        self._size = 0
+        self._buffers = {name: np.empty(0, dtype=dtype) for name, dtype in _COLUMNS}
+        self._categories = _Interner()
+        self._users = _Interner()
+        self._dates = _Interner()
+        self._merchants = _Interner()
+        self._date_days: List[int] = []
+        self._date_months: List[int] = []
+        self.snapshot = None
+
+    def _load(self) -> None:
+        self.signature = _file_signature(self.path)
+        self._snapshot_signature = transaction_snapshot.snapshot_signature(self.path)
+        self._reset()
+        self.snapshot = transaction_snapshot.load_snapshot(self.path)
+        if self.snapshot is not None:
+            self._adopt(self.snapshot)
+
+        with open(self.path, "rb") as fh:
+            fh.seek(self.offset)
+            data = fh.read()
+            self._ingest(data)
+            self._prefix_crc = self._prefix_checksum(fh)
+        self.aggregates = TransactionAggregates.from_store(self)
+
+    def _prefix_checksum(self, fh) -> int:
+        """CRC-32 of the bytes just before :attr:`offset`; leaves ``fh`` positioned at the offset."""
+
+        start = max(self.offset - _PREFIX_CHECK_BYTES, 0)
+        fh.seek(start)
+        return zlib.crc32(fh.read(self.offset - start))
+
+    def _adopt(self, snapshot: "transaction_snapshot.Snapshot") -> None:
+        """Start from the snapshot's read-only mapped columns (copied on the first append)."""
+
+        self.fieldnames = snapshot.fieldnames
+        self.offset = snapshot.offset
+        self._size = snapshot.rows
+        self._buffers = {name: snapshot.columns[name] for name, _ in _COLUMNS}
+        self._categories = _Interner(snapshot.dictionaries["category_id"])
+        self._users = _Interner(snapshot.dictionaries["user_id"])
+        self._dates = _Interner(snapshot.dictionaries["date"])
+        self._merchants = _Interner(snapshot.dictionaries["merchant"])
+        date_days = np.full(len(self._dates.values), NO_DAY, dtype=np.int64)
+        date_days[snapshot.columns["date_code"]] = snapshot.columns["day"]
+        self._date_days = date_days.tolist()
+        self._date_months = days_to_months(date_days).tolist()
+        self._day_lookup = np.asarray(self._date_days, dtype=np.int32)
+        self._month_lookup = np.asarray(self._date_months, dtype=np.int32)
+
+    def _ingest(self, data: bytes) -> List[int]:
+        """Parse complete lines of ``data`` (read from ``self.offset``) and append them.
+
+        A trailing partial line, e.g. a write still in flight, is left for the
+        next refresh. Returns the new row indices.
+        """
+
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return []
+        text = data[:end].decode("utf-8")
+        self.offset += end
+        if self.fieldnames is None:
+            reader = csv.DictReader(io.StringIO(text))
+            rows = list(reader)
+            self.fieldnames = reader.fieldnames
+        else:
+            rows = list(csv.DictReader(io.StringIO(text), fieldnames=self.fieldnames))
+        return self._append_rows(rows)
+
+    def _append_rows(self, rows: Iterable[Dict[str, str]]) -> List[int]:
+        amounts: List[float] = []
+        category_codes: List[int] = []
+        user_codes: List[int] = []
+        date_codes: List[int] = []
+        merchant_codes: List[int] = []
+        for row in rows:
+            try:
+                amt = float(row.get("amount", 0) or 0)
+            except Exception:
+                amt = 0.0
+            amounts.append(amt)
+            category_codes.append(self._categories((row.get("category_id") or "").strip()))
+            user_codes.append(self._users(row.get("user_id") or "guest"))
+            date_codes.append(self._dates(row.get("date") or ""))
+            merchant_codes.append(self._merchants(row.get("merchant") or ""))
+
+        # Each distinct date string is parsed once, then broadcast to its rows.
+        for value in self._dates.values[len(self._date_days):]:
+            day = parse_day(value)
+            self._date_days.append(day)
+            self._date_months.append(day_to_month(day))
+
+        start = self._size
+        stop = start + len(amounts)
+        self._reserve(stop)
+        for name, values in zip(("amount", "category_code", "user_code", "date_code", "merchant_code"),
+                                (amounts, category_codes, user_codes, date_codes, merchant_codes)):
+            self._buffers[name][start:stop] = values
+        self._size = stop
+        self._day_lookup = np.asarray(self._date_days, dtype=np.int32)
+        self._month_lookup = np.asarray(self._date_months, dtype=np.int32)
+        return list(range(start, stop))
+
+    def _reserve(self, size: int) -> None:
+        capacity = self._buffers["amount"].size
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 1024)
+        for name, dtype in _COLUMNS:
+            grown = np.empty(capacity, dtype=dtype)
+            grown[: self._size] = self._buffers[name][: self._size]
+            self._buffers[name] = grown
+
+    def refresh(self) -> bool:
+        """Bring the store up to date with the file; returns True when anything changed.
+
+        Growth is treated as an append and only the new bytes are parsed and
+        folded into :attr:`aggregates`, unless the bytes just before the parsed
+        offset changed; that, shrinking or in-place rewrites reload.
+        """
+
+        with self.lock:
+            signature = _file_signature(self.path)
+            if transaction_snapshot.snapshot_signature(self.path) != self._snapshot_signature:
+                # a newer compaction lets this worker drop its private columns
+                self._load()
+                return True
+            if signature == self.signature:
+                return False
+            if self.fieldnames is None or signature[1] < self.offset or signature[1] == self.signature[1]:
+                self._load()
+                return True
+            with open(self.path, "rb") as fh:
+                if self._prefix_checksum(fh) != self._prefix_crc:
+                    # edited before the offset and then appended to: the tail no longer lines up
+                    self._load()
+                    return True
+                data = fh.read(signature[1] - self.offset)
+                new_rows = self._ingest(data)
+                self._prefix_crc = self._prefix_checksum(fh)
+            self.signature = signature
+            for idx in new_rows:
+                date_code = self._buffers["date_code"][idx]
+                day = self._date_days[date_code]
+                self.aggregates.add(
+                    self.users[self._buffers["user_code"][idx]],
+                    self.categories[self._buffers["category_code"][idx]],
+                    float(self._buffers["amount"][idx]),
+                    None if day == NO_DAY else day,
+                    self._date_months[date_code],
+                )
+            return True
+
+    def verify_aggregates(self) -> List[str]:
+        """Compare the incrementally maintained aggregates with a full rebuild."""
+
+        with self.lock:
+            return self.aggregates.diff(TransactionAggregates.from_store(self))
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def amount(self) -> np.ndarray:
+        return self._buffers["amount"][: self._size]
+
+    @property
+    def category_code(self) -> np.ndarray:
+        return self._buffers["category_code"][: self._size]
+
+    @property
+    def user_code(self) -> np.ndarray:
+        return self._buffers["user_code"][: self._size]
+
+    @property
+    def date_code(self) -> np.ndarray:
+        return self._buffers["date_code"][: self._size]
+
+    @property
+    def merchant_code(self) -> np.ndarray:
+        return self._buffers["merchant_code"][: self._size]
+
+    @property
+    def day(self) -> np.ndarray:
+        return self._day_lookup[self.date_code] if self._size else np.empty(0, dtype=np.int32)
+
+    @property
+    def month(self) -> np.ndarray:
+        return self._month_lookup[self.date_code] if self._size else np.empty(0, dtype=np.int32)
+
+    @property
+    def categories(self) -> List[str]:
+        return self._categories.values
+
+    @property
+    def users(self) -> List[str]:
+        return self._users.values
+
+    @property
+    def dates(self) -> List[str]:
+        return self._dates.values
+
+    @property
+    def merchants(self) -> List[str]:
+        return self._merchants.values
+
+    def dated(self) -> np.ndarray:
+        return self.day != NO_DAY
+
+    def user_code_for(self, user_id: str) -> int | None:
+        return self._users.codes.get(user_id)
+
+    def category_code_for(self, category_id: str) -> int | None:
+        return self._categories.codes.get(category_id)
+
+    def category_values(self, category_map, key: str, default: float) -> np.ndarray:
+        """Dense per-category-code array of ``category_map[cid][key]``."""
+
+        return np.asarray(
+            [category_map.get(cid, {}).get(key, default) for cid in self.categories],
+            dtype=np.float64,
+        )
+
+    def co2e(self, category_map, use_snapshot: bool = True) -> np.ndarray:
+        """Per-row ``amount * co2e`` for ``category_map``."""
+
+        return self._enriched("co2e", category_map, use_snapshot)
+
+    def env_score(self, category_map, use_snapshot: bool = True) -> np.ndarray:
+        """Per-row category ``env_score`` (0 for unknown categories)."""
+
+        return self._enriched("env_score", category_map, use_snapshot)
+
+    def _enriched(self, name: str, category_map, use_snapshot: bool) -> np.ndarray:
+        start = 0
+        head = None
+        snapshot = self.snapshot
+        if use_snapshot and snapshot is not None and snapshot.fingerprint == transaction_snapshot.category_fingerprint(category_map):
+            head, start = snapshot.columns[name], snapshot.rows
+            if start == self._size:
+                return head
+        codes = self.category_code[start:]
+        if name == "co2e":
+            tail = self.category_values(category_map, "co2e", 0.0)[codes] * self.amount[start:] if codes.size else np.empty(0)
+        else:
+            tail = self.category_values(category_map, "env_score", 0.0)[codes] if codes.size else np.empty(0)
+        return tail if head is None else np.concatenate([head, tail])
+
+    def iter_rows(
+        self,
+        user_id: str | None = None,
+        category_id: str | None = None,
+        start_day: int | None = None,
+        end_day: int | None = None,
+        after_id: int = 0,
+    ) -> Iterator[Tuple[int, str, str, float, str, str]]:
+        """Yield ``(id, merchant, category_id, amount, date, user_id)`` in file order.
+
+        ``id`` is the 1-based row number; only rows with ``id > after_id`` that
+        match every given filter (days inclusive) are produced. Rows are scanned
+        lazily in blocks, so stopping early only pays for the rows consumed.
+        The columns are captured up front, giving a consistent snapshot even
+        if the store is refreshed mid-iteration.
+        """
+
+        size = self._size
+        amount, category_code, user_code, date_code = self.amount, self.category_code, self.user_code, self.date_code
+        day_lookup = self._day_lookup if size else None
+        merchant_code = self.merchant_code
+        categories, users, dates, merchants = self.categories, self.users, self.dates, self.merchants
+
+        wanted_user = wanted_category = None
+        if user_id is not None:
+            wanted_user = self.user_code_for(user_id)
+            if wanted_user is None:
+                return
+        if category_id is not None:
+            wanted_category = self.category_code_for(category_id)
+            if wanted_category is None:
+                return
+        filtered = wanted_user is not None or wanted_category is not None or start_day is not None or end_day is not None
+
+        for start in range(max(after_id, 0), size, _SCAN_BLOCK):
+            stop = min(start + _SCAN_BLOCK, size)
+            if filtered:
+                mask = np.ones(stop - start, dtype=bool)
+                if wanted_user is not None:
+                    mask &= user_code[start:stop] == wanted_user
+                if wanted_category is not None:
+                    mask &= category_code[start:stop] == wanted_category
+                if start_day is not None or end_day is not None:
+                    days = day_lookup[date_code[start:stop]]
+                    mask &= days != NO_DAY
+                    if start_day is not None:
+                        mask &= days >= start_day
+                    if end_day is not None:
+                        mask &= days <= end_day
+                rows = np.flatnonzero(mask) + start
+            else:
+                rows = np.arange(start, stop)
+            for idx, amt, cat, user, dt, merchant in zip(
+                rows.tolist(),
+                amount[rows].tolist(),
+                category_code[rows].tolist(),
+                user_code[rows].tolist(),
+                date_code[rows].tolist(),
+                merchant_code[rows].tolist(),
+            ):
+                yield idx + 1, merchants[merchant], categories[cat], amt, dates[dt], users[user]
+
+
+_STORES: Dict[str, TransactionStore] = {}
+_LOCK = threading.Lock()
+
+
+def get_transaction_store(path: str) -> TransactionStore:
+    """Return the cached store for ``path``, refreshed against the file on disk.
+
+    Raises ``FileNotFoundError`` when the CSV does not exist so callers keep
+    their existing empty-response handling.
+    """
+
+    key = os.path.abspath(path)
+    store = _STORES.get(key)
+    if store is None:
+        with _LOCK:
+            store = _STORES.get(key)
+            if store is None:
+                store = TransactionStore(key)
+                _STORES[key] = store
+                return store
+    store.refresh()
+    return store
+
+
+def notify_transactions_appended(path: str) -> None:
+    """Fold freshly appended rows into an already-loaded store (no-op otherwise)."""
+
+    store = _STORES.get(os.path.abspath(path))
+    if store is not None:
+        try:
+            store.refresh()
+        except FileNotFoundError:
+            pass
+
+
+def clear_transaction_stores() -> None:
+    with _LOCK:
+        _STORES.clear()
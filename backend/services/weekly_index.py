@@ -0,0 +1,133 @@
+"""Per-user, per-ISO-week spend index for eco coaching.
+
+``build_weekly_profiles`` only needs one user's last few weeks. It used to
+re-read all of that user's transactions on every request.
+:class:`WeeklyIndex` keeps, per user, a bucket per ISO week holding spend,
+count and spend per category. The week keys are kept sorted, so the newest
+``n`` weeks are a slice. :func:`weekly_index` keeps one per backend in sync the
+same way the leaderboard does: it folds in only the rows appended since the
+last call, and rebuilds when the data version moved without any appended rows
+or the stored spend no longer matches (e.g. the CSV was rewritten).
+
+Buckets are keyed by category rather than CO2, so a reloaded category table
+applies on the next read without a rebuild. Reading a profile costs
+O(weeks x categories) whatever the number of other users or rows.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import threading
+import weakref
+from bisect import insort
+from typing import Dict, List, Tuple
+
+from . import dates
+from .storage.base import TransactionBackend
+
+WeekKey = Tuple[int, int]  # (iso_year, iso_week)
+UNKNOWN_CATEGORY = "UNKNOWN"
+
+_generations = itertools.count(1)
+
+
+class WeekBucket:
+    __slots__ = ("spend", "count", "category_spend")
+
+    def __init__(self) -> None:
+        self.spend = 0.0
+        self.count = 0
+        self.category_spend: Dict[str, float] = {}
+
+
+class WeeklyIndex:
+    """ISO-week buckets per user, newest weeks first on read.
+
+    ``(generation, rows[user_id])`` changes whenever that user's buckets do,
+    since a rebuild starts a new index with a new generation.
+    """
+
+    def __init__(self) -> None:
+        self.generation = next(_generations)
+        self.weeks: Dict[str, Dict[WeekKey, WeekBucket]] = {}
+        self.rows: Dict[str, int] = {}
+        self._keys: Dict[str, List[WeekKey]] = {}
+
+    def add(self, user_id: str, day: int, category_id: str, amount: float) -> None:
+        """Fold one dated transaction into ``user_id``'s bucket for the ISO week of epoch ``day``."""
+
+        key = dates.iso_week(day)
+        user_weeks = self.weeks.get(user_id)
+        if user_weeks is None:
+            user_weeks = self.weeks[user_id] = {}
+            self._keys[user_id] = []
+        bucket = user_weeks.get(key)
+        if bucket is None:
+            bucket = user_weeks[key] = WeekBucket()
+            insort(self._keys[user_id], key)
+        category_id = category_id or UNKNOWN_CATEGORY
+        self.rows[user_id] = self.rows.get(user_id, 0) + 1
+        bucket.spend += amount
+        bucket.count += 1
+        bucket.category_spend[category_id] = bucket.category_spend.get(category_id, 0.0) + amount
+
+    def recent(self, user_id: str, max_weeks: int) -> List[Tuple[WeekKey, WeekBucket]]:
+        """Up to ``max_weeks`` of ``user_id``'s weeks, newest first."""
+
+        keys = self._keys.get(user_id)
+        if not keys or max_weeks <= 0:
+            return []
+        user_weeks = self.weeks[user_id]
+        return [(key, user_weeks[key]) for key in reversed(keys[-max_weeks:])]
+
+
+class _View:
+    __slots__ = ("index", "data_version", "last_id", "spend")
+
+    def __init__(self) -> None:
+        self.index = WeeklyIndex()
+        self.data_version = None
+        self.last_id = 0
+        self.spend = 0.0
+
+
+_VIEWS: "weakref.WeakKeyDictionary[TransactionBackend, _View]" = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+def weekly_index(backend: TransactionBackend) -> WeeklyIndex:
+    """Return the weekly index for ``backend``, folding in rows appended since the last call."""
+
+    with _LOCK:
+        view = _VIEWS.get(backend)
+        if view is None:
+            view = _VIEWS[backend] = _View()
+        version = backend.data_version()
+        if version == view.data_version:
+            return view.index
+
+        folded = _fold_new_rows(view, backend)
+        rewritten = view.data_version is not None and not folded
+        if rewritten or not math.isclose(view.spend, backend.total_spend(), rel_tol=1e-9, abs_tol=1e-6):
+            view = _VIEWS[backend] = _View()
+            _fold_new_rows(view, backend)
+        view.data_version = version
+        return view.index
+
+
+def _fold_new_rows(view: _View, backend: TransactionBackend) -> int:
+    folded = 0
+    for row_id, _merchant, category_id, amount, date, user_id in backend.iter_transactions(after_id=view.last_id):
+        day = dates.parse_day(date)
+        if day != dates.NO_DAY:
+            view.index.add(user_id, day, category_id, amount)
+        view.spend += amount
+        view.last_id = row_id
+        folded += 1
+    return folded
+
+
+def clear_weekly_indexes() -> None:
+    with _LOCK:
+        _VIEWS.clear()
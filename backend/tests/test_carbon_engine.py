@@ -0,0 +1,32 @@
+import unittest
+
+import numpy as np
+
+from services import carbon_engine
+
+
+class CarbonEngineBatchTests(unittest.TestCase):
+    def test_batch_matches_scalar_functions(self):
+        rng = np.random.default_rng(18)
+        known = list(carbon_engine.categories().ids)
+        ids = rng.choice(known + ["missing", ""], size=1000).tolist() + [int(known[0])]
+        amounts = np.round(rng.gamma(2.0, 30.0, size=len(ids)), 2)
+
+        scored = carbon_engine.score_transactions(amounts, ids)
+        labels, reasons = carbon_engine.classify_transactions(ids)
+        co2 = carbon_engine.compute_co2_grams_batch(amounts, ids)
+        for i, (amount, cid) in enumerate(zip(amounts.tolist(), ids)):
+            label, reason = carbon_engine.classify_transaction(cid)
+            self.assertEqual((labels[i], reasons[i]), (label, reason))
+            self.assertEqual(scored["label"][i], label)
+            self.assertEqual(scored["points"][i], carbon_engine.POINTS[label])
+            self.assertAlmostEqual(co2[i], carbon_engine.compute_co2_grams(amount, cid))
+        np.testing.assert_array_equal(scored["co2"], co2)
+
+    def test_empty_batch(self):
+        scored = carbon_engine.score_transactions([], [])
+        self.assertEqual((scored["co2"].size, scored["label"].size, scored["points"].size), (0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from services import category_registry
+
+
+def write_categories(path, rows):
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["category_id", "group", "hierarchy", "co2e_per_dollar", "mods"])
+        writer.writerows(rows)
+
+
+class CategoryRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "categories.csv")
+        write_categories(self.path, [
+            ["100", "place", '"Food","Groceries"', "0", ""],
+            ["200", "special", "", "50", ""],
+            ["300", "digital", '"Travel"', "100", ""],
+        ])
+
+    def test_dict_and_dense_views_agree(self):
+        categories = category_registry.parse_categories(self.path)
+
+        self.assertEqual(categories.mapping["100"], {"name": "Groceries", "group": "place", "co2e": 0.0, "env_score": 1})
+        self.assertEqual(categories.mapping["200"]["name"], "special")
+        self.assertEqual([categories.mapping[cid]["env_score"] for cid in categories.ids], [1, 5, 10])
+
+        codes = categories.encode(["300", "missing", "100"])
+        self.assertEqual(codes.tolist(), [2, categories.unknown, 0])
+        self.assertEqual(categories.co2e[codes].tolist(), [100.0, 0.0, 0.0])
+        self.assertEqual(categories.env_score[codes].tolist(), [10, 5, 1])
+        labels = [category_registry.LABELS[code] for code in categories.label_code[codes]]
+        self.assertEqual(labels, ["bad", "neutral", "good"])
+
+    def test_reloads_when_the_file_changes(self):
+        registry = category_registry.CategoryRegistry(self.path, reload_interval=0)
+        first = registry.current()
+        self.assertIs(registry.current(), first)
+        view = first.derived("view", lambda categories: [categories.version])
+        self.assertIs(first.derived("view", lambda categories: None), view)
+
+        write_categories(self.path, [["100", "place", "", "2", ""], ["400", "place", "", "4", ""]])
+        os.utime(self.path, ns=(1, 1))
+        second = registry.current()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.version, first.version + 1)
+        self.assertEqual(sorted(second.mapping), ["100", "400"])
+        self.assertEqual(sorted(first.mapping), ["100", "200", "300"])  # old snapshot untouched
+
+        with open(self.path, "wb") as fh:
+            fh.write(b"\xff\xfe not utf-8")
+        self.assertFalse(registry.reload())
+        self.assertIs(registry.current(), second)
+
+    def test_missing_file_is_empty(self):
+        registry = category_registry.CategoryRegistry(os.path.join(self.tmp_dir.name, "absent.csv"))
+        self.assertEqual(len(registry.current()), 0)
+        self.assertEqual(registry.current().encode(["100"]).tolist(), [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from services import category_registry
+from services.category_tree import UNCATEGORIZED, CategoryTree
+
+
+class CategoryTreeTests(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = os.path.join(tmp_dir.name, "categories.csv")
+        with open(path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["category_id", "group", "hierarchy", "co2e_per_dollar", "mods"])
+            writer.writerow(["13000000", "place", '"Food and Drink"', "100", ""])
+            writer.writerow(["13005000", "place", '"Food and Drink","Restaurants"', "300", ""])
+            writer.writerow(["13005031", "place", '"Food and Drink","Restaurants","Filipino"', "350", ""])
+            writer.writerow(["13005032", "place", '"Food and Drink","Restaurants","Fast Food"', "400", ""])
+            # its level-2 prefix has no row of its own
+            writer.writerow(["22001004", "place", '"Travel","Taxi","Rideshare"', "50", ""])
+        self.categories = category_registry.parse_categories(path)
+        self.tree = self.categories.derived("tree", CategoryTree)
+
+    def test_parent_pointers_cover_every_prefix(self):
+        filipino = self.tree.node_for("13005031")
+        restaurants = int(self.tree.parent[filipino])
+        self.assertEqual(self.tree.paths[restaurants], ("Food and Drink", "Restaurants"))
+        self.assertEqual(self.tree.category_ids[restaurants], "13005000")
+        self.assertEqual(self.tree.category_ids[int(self.tree.parent[restaurants])], "13000000")
+
+        taxi = int(self.tree.parent[self.tree.node_for("22001004")])
+        self.assertEqual((self.tree.paths[taxi], self.tree.category_ids[taxi]), (("Travel", "Taxi"), None))
+        self.assertEqual(self.tree.ancestors[filipino].tolist(), [self.tree.parent[restaurants], restaurants, filipino])
+
+    def test_unknown_leaves_fall_back_to_nearest_known_ancestor(self):
+        self.assertEqual(self.categories.mapping.get("13005099")["co2e"], 300.0)
+        self.assertEqual(self.categories.mapping.get("13007000")["co2e"], 100.0)
+        self.assertIsNone(self.categories.mapping.get("99000001"))
+        self.assertNotIn("13005099", self.categories.mapping)
+        self.assertEqual(self.categories.co2e[self.categories.encode(["13005099", "TRANS"])].tolist(), [300.0, 0.0])
+        self.assertEqual(self.tree.node_for("13005099"), self.tree.node_for("13005000"))
+        self.assertEqual(self.tree.paths[self.tree.node_for("nope")], (UNCATEGORIZED,))
+
+    def test_rollup_sums_leaves_at_each_level(self):
+        ids = ["13005031", "13005032", "13005099", "22001004", "nope"]
+        spend = [10.0, 20.0, 5.0, 8.0, 1.0]
+
+        top = {row["name"]: row for row in self.tree.rollup(ids, 1, spend=spend, count=[1, 2, 1, 1, 1])}
+        self.assertEqual(sorted(top), ["Food and Drink", "Travel", UNCATEGORIZED])
+        self.assertEqual((top["Food and Drink"]["spend"], top["Food and Drink"]["count"]), (35.0, 4.0))
+        self.assertEqual(top["Food and Drink"]["category_id"], "13000000")
+
+        second = {row["name"]: row["spend"] for row in self.tree.rollup(ids, 2, spend=spend)}
+        self.assertEqual(second, {"Restaurants": 35.0, "Taxi": 8.0, UNCATEGORIZED: 1.0})
+
+        leaves = {row["name"]: row["spend"] for row in self.tree.rollup(ids, 9, spend=spend)}
+        self.assertEqual(leaves["Restaurants"], 5.0)  # the unknown leaf stays at its ancestor
+        self.assertEqual(leaves["Fast Food"], 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
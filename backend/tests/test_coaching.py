@@ -4,6 +4,7 @@ import tempfile
 import unittest
 
 from app import app
+from routes import transaction as tx_module
 from services import eco_coach
 
 
@@ -37,6 +38,9 @@ class CoachingApiTests(unittest.TestCase):
         eco_coach.TRANSACTION_CSV = self.csv_path
         eco_coach.CATEGORY_CSV_PATH = self.category_path
         eco_coach.CATEGORY_MAP = eco_coach._load_category_map(self.category_path)
+        eco_coach.PAYLOAD_CACHE.clear()
+        self.original_tx_routes_csv = tx_module.CSV_PATH
+        tx_module.CSV_PATH = self.csv_path
 
         self.client = app.test_client()
 
@@ -44,6 +48,7 @@ class CoachingApiTests(unittest.TestCase):
         eco_coach.TRANSACTION_CSV = self.original_tx
         eco_coach.CATEGORY_CSV_PATH = self.original_cat
         eco_coach.CATEGORY_MAP = self.original_map
+        tx_module.CSV_PATH = self.original_tx_routes_csv
         self.tmp_dir.cleanup()
 
     def test_suggestions_endpoint_returns_payload(self):
@@ -56,6 +61,30 @@ class CoachingApiTests(unittest.TestCase):
         top = body["suggestions"][0]
         self.assertIn(top["env_label"], {"good", "neutral", "bad"})
 
+    def test_payloads_are_cached_until_the_user_writes(self):
+        first = self.client.get("/api/coaching/suggestions?user_id=alice").get_json()
+        again = self.client.get("/api/coaching/suggestions?user_id=alice").get_json()
+        self.assertEqual(again, first)  # same generated_at: served from the cache
+        self.client.get("/api/coaching/suggestions?user_id=bob")
+        self.assertEqual(self.client.get("/api/coaching/cache").get_json()["hits"], 1)
+
+        payload = {"merchant": "City Flights", "category_id": "TRAVEL", "amount": 80.0, "date": "2025-11-10", "user_id": "alice"}
+        self.assertEqual(self.client.post("/api/transactions", json=payload).status_code, 201)
+        fresh = self.client.get("/api/coaching/suggestions?user_id=alice").get_json()
+        self.assertEqual(fresh["profiles"][0]["week_start"], "2025-11-10")
+        self.client.get("/api/coaching/suggestions?user_id=bob")
+        stats = self.client.get("/api/coaching/cache").get_json()
+        self.assertEqual((stats["hits"], stats["misses"], stats["invalidations"]), (2, 3, 1))
+
+    def test_cached_payloads_see_writes_that_skip_the_invalidate_hook(self):
+        first = self.client.get("/api/coaching/suggestions?user_id=alice").get_json()
+        with open(self.csv_path, "a", newline="") as csvfile:  # e.g. another worker's write
+            csvfile.write("City Flights,TRAVEL,80.0,2025-11-10,alice\r\n")
+        fresh = self.client.get("/api/coaching/suggestions?user_id=alice").get_json()
+        self.assertNotEqual(fresh["generated_at"], first["generated_at"])
+        self.assertEqual(fresh["profiles"][0]["week_start"], "2025-11-10")
+        self.assertEqual(eco_coach.PAYLOAD_CACHE.stats()["invalidations"], 0)
+
     def test_acknowledge_endpoint_accepts_actions(self):
         resp = self.client.post(
             "/api/coaching/suggestions/ack",
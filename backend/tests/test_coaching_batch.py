@@ -0,0 +1,67 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from services import coaching_batch, eco_coach, storage, transaction_store
+
+CATEGORIES = {
+    "TRANS": {"name": "Transit", "co2e": 2.0, "env_score": 9},
+    "GROC": {"name": "Groceries", "co2e": 0.5, "env_score": 2},
+}
+
+
+class CoachingBatchTests(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(transaction_store.clear_transaction_stores)
+        self.tmp = tmp_dir.name
+        self.csv_path = os.path.join(self.tmp, "transactions.csv")
+        with open(self.csv_path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=storage.FIELDNAMES)
+            writer.writeheader()
+            for user_id, category_id, amount, date in [
+                ("carol", "TRANS", 40.0, "2025-11-03"), ("alice", "GROC", 20.0, "2025-11-04"),
+                ("alice", "TRANS", 60.0, "2025-11-12"), ("bob", "GROC", 5.0, "2025-10-28"),
+                ("bob", "TRANS", 9.0, ""), ("alice", "GROC", 3.0, "2025-11-13"), ("dave", "GROC", 2.0, "someday"),
+            ]:
+                writer.writerow({"merchant": "m", "category_id": category_id, "amount": amount, "date": date, "user_id": user_id})
+        patcher = mock.patch.object(eco_coach, "_category_map", return_value=CATEGORIES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_batch(self, **kwargs):
+        out_path = os.path.join(self.tmp, "digests.ndjson")
+        stats = coaching_batch.run_batch(self.csv_path, out_path, weeks=2, **kwargs)
+        with open(out_path) as handle:
+            return stats, [json.loads(line) for line in handle]
+
+    def test_digests_match_per_user_payloads(self):
+        stats, digests = self.run_batch(workers=1)
+        self.assertEqual((stats["users"], stats["rows"], stats["workers"]), (4, 7, 1))
+        self.assertEqual([d["user_id"] for d in digests], ["alice", "bob", "carol", "dave"])
+        self.assertEqual(digests[3]["profiles"], [])  # only undated rows
+        self.assertEqual(len({d["generated_at"] for d in digests}), 1)
+
+        with mock.patch.object(eco_coach, "TRANSACTION_CSV", self.csv_path):
+            for digest in digests:
+                expected = eco_coach.generate_coaching_payload(digest["user_id"], weeks=2)
+                expected["generated_at"] = digest["generated_at"]
+                self.assertEqual(digest, expected)
+
+    def test_worker_pool_writes_the_same_digests_in_order(self):
+        _, serial = self.run_batch(workers=1)
+        stats, pooled = self.run_batch(workers=2, chunk_users=1, compare_serial=True)
+        self.assertEqual(stats["workers"], 2)
+        self.assertGreater(stats["users_per_second"], 0)
+        self.assertIsNotNone(stats["speedup"])  # pool start-up dominates at this size
+        for digest in serial + pooled:
+            digest.pop("generated_at")
+        self.assertEqual(pooled, serial)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from services.coaching_cache import PayloadCache
+
+
+class PayloadCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = PayloadCache(max_entries=2, ttl=10, clock=lambda: self.now)
+        self.computed = []
+
+    def compute(self, user_id, key):
+        def build():
+            self.computed.append((user_id, key))
+            return {"user_id": user_id, "key": key, "n": len(self.computed)}
+        return self.cache.get_or_compute(user_id, (key,), build)
+
+    def test_hits_expire_and_evict_least_recently_used(self):
+        first = self.compute("alice", 4)
+        self.assertIs(self.compute("alice", 4), first)
+        self.compute("bob", 4)
+        self.compute("alice", 4)  # alice is now the most recent
+        self.compute("carol", 4)  # evicts bob
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.compute("bob", 4)
+        self.assertEqual(self.computed, [("alice", 4), ("bob", 4), ("carol", 4), ("bob", 4)])
+
+        self.now = 11
+        self.assertIsNot(self.compute("bob", 4), self.compute("alice", 4))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (2, 6, 2))
+
+    def test_invalidation_is_per_user_and_covers_in_flight_computes(self):
+        self.compute("alice", 4)
+        self.compute("bob", 4)
+        self.cache.invalidate("alice")
+        self.compute("alice", 4)
+        self.compute("bob", 4)
+        self.assertEqual(self.computed, [("alice", 4), ("bob", 4), ("alice", 4)])
+
+        def racing_build():
+            self.cache.invalidate("bob")
+            return {"stale": True}
+
+        self.cache.invalidate("bob")
+        self.assertEqual(self.cache.get_or_compute("bob", (4,), racing_build), {"stale": True})
+        self.assertEqual(self.compute("bob", 4)["n"], 4)
+        self.assertEqual(self.cache.stats()["invalidations"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from datetime import date, datetime
+
+import numpy as np
+
+from services import dates
+
+
+def _strptime_day(value):
+    for fmt in dates.DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).toordinal() - dates.EPOCH_ORDINAL
+        except Exception:
+            continue
+    return dates.NO_DAY
+
+
+class DateParsingTests(unittest.TestCase):
+    samples = [
+        "2025-11-01", "2025/11/01", "11/01/2025", "2025-1-5", "2024-02-29", "2025-02-29",
+        "2025-13-01", "", "not a date", "1970-01-01", "1969-12-31", "2025-11-01 ",
+    ]
+
+    def test_parse_day_matches_strptime_formats(self):
+        for value in self.samples:
+            with self.subTest(value=value):
+                self.assertEqual(dates.parse_day(value), _strptime_day(value) if value else dates.NO_DAY)
+
+    def test_parse_days_and_months_are_vectorized(self):
+        days = dates.parse_days(self.samples, len(self.samples))
+        self.assertEqual(days.dtype, np.int32)
+        self.assertEqual(days.tolist(), [dates.parse_day(value) for value in self.samples])
+        self.assertEqual(dates.days_to_months(days).tolist(), [dates.day_to_month(day) for day in days.tolist()])
+        self.assertEqual(dates.day_to_date(days[0]), date(2025, 11, 1))
+        self.assertEqual(dates.month_index(2025, 11), dates.day_to_month(days[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from services import ecoscore_system
+
+
+class EcoScoreSystemTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.categories_path = os.path.join(self.tmp_dir.name, "categories.csv")
+        self.transactions_path = os.path.join(self.tmp_dir.name, "transactions.csv")
+        with open(self.categories_path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["category_id", "group", "hierarchy", "co2e_per_dollar", "mods"])
+            writer.writerow(["100", "groceries", "Food", "0.5", ""])
+            writer.writerow(["200", "special", "Travel", "2.0", "2"])
+            writer.writerow(["300", "rideshare", "Rides", "0.05", "diet"])
+            writer.writerow(["400", "place", "Shops", "0.5", ""])
+        rows = [
+            ("alice", "100", 10.0), ("bob", "200", 3.0), ("alice", "999", 50.0),
+            ("carol", "300", 20.0), ("bob", "400", 4.0), ("", "100", 1.0),
+        ]
+        with open(self.transactions_path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["date", "merchant", "category_id", "amount", "user_id"])
+            for user, cid, amount in rows:
+                writer.writerow(["2025-11-01", "Shop", cid, amount, user])
+
+    def test_chunked_scores_match_single_pass(self):
+        expected, info = ecoscore_system.score_file(self.transactions_path, self.categories_path, chunksize=100)
+        expected = expected.set_index("user_id")
+
+        self.assertEqual(expected.loc["alice", "total_points"], 10)  # groceries good, unknown neutral
+        self.assertEqual(expected.loc["bob", "total_points"], -20)  # co2 > 1 bad, 0.5 neutral
+        self.assertEqual(expected.loc["carol", "total_points"], 10)  # low CO2 is checked before the high-impact group
+        self.assertAlmostEqual(expected.loc["bob", "total_co2e"], 3.0 * 2.0 * 2 + 4.0 * 0.5)
+        self.assertAlmostEqual(expected.loc["alice", "total_co2_saved"], (0.5 - 0.03) * 10.0)
+        self.assertEqual(expected.loc["guest", "good_count"], 1)
+        self.assertEqual(dict(zip(info["category_id"], info["notes"]))["300"], "diet")
+
+        for chunksize in (1, 2, 4):
+            with self.subTest(chunksize=chunksize):
+                chunked, _ = ecoscore_system.score_file(self.transactions_path, self.categories_path, chunksize)
+                pd.testing.assert_frame_equal(chunked.set_index("user_id").sort_index(), expected.sort_index())
+
+    def test_writes_scored_rows_to_parquet(self):
+        out = os.path.join(self.tmp_dir.name, "scored.parquet")
+        ecoscore_system.score_file(self.transactions_path, self.categories_path, chunksize=2, transactions_out=out)
+
+        scored = pd.read_parquet(out)
+        self.assertEqual(len(scored), 6)
+        self.assertEqual(
+            scored["classification"].tolist(), ["good", "bad", "neutral", "good", "neutral", "good"]
+        )
+
+    def test_blank_text_in_first_chunk_keeps_string_schema(self):
+        with open(self.transactions_path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["date", "merchant", "category_id", "amount", "user_id"])
+            writer.writerow(["", "", "100", 1.0, ""])
+            writer.writerow(["2025-11-02", "Market", "200", 2.0, "alice"])
+        out = os.path.join(self.tmp_dir.name, "scored.parquet")
+        ecoscore_system.score_file(self.transactions_path, self.categories_path, chunksize=1, transactions_out=out)
+
+        scored = pd.read_parquet(out)
+        self.assertTrue(scored.loc[0, ["merchant", "date"]].isna().all())
+        self.assertEqual(scored.loc[1, ["merchant", "date"]].tolist(), ["Market", "2025-11-02"])
+        self.assertEqual(scored["user_id"].tolist(), ["guest", "alice"])
+
+
+if __name__ == "__main__":
+    unittest.main()
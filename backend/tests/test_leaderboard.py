@@ -0,0 +1,82 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from services import storage, transaction_store
+from services.calculate_percentile import percentiles_of_values
+from services.leaderboard import MaterializedLeaderboard, materialized_leaderboard
+
+
+class MaterializedLeaderboardTests(unittest.TestCase):
+    def test_lookups_match_batch_percentiles(self):
+        rng = np.random.default_rng(5)
+        board = MaterializedLeaderboard()
+        for _ in range(2000):
+            board.add(f"user{rng.integers(300)}", float(rng.integers(0, 20)))
+        users = list(board.totals)
+        totals = [board.total(uid) for uid in users]
+        expected = percentiles_of_values(totals, totals)
+        self.assertEqual([board.percentile(uid) for uid in users], expected.tolist())
+        lowest = min(users, key=board.total)
+        self.assertEqual(board.rank(lowest), 1)
+        self.assertIsNone(board.rank("nobody"))
+
+    def test_cohort_boards_track_the_global_board(self):
+        teams = {"ann": "Blue", "ben": "Blue", "cat": "Red", "dan": None}
+        board = MaterializedLeaderboard(cohort_of=lambda uid: {"team": teams[uid]})
+        for uid, co2 in [("ann", 5.0), ("ben", 1.0), ("cat", 4.0), ("ann", 1.0), ("dan", 2.0)]:
+            board.add(uid, co2)
+
+        blue = board.cohort("team", "Blue")
+        self.assertEqual(blue.totals, {"ann": 6.0, "ben": 1.0})
+        self.assertEqual(blue.lowest(), [("ben", 1.0), ("ann", 6.0)])
+        self.assertEqual(blue.rank("ann"), 2)
+        self.assertEqual(blue.percentile("ben"), 25.0)
+        self.assertIsNone(board.cohort("team", None))
+        self.assertEqual(board.rank("ann"), 4)
+
+        rankings = board.cohort_rankings("team")
+        self.assertEqual([row["team"] for row in rankings], ["Blue", "Red"])
+        self.assertEqual(rankings[0], {"team": "Blue", "members": 2, "total_co2": 7.0, "per_capita_co2": 3.5,
+                                       "rank_total": 2, "rank_per_capita": 1})
+        self.assertEqual([row["team"] for row in board.cohort_rankings("team", by="total_co2")], ["Red", "Blue"])
+
+    def test_backend_view_folds_in_appends(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(transaction_store.clear_transaction_stores)
+        csv_path = os.path.join(tmp_dir.name, "transactions.csv")
+        with open(csv_path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=storage.FIELDNAMES)
+            writer.writeheader()
+            writer.writerow({"merchant": "Bike Share", "category_id": "TRANS", "amount": 10.0, "date": "2025-11-01", "user_id": "bob"})
+            writer.writerow({"merchant": "Local Market", "category_id": "GROC", "amount": 20.0, "date": "2025-11-02", "user_id": "alice"})
+        backend = storage.CsvBackend(csv_path)
+        categories = {"TRANS": {"co2e": 2.0}, "GROC": {"co2e": 0.5}}
+
+        board = materialized_leaderboard(backend, categories, 1)
+        self.assertEqual(board.totals, {"bob": 20.0, "alice": 10.0})
+        self.assertEqual(board.rank("alice"), 1)
+
+        backend.append({"merchant": "Metro", "category_id": "TRANS", "amount": 1.0, "date": "2025-11-03", "user_id": "alice"})
+        board = materialized_leaderboard(backend, categories, 1)
+        self.assertEqual(board.totals, {"bob": 20.0, "alice": 12.0})
+
+        rebuilt = materialized_leaderboard(backend, {"TRANS": {"co2e": 1.0}, "GROC": {"co2e": 1.0}}, 2)
+        self.assertEqual(rebuilt.totals, {"bob": 10.0, "alice": 21.0})
+        self.assertEqual(rebuilt.rank("bob"), 1)
+
+        with open(csv_path) as fh:
+            body = fh.read()
+        with open(csv_path, "w") as fh:  # same spend and row count, one row moved to another user
+            fh.write(body.replace(",bob", ",cat"))
+        os.utime(csv_path, ns=(1, 1))
+        moved = materialized_leaderboard(backend, {"TRANS": {"co2e": 1.0}, "GROC": {"co2e": 1.0}}, 2)
+        self.assertEqual(moved.totals, {"cat": 10.0, "alice": 21.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
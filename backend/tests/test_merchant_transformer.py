@@ -0,0 +1,34 @@
+import unittest
+
+from services.merchant_transformer.predictor import TransformerPredictor
+
+
+class FakePredictor(TransformerPredictor):
+    """Predictor without torch: a text's scores depend only on the text, like a masked forward pass."""
+
+    def __init__(self):
+        self.id2label = {0: "GROC", 1: "TRANS", 2: "TRAVEL"}
+        self.passes = []
+
+    def _rank(self, texts, top_k):
+        self.passes.append(len(texts))
+        ranked = []
+        for text in texts:
+            scores = sorted(((len(text) * (idx + 1)) % 7 / 7, idx) for idx in self.id2label)[::-1][:top_k]
+            ranked.append(([score for score, _ in scores], [idx for _, idx in scores]))
+        return ranked
+
+
+class PredictBatchTests(unittest.TestCase):
+    def test_mini_batches_match_a_single_pass(self):
+        merchants = ["Bike Share", "", "Local Market", "  ", "Eco Airlines", "Metro", None, "Super Foods Co-op"]
+        single = FakePredictor()
+        whole = single.predict_batch(merchants, top_k=2, batch_size=len(merchants))
+        chunked = FakePredictor()
+        self.assertEqual(chunked.predict_batch(merchants, top_k=2, batch_size=2), whole)
+        self.assertEqual((single.passes, chunked.passes), ([5], [2, 2, 1]))
+        self.assertEqual([len(preds) for preds in whole], [2, 0, 2, 0, 2, 2, 0, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+import numpy as np
+
+from services.calculate_percentile import percentile_of_value, percentiles_of_values
+
+
+class PercentileTests(unittest.TestCase):
+    def test_batch_matches_scalar_including_ties(self):
+        rng = np.random.default_rng(11)
+        reference = rng.integers(0, 50, size=500).astype(float).tolist() + [float("nan"), 3.5]
+        values = reference + [-1.0, 3.5, 49.0, 100.0, float("nan")]
+        expected = [percentile_of_value(value, reference) for value in values]
+        np.testing.assert_array_equal(percentiles_of_values(values, reference), expected)
+
+    def test_all_equal_and_empty_reference(self):
+        self.assertEqual(percentiles_of_values([2.0, 2.0], [2.0, 2.0]).tolist(), [50.0, 50.0])
+        self.assertEqual(percentiles_of_values([1.0, 3.0], [2.0]).tolist(), [0.0, 100.0])
+        self.assertTrue(np.isnan(percentiles_of_values([1.0], [])).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
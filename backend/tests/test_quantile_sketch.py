@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from services.calculate_percentile import percentile_of_value, percentile_reference, percentiles_of_values
+from services.leaderboard import MaterializedLeaderboard
+from services.quantile_sketch import KLLSketch, normalized_rank_error
+
+
+class KLLSketchTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(21)
+        self.values = np.round(rng.gamma(2.0, 40.0, size=60_000), 1).tolist()
+        self.probes = self.values[:500] + [-1.0, 1e9]
+
+    def assertWithinBound(self, sketch, reference):
+        exact = percentiles_of_values(self.probes, reference)
+        approx = percentiles_of_values(self.probes, sketch)
+        self.assertLessEqual(np.abs(exact - approx).max(), 100 * sketch.rank_error)
+
+    def test_single_sketch_is_within_error_bound(self):
+        sketch = KLLSketch.from_values(self.values, k=200, seed=1)
+        self.assertEqual(len(sketch), len(self.values))
+        self.assertLess(sketch.retained, 3 * sketch.k)
+        self.assertWithinBound(sketch, self.values)
+        self.assertEqual(percentile_of_value(-1.0, sketch), 0.0)
+        self.assertEqual(percentile_of_value(1e9, sketch), 100.0)
+
+    def test_shard_sketches_merge(self):
+        shards = [KLLSketch.from_values(self.values[i::4], k=200, seed=i) for i in range(4)]
+        merged = KLLSketch(200, seed=9)
+        for shard in shards:
+            merged.merge(KLLSketch.from_dict(shard.to_dict()))
+        self.assertEqual(len(merged), len(self.values))
+        self.assertWithinBound(merged, self.values)
+        median = merged.quantile(0.5)
+        self.assertAlmostEqual(percentile_of_value(median, self.values), 50.0, delta=100 * normalized_rank_error(200))
+
+    def test_reference_switches_to_sketch_past_threshold(self):
+        self.assertIs(percentile_reference(self.values, threshold=len(self.values)), self.values)
+        sketch = percentile_reference(self.values, threshold=10, rank_error=0.01)
+        self.assertIsInstance(sketch, KLLSketch)
+        self.assertLessEqual(sketch.rank_error, 0.01)
+
+    def test_leaderboard_goes_approximate_past_threshold(self):
+        board = MaterializedLeaderboard(sketch_threshold=1000)
+        for idx, value in enumerate(self.values[:5000]):
+            board.add(f"user{idx}", value)
+        self.assertTrue(board.approximate)
+        exact = percentile_of_value(board.total("user0"), self.values[:5000])
+        self.assertAlmostEqual(board.percentile("user0"), exact, delta=100 * normalized_rank_error(200))
+        self.assertGreaterEqual(board.rank("user0"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import csv
+import gc
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from services import read_files
+
+
+class CumulatedCarbonScoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.carbon_path = os.path.join(self.tmp_dir.name, "categories.csv")
+        self.transactions_path = os.path.join(self.tmp_dir.name, "transactions.csv")
+        with open(self.carbon_path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["category_id", "group", "hierarchy", "co2e_per_dollar", "mods"])
+            writer.writerow(["100", "food", "Food", "0.5", ""])
+            writer.writerow(["200", "travel", "Travel", "2.0", ""])
+        rows = [("100", 10.0), ("200", 3.0), ("999", 50.0), ("100", 4.0), ("200", 1.5)]
+        with open(self.transactions_path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["date", "merchant", "category_id", "amount"])
+            for cid, amount in rows:
+                writer.writerow(["2025-11-01", "Shop", cid, amount])
+
+    def test_chunked_mapping_matches_per_row_lookup(self):
+        for chunksize in (1, 2, 100):
+            with self.subTest(chunksize=chunksize):
+                total = read_files.cumulated_co2e(self.transactions_path, self.carbon_path, chunksize=chunksize)
+                self.assertAlmostEqual(total, 10.0 * 0.5 + 3.0 * 2.0 + 4.0 * 0.5 + 1.5 * 2.0)
+
+        carbon_df = read_files.read_carbon_data(self.carbon_path)
+        self.assertEqual(read_files.calculate_carbon_score(200, carbon_df), 2.0)
+        self.assertEqual(read_files.calculate_carbon_score("999", carbon_df), 0)
+
+    def test_carbon_score_builds_rates_once_per_frame(self):
+        carbon_df = read_files.read_carbon_data(self.carbon_path)
+        with mock.patch.object(read_files, "carbon_rates", wraps=read_files.carbon_rates) as carbon_rates:
+            scores = [read_files.calculate_carbon_score(cid, carbon_df) for cid in ("100", "200", "999", "100")]
+            self.assertEqual(scores, [0.5, 2.0, 0, 0.5])
+            self.assertEqual(carbon_rates.call_count, 1)
+
+            other = read_files.read_carbon_data(self.carbon_path)
+            other.loc[other["category_id"] == "100", "co2e_per_dollar"] = 0.75
+            self.assertEqual(read_files.calculate_carbon_score("100", other), 0.75)
+            self.assertEqual(carbon_rates.call_count, 2)
+            carbon_rates.reset_mock()  # the recorded calls hold the frames
+
+        del carbon_df, other
+        gc.collect()
+        self.assertEqual(read_files._RATES_BY_FRAME, {})
+
+    def test_cumulated_score_converts_and_reports_bad_input(self):
+        score = read_files.calculate_cumulated_carbon_score(
+            self.transactions_path, self.carbon_path, convert=lambda usd: round(usd * 1.4, 2)
+        )
+        self.assertEqual(score, 22.4)
+
+        with open(self.transactions_path, "w") as fh:
+            fh.write("date,merchant\n2025-11-01,Shop\n")
+        self.assertIsNone(read_files.calculate_cumulated_carbon_score(self.transactions_path, self.carbon_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
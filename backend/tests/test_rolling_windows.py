@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from services.rolling_windows import RollingWindows, parse_window
+
+
+class RollingWindowsTests(unittest.TestCase):
+    def test_incremental_totals_match_a_rescan(self):
+        rng = np.random.default_rng(16)
+        windows = RollingWindows()
+        history = []
+        day = 1000
+        for _ in range(3000):
+            if rng.random() < 0.05:
+                day += int(rng.integers(1, 12))
+                windows.advance(day)
+            when = day - int(rng.integers(0, 120))
+            user = f"user{rng.integers(40)}"
+            co2 = float(rng.integers(1, 50))
+            windows.add(user, when, co2)
+            history.append((user, when, co2))
+
+        for days in (7, 30, 90):
+            expected = {}
+            for user, when, co2 in history:
+                if windows.head - days < when <= windows.head:
+                    expected[user] = expected.get(user, 0.0) + co2
+            got = dict(windows.lowest(days))
+            self.assertEqual(set(got), set(expected))
+            for user, total in expected.items():
+                self.assertAlmostEqual(got[user], total)
+            self.assertEqual(windows.active_users(days), len(expected))
+
+    def test_days_rolling_over_evict_old_buckets(self):
+        windows = RollingWindows()
+        windows.add("ann", 100, 5.0)
+        windows.add("ben", 106, 1.0)
+        windows.add("ann", 106, 2.0, count=2)
+        self.assertEqual(windows.total("ann", 7), 7.0)
+        self.assertEqual(windows.tx_count("ann", 7), 3)
+        self.assertEqual(windows.rank("ben", 7), 1)
+        self.assertEqual(windows.percentile_of(7.0, 7), 75.0)
+
+        windows.advance(107)
+        self.assertEqual(windows.total("ann", 7), 2.0)
+        self.assertEqual(windows.total("ann", 30), 7.0)
+        windows.advance(200)
+        self.assertEqual(windows.active_users(90), 0)
+        self.assertIsNone(windows.rank("ann", 7))
+        windows.add("ann", 100, 5.0)  # older than every window
+        self.assertEqual(windows.total("ann", 90), 0.0)
+
+    def test_future_days_are_held_back_until_today_reaches_them(self):
+        today = [106]
+        windows = RollingWindows(clock=lambda: today[0])
+        windows.add("ann", 105, 5.0)
+        windows.add("zed", 40000, 9.0)  # mistyped year
+        windows.add("ben", 108, 1.0)
+        windows.advance(40000)
+        self.assertEqual(windows.head, 106)
+        self.assertEqual(windows.lowest(7), [("ann", 5.0)])
+
+        today[0] = 108
+        windows.advance(today[0])
+        self.assertEqual(windows.lowest(7), [("ben", 1.0), ("ann", 5.0)])
+        self.assertEqual(windows.tx_count("zed", 90), 0)
+
+    def test_parse_window(self):
+        self.assertEqual(parse_window("30d"), 30)
+        self.assertIsNone(parse_window(None))
+        with self.assertRaises(ValueError):
+            parse_window("14d")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import csv
+import os
+import tempfile
+import threading
+import unittest
+
+from services import dates, storage, transaction_store
+from services.storage.append_log import AppendLog
+
+
+class StorageBackendParityTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp_dir.name, "transactions.csv")
+        self.db_path = os.path.join(self.tmp_dir.name, "transactions.db")
+        rows = [
+            {"merchant": "Bike Share", "category_id": "TRANS", "amount": 12.0, "date": "2025-11-01", "user_id": "bob"},
+            {"merchant": "Local Market", "category_id": "GROC", "amount": 20.0, "date": "2025-11-02", "user_id": "alice"},
+            {"merchant": "Refill Shop", "category_id": "GROC", "amount": 5.0, "date": "2025-12-03", "user_id": "alice"},
+            {"merchant": "Mystery", "category_id": "", "amount": 7.5, "date": "not a date", "user_id": "bob"},
+        ]
+        with open(self.csv_path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=storage.FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+        self.csv_backend = storage.CsvBackend(self.csv_path)
+        self.sqlite_backend = storage.SqliteBackend(self.db_path, seed_csv=self.csv_path)
+        self.partitioned_backend = storage.PartitionedBackend(
+            os.path.join(self.tmp_dir.name, "partitions"), seed_csv=self.csv_path
+        )
+
+    def tearDown(self):
+        transaction_store.clear_transaction_stores()
+        self.tmp_dir.cleanup()
+
+    def assertBackendsAgree(self):
+        for other in (self.sqlite_backend, self.partitioned_backend):
+            with self.subTest(backend=other.name):
+                self.assertBackendMatchesCsv(other)
+
+    def assertBackendMatchesCsv(self, other):
+        self.assertEqual(list(self.csv_backend.iter_transactions()), list(other.iter_transactions()))
+        self.assertEqual(self.csv_backend.category_totals(), other.category_totals())
+        self.assertAlmostEqual(self.csv_backend.total_spend(), other.total_spend())
+        for year, month in ((2025, 11), (2025, 12), (2026, 1)):
+            self.assertAlmostEqual(self.csv_backend.month_total(year, month), other.month_total(year, month))
+
+        csv_users = self.csv_backend.user_aggregates(with_days=True)
+        other_users = other.user_aggregates(with_days=True)
+        self.assertEqual(list(csv_users), list(other_users))
+        for uid, expected in csv_users.items():
+            actual = other_users[uid]
+            self.assertEqual(dict(expected.category_spend), dict(actual.category_spend))
+            self.assertEqual(dict(expected.category_counts), dict(actual.category_counts))
+            self.assertEqual(dict(expected.category_days), dict(actual.category_days))
+            self.assertEqual(expected.active_days, actual.active_days)
+        self.assertEqual(
+            sorted(self.csv_backend.iter_user_transactions("alice")),
+            sorted(other.iter_user_transactions("alice")),
+        )
+
+    def test_seeded_sqlite_matches_csv(self):
+        self.assertBackendsAgree()
+        self.assertEqual(list(self.sqlite_backend.user_aggregates("alice", with_days=False)), ["alice"])
+
+    def test_appends_match(self):
+        backends = (self.csv_backend, self.sqlite_backend, self.partitioned_backend)
+        versions = [backend.data_version() for backend in backends]
+        row = {"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-11-04", "user_id": "carol"}
+        for backend in backends:
+            backend.append(row)
+        self.assertBackendsAgree()
+        for backend, before in zip(backends, versions):
+            self.assertNotEqual(backend.data_version(), before, backend.name)
+
+    def test_partition_manifest_and_range_pruning(self):
+        backend = self.partitioned_backend
+        manifest = backend.manifest()["partitions"]
+        self.assertEqual(sorted(manifest), ["2025-11", "2025-12", "undated"])
+        self.assertEqual(manifest["2025-11"]["rows"], 2)
+        self.assertAlmostEqual(manifest["2025-11"]["total_spend"], 32.0)
+
+        december = dates.parse_day("2025-12-01")
+        self.assertEqual(backend._keys_for(december, None), ["2025-12"])
+        rows = list(backend.iter_transactions(start_day=december))
+        self.assertEqual([row[1] for row in rows], ["Refill Shop"])
+        self.assertEqual(list(backend._frames), ["2025-12"])
+
+    def test_compacted_partitions_still_accept_late_rows(self):
+        backend = self.partitioned_backend
+        self.assertEqual(backend.compact("2025-12"), ["2025-11"])
+        root = backend.root
+        self.assertTrue(os.path.exists(os.path.join(root, "2025-11.parquet")))
+        self.assertFalse(os.path.exists(os.path.join(root, "2025-11.csv")))
+        self.assertTrue(backend.manifest()["partitions"]["2025-11"]["compacted"])
+        self.assertBackendsAgree()
+
+        row = {"merchant": "Late Receipt", "category_id": "GROC", "amount": 4.0, "date": "2025-11-20", "user_id": "bob"}
+        self.csv_backend.append(row)
+        self.sqlite_backend.append(row)
+        backend.append(row)
+        self.assertBackendsAgree()
+        self.assertAlmostEqual(backend.month_total(2025, 11), 36.0)
+
+    def test_appends_during_compaction_are_kept(self):
+        backend = self.partitioned_backend
+        row = {"merchant": "Late Receipt", "category_id": "GROC", "amount": 4.0, "date": "2025-11-20", "user_id": "bob"}
+        writer = threading.Thread(target=backend.append, args=(row,))
+        read_frame = backend._read_frame
+
+        def read_then_append(key):
+            frame = read_frame(key)
+            if writer.ident is None:
+                writer.start()
+                writer.join(timeout=0.2)  # blocks on the compaction lock instead of landing in the doomed CSV
+            return frame
+
+        backend._read_frame = read_then_append
+        self.assertEqual(backend.compact("2025-12"), ["2025-11"])
+        writer.join()
+        del backend._read_frame
+
+        self.csv_backend.append(row)
+        self.assertBackendMatchesCsv(backend)
+        self.assertEqual(backend.manifest()["partitions"]["2025-11"]["rows"], 3)
+        self.assertAlmostEqual(backend.month_total(2025, 11), 36.0)
+
+    def test_sqlite_uses_indexes_for_user_filters(self):
+        conn = self.sqlite_backend._conn()
+        plan = " ".join(
+            str(step[-1])
+            for step in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT day, category_id, amount FROM transactions WHERE user_id = ?", ("alice",)
+            )
+        )
+        self.assertIn("COVERING INDEX", plan)
+
+
+class AppendLogTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "log.csv")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_concurrent_writers_group_commit_without_interleaving(self):
+        log = AppendLog(self.path, header="writer,seq\r\n")
+
+        def write(writer_id):
+            for seq in range(50):
+                log.append(f"{writer_id},{seq}\r\n")
+
+        threads = [threading.Thread(target=write, args=(wid,)) for wid in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(self.path, newline="") as fh:
+            rows = list(csv.DictReader(fh))
+        self.assertEqual(len(rows), 400)
+        for writer_id in range(8):
+            seqs = [int(row["seq"]) for row in rows if row["writer"] == str(writer_id)]
+            self.assertEqual(seqs, list(range(50)))
+        self.assertEqual(log.records, 400)
+        self.assertLessEqual(log.batches, log.records)
+
+    def test_unterminated_last_line_is_closed_before_appending(self):
+        with open(self.path, "w", newline="") as fh:
+            fh.write("writer,seq\r\n0,0")
+        AppendLog(self.path, header="writer,seq\r\n").append("1,1\r\n")
+        with open(self.path, newline="") as fh:
+            rows = list(csv.DictReader(fh))
+        self.assertEqual([(r["writer"], r["seq"]) for r in rows], [("0", "0"), ("1", "1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from services import dates, parallel_aggregate, transaction_snapshot, transaction_store
+
+
+class _TransactionsCsvCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp_dir.name, "transactions.csv")
+        self.fieldnames = ["merchant", "category_id", "amount", "date", "user_id"]
+        rows = [
+            {"merchant": "Bike Share", "category_id": "TRANS", "amount": 12.0, "date": "2025-11-01", "user_id": "bob"},
+            {"merchant": "Local Market", "category_id": "GROC", "amount": 20.0, "date": "2025-11-02", "user_id": "alice"},
+            {"merchant": "Refill Shop", "category_id": "GROC", "amount": 5.0, "date": "11/03/2025", "user_id": "alice"},
+        ]
+        with open(self.csv_path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def tearDown(self):
+        transaction_store.clear_transaction_stores()
+        self.tmp_dir.cleanup()
+
+    def _append(self, row):
+        with open(self.csv_path, "a", newline="") as csvfile:
+            csv.DictWriter(csvfile, fieldnames=self.fieldnames).writerow(row)
+
+
+class TransactionStoreTests(_TransactionsCsvCase):
+    def test_columns_and_aggregates(self):
+        store = transaction_store.get_transaction_store(self.csv_path)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.users, ["bob", "alice"])
+        alice = store.aggregates.users["alice"]
+        self.assertAlmostEqual(alice.total_spend, 25.0)
+        self.assertEqual(len(alice.active_days), 2)
+        self.assertEqual(dict(alice.category_spend), {"GROC": 25.0})
+
+    def test_appends_are_folded_in_incrementally(self):
+        first = transaction_store.get_transaction_store(self.csv_path)
+        self._append({"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-12-04", "user_id": "carol"})
+
+        second = transaction_store.get_transaction_store(self.csv_path)
+        self.assertIs(first, second)
+        self.assertEqual(len(second), 4)
+        aggregates = second.aggregates
+        self.assertEqual(aggregates.users["carol"].tx_count, 1)
+        self.assertAlmostEqual(aggregates.category_spend["TRANS"], 15.0)
+        self.assertAlmostEqual(aggregates.month_spend[dates.month_index(2025, 12)], 3.0)
+        self.assertEqual(second.verify_aggregates(), [])
+
+    def test_partial_trailing_line_waits_for_completion(self):
+        store = transaction_store.get_transaction_store(self.csv_path)
+        with open(self.csv_path, "a", newline="") as csvfile:
+            csvfile.write("Metro,TRANS,3.0,2025-11-04,ca")
+        store.refresh()
+        self.assertEqual(len(store), 3)
+
+        with open(self.csv_path, "a", newline="") as csvfile:
+            csvfile.write("rol\r\n")
+        store.refresh()
+        self.assertEqual(len(store), 4)
+        self.assertIn("carol", store.aggregates.users)
+        self.assertEqual(store.verify_aggregates(), [])
+
+    def test_edit_then_append_triggers_full_reload(self):
+        store = transaction_store.get_transaction_store(self.csv_path)
+        with open(self.csv_path, "rb") as fh:
+            body = fh.read()
+        with open(self.csv_path, "wb") as fh:  # longer in-place edit, so a tail read from the old offset is misaligned
+            fh.write(body.replace(b"Local Market,GROC,20.0", b"Local Market,GROC,1.0", 1).replace(b",alice", b",carolyn", 1))
+        self._append({"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-12-04", "user_id": "dave"})
+        store.refresh()
+        self.assertEqual(list(store.iter_rows())[1], (2, "Local Market", "GROC", 1.0, "2025-11-02", "carolyn"))
+        self.assertEqual(list(store.iter_rows())[3], (4, "Metro", "TRANS", 3.0, "2025-12-04", "dave"))
+        self.assertEqual(store.aggregates.users["alice"].tx_count, 1)
+        self.assertEqual(store.verify_aggregates(), [])
+
+    def test_rewrite_triggers_full_reload(self):
+        store = transaction_store.get_transaction_store(self.csv_path)
+        with open(self.csv_path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerow({"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-11-04", "user_id": "dave"})
+        transaction_store.get_transaction_store(self.csv_path)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(list(store.aggregates.users), ["dave"])
+
+
+class TransactionSnapshotTests(_TransactionsCsvCase):
+    category_map = {"TRANS": {"co2e": 0.5, "env_score": 3}, "GROC": {"co2e": 0.25, "env_score": 2}}
+
+    def _snapshot(self):
+        store = transaction_store.TransactionStore(self.csv_path)
+        transaction_snapshot.write_snapshot(store, self.category_map)
+
+    def test_store_maps_snapshot_and_parses_only_the_tail(self):
+        self._snapshot()
+        self._append({"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-12-04", "user_id": "carol"})
+        store = transaction_store.TransactionStore(self.csv_path)
+        self.assertIsNotNone(store.snapshot)
+        self.assertEqual(store.snapshot.rows, 3)
+        self.assertEqual(len(store), 4)
+
+        parsed = list(store.iter_rows())
+        self.assertEqual(parsed[0], (1, "Bike Share", "TRANS", 12.0, "2025-11-01", "bob"))
+        self.assertEqual(parsed[3], (4, "Metro", "TRANS", 3.0, "2025-12-04", "carol"))
+        self.assertEqual(store.day[2], dates.parse_day("2025-11-03"))
+        self.assertEqual(store.co2e(self.category_map).tolist(), [6.0, 5.0, 1.25, 1.5])
+        self.assertEqual(store.env_score(self.category_map).tolist(), [3.0, 2.0, 2.0, 3.0])
+        self.assertEqual(store.verify_aggregates(), [])
+
+    def test_snapshot_columns_are_shared_until_an_append(self):
+        self._snapshot()
+        store = transaction_store.TransactionStore(self.csv_path)
+        self.assertFalse(store.amount.flags.writeable)
+        self._append({"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-12-04", "user_id": "carol"})
+        store.refresh()
+        self.assertTrue(store.amount.flags.writeable)
+        self.assertEqual(store.aggregates.users["carol"].tx_count, 1)
+
+    def test_rewritten_csv_ignores_stale_snapshot(self):
+        self._snapshot()
+        with open(self.csv_path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerow({"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-11-04", "user_id": "dave"})
+            writer.writerow({"merchant": "Bakery", "category_id": "GROC", "amount": 4.0, "date": "2025-11-05", "user_id": "dave"})
+            writer.writerow({"merchant": "Cinema", "category_id": "FUN", "amount": 9.0, "date": "2025-11-06", "user_id": "erin"})
+        store = transaction_store.TransactionStore(self.csv_path)
+        self.assertIsNone(store.snapshot)
+        self.assertEqual(store.users, ["dave", "erin"])
+
+    def test_early_edit_followed_by_append_ignores_stale_snapshot(self):
+        for idx in range(200):  # push the first row well before the snapshot offset
+            self._append({"merchant": f"Shop {idx}", "category_id": "GROC", "amount": 1.0, "date": "2025-11-05", "user_id": "alice"})
+        self._snapshot()
+        with open(self.csv_path, "r+b") as fh:
+            body = fh.read()
+            fh.seek(body.index(b",bob"))
+            fh.write(b",rob")
+        self._append({"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-12-04", "user_id": "carol"})
+        store = transaction_store.TransactionStore(self.csv_path)
+        self.assertIsNone(store.snapshot)
+        self.assertEqual(store.users, ["rob", "alice", "carol"])
+
+    def test_new_snapshot_is_picked_up_on_refresh(self):
+        store = transaction_store.get_transaction_store(self.csv_path)
+        self.assertIsNone(store.snapshot)
+        self.assertIsNotNone(transaction_snapshot.compact(self.csv_path, self.category_map))
+        self.assertIsNone(transaction_snapshot.compact(self.csv_path, self.category_map))
+        store.refresh()
+        self.assertIsNotNone(store.snapshot)
+        self.assertEqual(len(store), 3)
+
+
+class ParallelAggregateTests(_TransactionsCsvCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(200):
+            self._append({
+                "merchant": f"Shop {i % 7}", "category_id": ("TRANS", "GROC", "")[i % 3], "amount": i / 4,
+                "date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}" if i % 11 else "", "user_id": f"user{i % 13}",
+            })
+        with open(self.csv_path, "a", newline="") as csvfile:
+            csvfile.write("Metro,TRANS,3.0,2025-11-04,ca")  # partial line: left out of the rebuild
+
+    def test_byte_ranges_end_on_newlines(self):
+        size = os.path.getsize(self.csv_path)
+        ranges = parallel_aggregate.byte_ranges(self.csv_path, 0, size, 4)
+        self.assertEqual(len(ranges), 4)
+        with open(self.csv_path, "rb") as fh:
+            data = fh.read()
+        self.assertEqual(ranges[0][0], 0)
+        for (_, hi), (lo, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(hi, lo)
+        for _, hi in ranges:
+            self.assertEqual(data[hi - 1:hi], b"\n")
+        self.assertEqual(ranges[-1][1], data.rfind(b"\n") + 1)
+
+    def test_pooled_rebuild_matches_serial_store(self):
+        serial = transaction_store.TransactionStore(self.csv_path)
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                aggregates = parallel_aggregate.aggregate_file(self.csv_path, workers)
+                self.assertEqual(aggregates.tx_count, 203)
+                self.assertEqual(aggregates.diff(serial.aggregates), [])
+                self.assertEqual(list(aggregates.users), serial.users)
+
+    def test_leaderboard_rows_rank_lowest_co2_first(self):
+        aggregates = parallel_aggregate.aggregate_file(self.csv_path, 1)
+        rows = parallel_aggregate.leaderboard_rows(aggregates, {"TRANS": {"co2e": 0.5}, "GROC": {"co2e": 0.25}})
+        self.assertEqual([row["rank"] for row in rows], list(range(1, len(rows) + 1)))
+        self.assertEqual([row["total_co2"] for row in rows], sorted(row["total_co2"] for row in rows))
+        bob = next(row for row in rows if row["user_id"] == "bob")
+        self.assertEqual((bob["total_co2"], bob["tx_count"], bob["active_days"]), (6.0, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,10 +3,14 @@ import importlib
 import os
 import tempfile
 import unittest
+from datetime import date
+from unittest import mock
 
 from app import app
 from routes import transaction as tx_module
+from services import category_registry, dates
 from services import merchant_classifier as classifier_module
+from services import transaction_store
 
 
 class TransactionApiTests(unittest.TestCase):
@@ -59,6 +63,28 @@ class TransactionApiTests(unittest.TestCase):
         self.assertEqual(labels["Bike Share"], "neutral")
         self.assertEqual(labels["Local Market"], "good")
 
+    def test_transactions_paginate_with_cursor(self):
+        first = self.client.get("/api/transactions?limit=1")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([item["name"] for item in first.get_json()], ["Bike Share"])
+        cursor = first.headers["X-Next-Cursor"]
+        self.assertIn('rel="next"', first.headers["Link"])
+
+        second = self.client.get(f"/api/transactions?limit=1&cursor={cursor}")
+        self.assertEqual([item["name"] for item in second.get_json()], ["Local Market"])
+        self.assertNotIn("X-Next-Cursor", second.headers)
+
+    def test_transactions_filters(self):
+        by_user = self.client.get("/api/transactions?user_id=alice").get_json()
+        self.assertEqual([item["user_id"] for item in by_user], ["alice"])
+        by_range = self.client.get("/api/transactions?from=2025-11-02&to=2025-11-30").get_json()
+        self.assertEqual([item["name"] for item in by_range], ["Local Market"])
+        by_category = self.client.get("/api/transactions?category_id=TRANS").get_json()
+        self.assertEqual([item["category"] for item in by_category], ["TRANS"])
+        self.assertEqual(self.client.get("/api/transactions?user_id=nobody").get_json(), [])
+        self.assertEqual(self.client.get("/api/transactions?cursor=abc").status_code, 400)
+        self.assertEqual(self.client.get("/api/transactions?from=yesterday").status_code, 400)
+
     def test_post_transaction_appends_row(self):
         payload = {
             "merchant": "Refill Shop",
@@ -75,6 +101,18 @@ class TransactionApiTests(unittest.TestCase):
         self.assertEqual(rows[-1]["merchant"], "Refill Shop")
         self.assertEqual(rows[-1]["user_id"], "alice")
 
+    def test_post_transaction_updates_aggregates(self):
+        self.client.get("/api/leaderboard")
+        payload = {"merchant": "Metro", "category_id": "TRANS", "amount": 10.0, "date": "2025-11-04", "user_id": "carol"}
+        resp = self.client.post("/api/transactions", json=payload)
+        self.assertEqual(resp.status_code, 201)
+
+        body = self.client.get("/api/transactions/eco-score?user_id=carol").get_json()
+        self.assertAlmostEqual(body["total_co2"], 20.0)
+        total = self.client.get("/api/transactions/total?month=2025-11").get_json()
+        self.assertAlmostEqual(total["total"], 42.0)
+        self.assertEqual(transaction_store.get_transaction_store(self.csv_path).verify_aggregates(), [])
+
     def test_post_transaction_auto_classifies_when_missing_category(self):
         payload = {
             "merchant": "Local Market",
@@ -88,6 +126,50 @@ class TransactionApiTests(unittest.TestCase):
         self.assertIn("predicted_category", data)
         self.assertEqual(data["predicted_category"]["category_id"], "GROC")
 
+    def test_bulk_ndjson_classifies_and_reports_per_row(self):
+        body = "\n".join([
+            '{"merchant": "Refill Shop", "category_id": "GROC", "amount": 15.5, "date": "2025-11-03", "user_id": "alice"}',
+            '{"merchant": "Local Market", "amount": 8, "date": "2025-11-04", "user_id": "bob"}',
+            '{"merchant": "No Date", "category_id": "GROC", "amount": 1}',
+            'not json',
+        ])
+        resp = self.client.post("/api/transactions/bulk", data=body, content_type="application/x-ndjson")
+        self.assertEqual(resp.status_code, 207)
+        data = resp.get_json()
+        self.assertEqual((data["created"], data["failed"]), (2, 2))
+        self.assertEqual([r["status"] for r in data["results"]], ["created", "created", "error", "error"])
+        self.assertEqual(data["results"][1]["predicted_category"]["category_id"], "GROC")
+
+        with open(self.csv_path, newline="") as csvfile:
+            rows = list(csv.DictReader(csvfile))
+        self.assertEqual([row["merchant"] for row in rows[-2:]], ["Refill Shop", "Local Market"])
+        self.assertEqual(rows[-1]["category_id"], "GROC")
+
+    def test_bulk_ndjson_accepts_numeric_ids(self):
+        body = "\n".join([
+            '{"merchant": "Cafe", "category_id": 13005031, "amount": 4, "date": "2025-11-05", "user_id": 42}',
+            '{"merchant": "Odd", "category_id": {"id": 1}, "amount": 1, "date": "2025-11-05"}',
+        ])
+        resp = self.client.post("/api/transactions/bulk", data=body, content_type="application/x-ndjson")
+        self.assertEqual(resp.status_code, 207)
+        results = resp.get_json()["results"]
+        self.assertEqual([r["status"] for r in results], ["created", "error"])
+        self.assertIn("category_id", results[1]["error"])
+        with open(self.csv_path, newline="") as csvfile:
+            last = list(csv.DictReader(csvfile))[-1]
+        self.assertEqual((last["category_id"], last["user_id"]), ("13005031", "42"))
+
+    def test_bulk_csv_upload(self):
+        body = "merchant,category_id,amount,date,user_id\nMetro,TRANS,3.5,2025-11-05,carol\nMarket,GROC,4,2025-11-06,carol\n"
+        resp = self.client.post("/api/transactions/bulk", data=body, content_type="text/csv")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.get_json()["created"], 2)
+        eco = self.client.get("/api/transactions/eco-score?user_id=carol").get_json()
+        self.assertAlmostEqual(eco["total_co2"], 3.5 * 2.0 + 4 * 0.5)
+
+        empty = self.client.post("/api/transactions/bulk", data="", content_type="text/csv")
+        self.assertEqual(empty.status_code, 400)
+
     def test_leaderboard_ranks_lowest_impact_first(self):
         resp = self.client.get("/api/leaderboard")
         self.assertEqual(resp.status_code, 200)
@@ -97,6 +179,147 @@ class TransactionApiTests(unittest.TestCase):
         self.assertEqual(leaderboard[1]["user_id"], "bob")
         self.assertGreater(leaderboard[0]["eco_points"], leaderboard[1]["eco_points"])
 
+    def test_leaderboard_loads_stats_for_returned_rows_only(self):
+        self.client.get("/api/leaderboard")  # build the materialized board
+        backend = tx_module._backend()
+        with mock.patch.object(type(backend), "user_aggregates", autospec=True,
+                               side_effect=type(backend).user_aggregates) as user_aggregates:
+            top = self.client.get("/api/leaderboard?limit=1", headers={"If-None-Match": "stale"}).get_json()
+        self.assertEqual([row["user_id"] for row in top], ["alice"])
+        self.assertEqual([call.args[1] for call in user_aggregates.call_args_list], ["alice"])
+
+    def test_leaderboard_filters_by_team_and_ranks_teams(self):
+        original_profiles = tx_module.USER_PROFILES
+        self.addCleanup(setattr, tx_module, "USER_PROFILES", original_profiles)
+        tx_module.USER_PROFILES = {
+            "alice": {"user_id": "alice", "team": "Harbour", "location": "Victoria"},
+            "bob": {"user_id": "bob", "team": "Harbour", "location": "Vancouver"},
+            "carol": {"user_id": "carol", "team": "Summit", "location": "Vancouver"},
+        }
+        payload = {"merchant": "Metro", "category_id": "TRANS", "amount": 1.0, "date": "2025-11-04", "user_id": "carol"}
+        self.assertEqual(self.client.post("/api/transactions", json=payload).status_code, 201)
+
+        harbour = self.client.get("/api/leaderboard?team=Harbour").get_json()
+        self.assertEqual([(row["user_id"], row["rank"]) for row in harbour], [("alice", 1), ("bob", 2)])
+        self.assertEqual(harbour[0]["eco_score_percentile"], 25.0)
+
+        vancouver = self.client.get("/api/leaderboard?location=Vancouver").get_json()
+        self.assertEqual([row["user_id"] for row in vancouver], ["carol", "bob"])
+        both = self.client.get("/api/leaderboard?team=Harbour&location=Vancouver").get_json()
+        self.assertEqual([row["user_id"] for row in both], ["bob"])
+        self.assertEqual(self.client.get("/api/leaderboard?team=Nowhere").get_json(), [])
+
+        teams = self.client.get("/api/leaderboard/teams").get_json()
+        self.assertEqual([(row["team"], row["members"]) for row in teams], [("Summit", 1), ("Harbour", 2)])
+        self.assertEqual(teams[1]["total_co2"], 34.0)
+        self.assertEqual(teams[1]["rank_per_capita"], 2)
+        by_total = self.client.get("/api/leaderboard/teams?sort=total").get_json()
+        self.assertEqual(by_total[0]["team"], "Summit")
+
+    def test_rolling_window_leaderboard_and_eco_score(self):
+        self.addCleanup(mock.patch.stopall)
+        mock.patch.object(dates, "today", return_value=dates.date_to_day(date(2025, 11, 8))).start()
+
+        future = {"merchant": "Typo Air", "category_id": "GROC", "amount": 1.0, "date": "2099-01-01", "user_id": "zed"}
+        self.assertEqual(self.client.post("/api/transactions", json=future).status_code, 201)
+        week = self.client.get("/api/leaderboard?window=7d").get_json()
+        self.assertEqual([(row["user_id"], row["window"]) for row in week], [("alice", "7d")])
+        self.assertEqual(week[0]["total_co2"], 10.0)
+        month = self.client.get("/api/leaderboard?window=30d").get_json()
+        self.assertEqual([row["user_id"] for row in month], ["alice", "bob"])
+
+        payload = {"merchant": "Metro", "category_id": "TRANS", "amount": 1.0, "date": "2025-11-07", "user_id": "bob"}
+        self.assertEqual(self.client.post("/api/transactions", json=payload).status_code, 201)
+        eco = self.client.get("/api/transactions/eco-score?user_id=bob&window=7d").get_json()
+        self.assertEqual((eco["total_co2"], eco["tx_count"], eco["rank"], eco["users"]), (2.0, 1, 1, 2))
+
+        dates.today.return_value += 5  # by the 13th only bob's row from the 7th is left
+        eco = self.client.get("/api/transactions/eco-score?user_id=alice&window=7d").get_json()
+        self.assertEqual((eco["total_co2"], eco["rank"], eco["users"]), (0.0, None, 1))
+        self.assertEqual(self.client.get("/api/leaderboard?window=14d").status_code, 400)
+
+    def test_score_is_per_user_when_given_user_id(self):
+        blended = self.client.get("/api/score").get_json()
+        self.assertEqual((blended["total_co2e"], blended["percentile"]), (34.0, 50.0))
+        alice = self.client.get("/api/score?user_id=alice").get_json()
+        self.assertEqual((alice["user_id"], alice["total_co2e"], alice["percentile"]), ("alice", 10.0, 25.0))
+        bob = self.client.get("/api/score?user_id=bob").get_json()
+        self.assertEqual((bob["avg_co2_per_dollar"], bob["percentile"]), (2.0, 75.0))
+        nobody = self.client.get("/api/score?user_id=nobody").get_json()
+        self.assertEqual((nobody["total_spend"], nobody["percentile"]), (0.0, 0.0))
+
+        tx_module.CATEGORY_MAP = {"TRANS": {"co2e": 2.0}, "GROC": {"co2e": 0.5}, "FLY": {"co2e": 4.0}}
+        self.assertEqual(self.client.get("/api/score?user_id=bob").get_json()["percentile"], 50.0)
+
+    def test_read_endpoints_answer_conditional_gets(self):
+        for path in ("/api/leaderboard", "/api/transactions/top", "/api/transactions", "/api/score"):
+            with self.subTest(path=path):
+                first = self.client.get(path)
+                self.assertEqual(first.status_code, 200)
+                etag = first.headers["ETag"]
+                repeat = self.client.get(path, headers={"If-None-Match": etag})
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.data, b"")
+
+        etag = self.client.get("/api/leaderboard").headers["ETag"]
+        payload = {"merchant": "Metro", "category_id": "TRANS", "amount": 3.0, "date": "2025-11-04", "user_id": "carol"}
+        self.assertEqual(self.client.post("/api/transactions", json=payload).status_code, 201)
+        changed = self.client.get("/api/leaderboard", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+        tx_module.CATEGORY_MAP = dict(tx_module.CATEGORY_MAP)  # same table loaded again, e.g. by another worker
+        same = self.client.get("/api/leaderboard", headers={"If-None-Match": changed.headers["ETag"]})
+        self.assertEqual(same.status_code, 304)
+        tx_module.CATEGORY_MAP = dict(tx_module.CATEGORY_MAP, GROC={"name": "Groceries", "co2e": 0.7, "env_score": 2})
+        reloaded = self.client.get("/api/leaderboard", headers={"If-None-Match": changed.headers["ETag"]})
+        self.assertEqual(reloaded.status_code, 200)
+
+    def _use_category_file(self, body):
+        category_path = os.path.join(self.tmp_dir.name, "categories.csv")
+        with open(category_path, "w") as fh:
+            fh.write("category_id,group,hierarchy,co2e_per_dollar,mods\n" + body)
+        category_registry.get_registry(category_path).reload_interval = 0
+        original = (tx_module.CATEGORY_CSV_PATH, tx_module._category_snapshot_seen)
+        tx_module.CATEGORY_CSV_PATH = category_path
+
+        def restore():
+            tx_module.CATEGORY_CSV_PATH, tx_module._category_snapshot_seen = original
+
+        self.addCleanup(restore)
+        return category_path
+
+    def test_category_file_edits_apply_without_restart(self):
+        category_path = self._use_category_file("TRANS,place,Transit,2.0,\nGROC,place,Groceries,0.5,\n")
+        first = self.client.get("/api/transactions/top")
+        self.assertEqual([c["category_id"] for c in self.client.get("/api/transactions/categories").get_json()],
+                         ["GROC", "TRANS"])
+        with open(category_path, "a") as fh:
+            fh.write("FLY,place,Flights,4.0,\n")
+        os.utime(category_path, ns=(1, 1))
+
+        names = {c["category_id"]: c["name"] for c in self.client.get("/api/transactions/categories").get_json()}
+        self.assertEqual(names["FLY"], "Flights")
+        reloaded = self.client.get("/api/transactions/top", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(reloaded.status_code, 200)
+        self.assertNotEqual(reloaded.headers["ETag"], first.headers["ETag"])
+
+    def test_top_categories_roll_up_to_hierarchy_level(self):
+        self._use_category_file(
+            'TRANS,place,"""Travel"",""Transit""",2.0,\nGROC,place,"""Food"",""Groceries""",0.5,\nFOOD,place,"""Food""",1.0,\n'
+        )
+        payload = {"merchant": "Cafe", "category_id": "FOOD", "amount": 4.0, "date": "2025-11-03", "user_id": "alice"}
+        self.assertEqual(self.client.post("/api/transactions", json=payload).status_code, 201)
+
+        top = self.client.get("/api/transactions/top?level=1").get_json()
+        self.assertEqual([(row["name"], row["category_id"], row["level"]) for row in top],
+                         [("Travel", None, 1), ("Food", "FOOD", 1)])
+        self.assertEqual((top[0]["total_co2e"], top[1]["total_co2e"]), (24.0, 14.0))
+        self.assertEqual((top[1]["total_spend"], top[1]["transaction_count"], top[1]["co2e_per_dollar"]), (24.0, 2, 0.5833))
+        leaves = self.client.get("/api/transactions/top?level=2").get_json()
+        self.assertEqual([row["path"] for row in leaves], [["Travel", "Transit"], ["Food", "Groceries"], ["Food"]])
+        self.assertEqual(self.client.get("/api/transactions/top?level=0").status_code, 400)
+
     def test_classify_endpoint_returns_predictions(self):
         resp = self.client.post("/api/transactions/classify", json={"merchant": "Local Market"})
         self.assertEqual(resp.status_code, 200)
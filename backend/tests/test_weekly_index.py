@@ -0,0 +1,64 @@
+import csv
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from services import eco_coach, storage, transaction_store
+from services.weekly_index import WeeklyIndex, weekly_index
+
+
+class WeeklyIndexTests(unittest.TestCase):
+    def test_recent_weeks_are_newest_first(self):
+        index = WeeklyIndex()
+        # epoch days: 20392 = 2025-10-31 (ISO 2025-W44), 20399 = 2025-11-07 (W45), 20422 = 2025-11-30 (W48)
+        for user_id, day, category_id, amount in [
+            ("alice", 20399, "GROC", 5.0), ("alice", 20392, "TRANS", 2.0), ("bob", 20422, "GROC", 9.0),
+            ("alice", 20422, "TRANS", 1.0), ("alice", 20399, "", 3.0), ("alice", 20399, "GROC", 1.5),
+        ]:
+            index.add(user_id, day, category_id, amount)
+
+        weeks = index.recent("alice", 2)
+        self.assertEqual([key for key, _ in weeks], [(2025, 48), (2025, 45)])
+        w45 = weeks[1][1]
+        self.assertEqual((w45.spend, w45.count, w45.category_spend), (9.5, 3, {"GROC": 6.5, "UNKNOWN": 3.0}))
+        self.assertEqual(len(index.recent("alice", 10)), 3)
+        self.assertEqual(index.recent("nobody", 4), [])
+
+    def test_backend_index_folds_in_appends_for_coaching_profiles(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(transaction_store.clear_transaction_stores)
+        csv_path = os.path.join(tmp_dir.name, "transactions.csv")
+        with open(csv_path, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=storage.FIELDNAMES)
+            writer.writeheader()
+            writer.writerow({"merchant": "Bike Share", "category_id": "TRANS", "amount": 10.0, "date": "2025-11-03", "user_id": "bob"})
+            writer.writerow({"merchant": "Market", "category_id": "GROC", "amount": 20.0, "date": "2025-11-04", "user_id": "alice"})
+            writer.writerow({"merchant": "Undated", "category_id": "GROC", "amount": 7.0, "date": "", "user_id": "alice"})
+        backend = storage.CsvBackend(csv_path)
+
+        index = weekly_index(backend)
+        self.assertEqual([key for key, _ in index.recent("alice", 4)], [(2025, 45)])
+
+        backend.append({"merchant": "Metro", "category_id": "TRANS", "amount": 4.0, "date": "2025-11-12", "user_id": "alice"})
+        self.assertIs(weekly_index(backend), index)
+        self.assertEqual([key for key, _ in index.recent("alice", 4)], [(2025, 46), (2025, 45)])
+
+        categories = {"TRANS": {"name": "Transit", "co2e": 2.0, "env_score": 9}, "GROC": {"name": "Groceries", "co2e": 0.5, "env_score": 2}}
+        with mock.patch.object(eco_coach, "TRANSACTION_CSV", csv_path), mock.patch.object(eco_coach, "_category_map", return_value=categories):
+            profiles = eco_coach.build_weekly_profiles("alice", max_weeks=4)
+        self.assertEqual([(p["week"], p["total_spend"], p["total_co2"], p["week_start"]) for p in profiles],
+                         [(46, 4.0, 8.0, "2025-11-10"), (45, 20.0, 10.0, "2025-11-03")])
+        self.assertEqual(profiles[0]["top_categories"][0]["env_label"], "bad")
+
+        with open(csv_path) as fh:
+            body = fh.read()
+        with open(csv_path, "w") as fh:  # same spend and row count, bob's row moved to alice
+            fh.write(body.replace(",bob", ",alice"))
+        os.utime(csv_path, ns=(1, 1))
+        self.assertEqual([bucket.spend for _, bucket in weekly_index(backend).recent("alice", 4)], [4.0, 30.0])
+
+
+if __name__ == "__main__":
+    unittest.main()